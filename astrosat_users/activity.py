@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from astrosat_users.conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+# recording when each user was last seen (User.last_seen) shouldn't turn every request into
+# a write; so activity is coalesced to the minute, recorded at most once per user per minute
+# (across all processes, using the shared cache) in an in-process buffer, and that buffer is
+# written to the db w/ a single UPDATE every ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL seconds
+# (activity buffered by a process that stops before it flushes is lost; that's acceptable)
+
+LAST_SEEN_CACHE_KEY = "astrosat_users:last_seen:{user_id}:{minute}"
+
+LAST_SEEN_FLUSH_BATCH_SIZE = 500  # (the most users in a single UPDATE)
+
+_lock = threading.Lock()
+_current_minute = None
+_seen_this_minute = set()
+_pending = {}  # user_id -> minute
+_last_flush = time.monotonic()
+
+
+def record_last_seen(user_id, now=None):
+    """
+    Records that user_id was active (now); returns True if this is the
+    first time that has been recorded (by any process) this minute.
+    """
+    global _current_minute, _seen_this_minute
+    minute = (now or timezone.now()).replace(second=0, microsecond=0)
+
+    with _lock:
+        if minute != _current_minute:
+            _current_minute = minute
+            _seen_this_minute = set()
+        if user_id in _seen_this_minute:
+            return False
+        _seen_this_minute.add(user_id)
+
+    # (cache.add is atomic, so only one process records each user each minute)
+    cache_key = LAST_SEEN_CACHE_KEY.format(user_id=user_id, minute=int(minute.timestamp()))
+    if not cache.add(cache_key, True, timeout=2 * 60):
+        return False
+
+    with _lock:
+        if user_id not in _pending or _pending[user_id] < minute:
+            _pending[user_id] = minute
+    return True
+
+
+def flush_last_seen():
+    """
+    Writes the buffered activity to User.last_seen (never moving it backwards);
+    returns the number of users updated.
+    """
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+
+    from astrosat_users.models import User
+
+    n_updated = 0
+    pending = list(pending.items())
+    for i in range(0, len(pending), LAST_SEEN_FLUSH_BATCH_SIZE):
+        batch = pending[i:i + LAST_SEEN_FLUSH_BATCH_SIZE]
+        n_updated += User.objects.filter(pk__in=[user_id for user_id, _ in batch]).update(
+            last_seen=Case(
+                *[
+                    When(
+                        Q(pk=user_id) & (Q(last_seen__isnull=True) | Q(last_seen__lt=minute)),
+                        then=Value(minute),
+                    ) for user_id, minute in batch
+                ],
+                default=F("last_seen"),
+            )
+        )
+    return n_updated
+
+
+def maybe_flush_last_seen():
+    """
+    Flushes the buffered activity if ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL has passed.
+    """
+    if time.monotonic() - _last_flush >= app_settings.ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL:
+        try:
+            flush_last_seen()
+        except Exception:
+            # (tracking activity must never break the request that triggered the flush)
+            logger.exception("Unable to update last_seen.")
@@ -6,6 +6,7 @@ from urllib.parse import urljoin
 
 from django import forms
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.http import HttpRequest, HttpResponseRedirect
@@ -33,6 +34,7 @@ from allauth.utils import build_absolute_uri
 from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
 
 from astrosat_users.conf import app_settings
+from astrosat_users.instrumentation import stage
 from astrosat_users.serializers import UserSerializerLite
 from astrosat_users.utils import rest_encode_user_pk
 
@@ -121,7 +123,8 @@ class AccountAdapter(AdapterMixin, DefaultAccountAdapter):
         self.default_token_generator = default_token_generator
 
     def authenticate(self, request: HttpRequest, **credentials):
-        user = super().authenticate(request, **credentials)
+        with stage("adapter_authenticate"):
+            user = super().authenticate(request, **credentials)
 
         if user is not None:
             if app_settings.ASTROSAT_USERS_REQUIRE_APPROVAL and not user.is_approved:
@@ -239,6 +242,13 @@ class AccountAdapter(AdapterMixin, DefaultAccountAdapter):
         except ImmediateHttpResponse:
             raise
 
+        if self.is_api and app_settings.ASTROSAT_USERS_TOKEN_ONLY_API_LOGIN:
+            # API clients authenticate w/ tokens, so don't bother creating a session
+            # (or sending "user_logged_in"); just do what its receiver would have done
+            update_last_login(None, user)
+            request.user = user
+            return
+
         return super().login(request, user)
 
     def populate_username(self, request, user):
@@ -263,8 +273,11 @@ class AccountAdapter(AdapterMixin, DefaultAccountAdapter):
         no context of it's own.  I overload the session here and access it
         in the "account_email_verification_sent" template.
         """
-        user_emailaddress = user.emailaddress_set.get(primary=True)
-        request.session["email_recipient"] = user_emailaddress.email
+        # (users loaded by astrosat_users.backends.AuthenticationBackend already know their primary email)
+        email_recipient = user.__dict__.get("primary_emailaddress_email")
+        if email_recipient is None:
+            email_recipient = user.emailaddress_set.get(primary=True).email
+        request.session["email_recipient"] = email_recipient
 
         return super().respond_email_verification_sent(request, user)
 
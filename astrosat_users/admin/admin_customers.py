@@ -1,9 +1,15 @@
 from django.contrib import admin
 from django.forms import ModelForm
 
+from astrosat_users.admin.admin_utils import DeleteFilesAdminMixin, make_export_action
+from astrosat_users.exports import export_customer_users, export_customers
 from astrosat_users.models import Customer, CustomerUser
 
 
+def get_customer_users(queryset):
+    return CustomerUser.objects.filter(customer__in=queryset.values("pk"))
+
+
 class CustomerUserAdminForm(ModelForm):
     class Meta:
         model = CustomerUser
@@ -14,10 +20,32 @@ class CustomerUserAdminInline(admin.TabularInline):
     model = CustomerUser
     form = CustomerUserAdminForm
     extra = 0
+    # a <select> of every user in every row makes this page enormous
+    autocomplete_fields = ("user", )
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(DeleteFilesAdminMixin, admin.ModelAdmin):
+    actions = (
+        make_export_action(
+            export_customers, "csv", "Export the selected customers as CSV"
+        ),
+        make_export_action(
+            export_customers, "ndjson", "Export the selected customers as NDJSON"
+        ),
+        make_export_action(
+            export_customer_users,
+            "csv",
+            "Export the members of the selected customers as CSV",
+            get_queryset=get_customer_users,
+        ),
+        make_export_action(
+            export_customer_users,
+            "ndjson",
+            "Export the members of the selected customers as NDJSON",
+            get_queryset=get_customer_users,
+        ),
+    )
     fields = (
         "id",
         "is_active",
@@ -35,8 +63,9 @@ class CustomerAdmin(admin.ModelAdmin):
         "address",
         "postcode",
     )
+    delete_file_fields = (("logo", True), )
     inlines = (CustomerUserAdminInline, )
     list_display = ("name", "customer_type")
     list_filter = ("customer_type", )
     readonly_fields = ("id", "created")
-    search_fields = ("name", "official_name")
+    search_fields = ("^name", "^official_name")
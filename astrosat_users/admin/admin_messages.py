@@ -3,6 +3,11 @@ from django.forms import ModelForm
 
 from astrosat.admin import DateRangeListFilter
 
+from astrosat_users.admin.admin_utils import (
+    DeleteFilesAdminMixin,
+    EstimatedCountPaginator,
+    UserInputFilter,
+)
 from astrosat_users.models import Message, MessageAttachment
 
 
@@ -42,7 +47,8 @@ class MessageAdminForm(ModelForm):
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(DeleteFilesAdminMixin, admin.ModelAdmin):
+    delete_file_fields = (("attachments__file", False), )
     form = MessageAdminForm
     inlines = (MessageAttachmentAdminInline, )
     list_display = ("title_for_list_display", "user", "date", "read")
@@ -50,9 +56,11 @@ class MessageAdmin(admin.ModelAdmin):
     list_filter = (
         "read",
         "archived",
-        "user",
+        UserInputFilter,
         ("date", DateRangeListFilter),
     )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = (
         "user",
         "date",
@@ -1,7 +1,12 @@
+from collections import defaultdict
+
 from django import forms
 from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
 from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 
@@ -25,34 +30,145 @@ except admin.sites.AlreadyRegistered:
 
 @admin.register(UserPermission)
 class UserPermissionAdmin(admin.ModelAdmin):
-    pass
+    search_fields = ("^name", )
+
+
+class UserRoleAdminForm(forms.ModelForm):
+    class Meta:
+        model = UserRole
+        fields = "__all__"
+
+    def clean_parents(self):
+        parents = self.cleaned_data["parents"]
+        if self.instance.pk:
+            UserRole.objects.check_parents(
+                self.instance.pk, [parent.pk for parent in parents]
+            )
+        return parents
 
 
 @admin.register(UserRole)
 class UserRoleAdmin(admin.ModelAdmin):
-    filter_horizontal = ("permissions", )
+    form = UserRoleAdminForm
+    autocomplete_fields = ("permissions", "parents")
+    search_fields = ("^name", )
+    readonly_fields = ("effective_permissions_for_display", )
+
+    def effective_permissions_for_display(self, obj):
+        return ", ".join(
+            obj.effective_permissions.order_by("name").values_list("name", flat=True)
+        )
+
+    effective_permissions_for_display.short_description = "effective permissions"
 
 
 #################
 # admin actions #
 #################
 
+UPDATE_ROLES_MAX_DISPLAYED_OBJECTS = 100
+
+
+def update_roles(model, queryset, included_roles, excluded_roles):
+    """
+    Adds included_roles to & removes excluded_roles from every object in queryset
+    using a fixed number of queries on the "roles" through table (rather than a handful
+    per object).  Sends m2m_changed once per role (from the role's side of the relationship).
+    Returns the number of role assignments added & removed.
+    """
+    roles_field = model._meta.get_field("roles")
+    RolesThrough = roles_field.remote_field.through
+    object_field_name = f"{roles_field.m2m_field_name()}_id"
+    role_field_name = f"{roles_field.m2m_reverse_field_name()}_id"
+    objects_subquery = queryset.values("pk")
+
+    included_roles = list(included_roles)
+    excluded_roles = list(excluded_roles)
+    excluded_role_ids = {role.pk for role in excluded_roles}
+    roles = {role.pk: role for role in included_roles + excluded_roles}
+
+    existing_pairs = set(
+        RolesThrough.objects.filter(**{
+            f"{object_field_name}__in": objects_subquery,
+            f"{role_field_name}__in": list(roles.keys()),
+        }).values_list(object_field_name, role_field_name)
+    )
+
+    object_ids = list(queryset.values_list("pk", flat=True))
+    object_ids_to_add = defaultdict(set)
+    for role in included_roles:
+        for object_id in object_ids:
+            if (object_id, role.pk) not in existing_pairs:
+                object_ids_to_add[role.pk].add(object_id)
+    object_ids_to_remove = defaultdict(set)
+    for object_id, role_id in existing_pairs:
+        if role_id in excluded_role_ids:
+            object_ids_to_remove[role_id].add(object_id)
+
+    def send_m2m_changed(action, object_ids_by_role):
+        for role_id, object_ids in object_ids_by_role.items():
+            m2m_changed.send(
+                sender=RolesThrough,
+                action=action,
+                instance=roles[role_id],
+                reverse=True,
+                model=model,
+                pk_set=object_ids,
+                using=queryset.db,
+            )
+
+    with transaction.atomic(using=queryset.db):
+        if object_ids_to_add:
+            send_m2m_changed("pre_add", object_ids_to_add)
+            RolesThrough.objects.bulk_create(
+                [
+                    RolesThrough(**{object_field_name: object_id, role_field_name: role_id})
+                    for role_id, object_ids in object_ids_to_add.items()
+                    for object_id in object_ids
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            send_m2m_changed("post_add", object_ids_to_add)
+
+        if object_ids_to_remove:
+            send_m2m_changed("pre_remove", object_ids_to_remove)
+            RolesThrough.objects.filter(**{
+                f"{object_field_name}__in": objects_subquery,
+                f"{role_field_name}__in": list(object_ids_to_remove.keys()),
+            }).delete()
+            send_m2m_changed("post_remove", object_ids_to_remove)
+
+    return (
+        sum(map(len, object_ids_to_add.values())),
+        sum(map(len, object_ids_to_remove.values())),
+    )
+
 
 def update_roles_action(modeladmin, request, queryset):
     """
     used by UserAdmin & CustomerAdmin to update roles in bulk
+    (the work is done set-wise by `update_roles` above)
     """
+    # the roles are chosen via the (UserRoleAdmin) autocomplete view rather than
+    # by rendering every role; only the selected roles are ever rendered
+    roles_widget = AutocompleteSelectMultiple(
+        modeladmin.model._meta.get_field("roles"), modeladmin.admin_site
+    )
+
     class UpdateRolesForm(forms.Form):
         _selected_action = forms.CharField(widget=forms.MultipleHiddenInput)
         included_roles = forms.ModelMultipleChoiceField(
             required=False,
             label="Included Roles",
-            queryset=UserRole.objects.all()
+            queryset=UserRole.objects.all(),
+            widget=roles_widget,
         )
         excluded_roles = forms.ModelMultipleChoiceField(
             required=False,
             label="Excluded Roles",
-            queryset=UserRole.objects.all()
+            queryset=UserRole.objects.all(),
+            widget=roles_widget,
         )
 
         def clean(self):
@@ -77,17 +193,12 @@ def update_roles_action(modeladmin, request, queryset):
             included_roles = update_roles_form.cleaned_data["included_roles"]
             excluded_roles = update_roles_form.cleaned_data["excluded_roles"]
 
-            for obj in queryset:
-
-                existing_roles = obj.roles.all()
-                roles_to_add = included_roles.difference(existing_roles)
-                roles_to_remove = excluded_roles.intersection(existing_roles)
-                obj.roles.add(*roles_to_add)
-                obj.roles.remove(*roles_to_remove)
+            n_added, n_removed = update_roles(
+                modeladmin.model, queryset, included_roles, excluded_roles
+            )
 
-                if roles_to_add.exists() or roles_to_remove.exists():
-                    msg = f"Successfully added '{', '.join([r.name for r in roles_to_add])}' and removed '{', '.join([r.name for r in roles_to_remove])}' from '{obj}'."
-                    modeladmin.message_user(request, msg)
+            msg = f"Successfully added {n_added} and removed {n_removed} role assignments for {queryset.count()} {modeladmin.model._meta.verbose_name_plural}."
+            modeladmin.message_user(request, msg)
 
             return HttpResponseRedirect(request.get_full_path())
 
@@ -97,7 +208,8 @@ def update_roles_action(modeladmin, request, queryset):
         "index_title": getattr(settings, "ADMIN_INDEX_TITLE", None),
         "opts": modeladmin.model._meta,
         "form": update_roles_form,
-        "objects": queryset,
+        "objects": queryset[:UPDATE_ROLES_MAX_DISPLAYED_OBJECTS],
+        "n_hidden_objects": max(queryset.count() - UPDATE_ROLES_MAX_DISPLAYED_OBJECTS, 0),
     }
     return render(
         request, "astrosat_users/admin/update_roles.html", context=context
@@ -6,12 +6,19 @@ from allauth.account.adapter import get_adapter
 from astrosat.admin import get_clickable_m2m_list_display
 
 from astrosat_users.admin.admin_roles import update_roles_action
+from astrosat_users.admin.admin_utils import (
+    CustomerInputFilter,
+    DeleteFilesAdminMixin,
+    EstimatedCountPaginator,
+    make_export_action,
+)
+from astrosat_users.exports import export_users
 from astrosat_users.forms import UserAdminChangeForm, UserAdminCreationForm
 from astrosat_users.models import User, UserRole, Customer
 
 
 @admin.register(User)
-class UserAdmin(auth_admin.UserAdmin):
+class UserAdmin(DeleteFilesAdminMixin, auth_admin.UserAdmin):
 
     actions = (
         "toggle_approval",
@@ -19,7 +26,15 @@ class UserAdmin(auth_admin.UserAdmin):
         "toggle_verication",
         "onboard",
         "logout_all",
-    ) + (update_roles_action, )
+    ) + (
+        update_roles_action,
+        make_export_action(export_users, "csv", "Export the selected users as CSV"),
+        make_export_action(export_users, "ndjson", "Export the selected users as NDJSON"),
+    )
+    delete_file_fields = (
+        ("avatar", True),
+        ("messages__attachments__file", False),
+    )
     form = UserAdminChangeForm
     add_form = UserAdminCreationForm
     fieldsets = ((
@@ -37,6 +52,7 @@ class UserAdmin(auth_admin.UserAdmin):
                 "registration_stage",
                 "roles",
                 "uuid",
+                "last_seen",
             )
         },
     ), ) + auth_admin.UserAdmin.fieldsets
@@ -53,13 +69,16 @@ class UserAdmin(auth_admin.UserAdmin):
         "registration_stage",
         "get_roles_for_list_display",
         "get_customers_for_list_display",
+        "last_seen",
     ]
-    list_filter = auth_admin.UserAdmin.list_filter + ("customers", )
-    readonly_fields = auth_admin.UserAdmin.readonly_fields + ("uuid", )
-    search_fields = ["username", "name", "email"]
-    filter_horizontal = auth_admin.UserAdmin.filter_horizontal + (
-        "roles",
-    )  # makes a pretty widget; the same one as used by "groups"
+    list_filter = auth_admin.UserAdmin.list_filter + (CustomerInputFilter, )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = auth_admin.UserAdmin.readonly_fields + ("uuid", "last_seen")
+    # prefix searches ("^") can use the indexes on these fields (see User.Meta); note that
+    # this means users can't be found by part of their email (eg: just the domain)
+    search_fields = ["^username", "^email", "^name"]
+    autocomplete_fields = ("roles", )
 
     def get_queryset(self, request):
         # pre-fetching m2m fields that are used in list_displays
@@ -89,46 +108,28 @@ class UserAdmin(auth_admin.UserAdmin):
     ###########
 
     def toggle_approval(self, request, queryset):
-        # TODO: doing this cleverly w/ negated F expressions is not supported (https://code.djangoproject.com/ticket/17186)
-        # queryset.update(is_approved=not(F("is_approved")))
-        for obj in queryset:
-            obj.is_approved = not obj.is_approved
-            obj.save()
+        n_approved, n_unapproved = queryset.toggle("is_approved")
 
-            msg = f"{obj} {'not' if not obj.is_approved else ''} approved."
-            self.message_user(request, msg)
+        msg = f"{n_approved} users approved and {n_unapproved} users not approved."
+        self.message_user(request, msg)
 
     toggle_approval.short_description = "Toggles the approval of the selected users"
 
     def toggle_accepted_terms(self, request, queryset):
-        # TODO: doing this cleverly w/ negated F expressions is not supported (https://code.djangoproject.com/ticket/17186)
-        # queryset.update(accepted_terms=not(F("accepted_terms")))
-        for obj in queryset:
-            obj.accepted_terms = not obj.accepted_terms
-            obj.save()
+        n_accepted, n_unaccepted = queryset.toggle("accepted_terms")
 
-            msg = f"{obj} {'has not' if not obj.accepted_terms else 'has'} accepted terms."
-            self.message_user(request, msg)
+        msg = f"{n_accepted} users have accepted terms and {n_unaccepted} users have not accepted terms."
+        self.message_user(request, msg)
 
     toggle_accepted_terms.short_description = (
         "Toggles the term acceptance of the selected users"
     )
 
     def toggle_verication(self, request, queryset):
+        n_created, n_verified, n_unverified = queryset.set_verified(None)
 
-        for obj in queryset:
-
-            emailaddress, created = obj.emailaddress_set.get_or_create(
-                user=obj, email=obj.email
-            )
-            if not emailaddress.primary:
-                emailaddress.set_as_primary(conditional=True)
-
-            emailaddress.verified = not emailaddress.verified
-            emailaddress.save()
-
-            msg = f"{emailaddress} {'created and' if created else ''} {'not' if not emailaddress.verified else ''} verified."
-            self.message_user(request, msg)
+        msg = f"{n_created} email addresses created; {n_verified} email addresses verified and {n_unverified} email addresses not verified."
+        self.message_user(request, msg)
 
     toggle_verication.short_description = (
         "Toggles the verification of the selected users' primary email addresses"
@@ -146,10 +147,9 @@ class UserAdmin(auth_admin.UserAdmin):
     onboard.short_description = "Sends an onboarding message to the selected users."
 
     def logout_all(self, request, queryset):
-        for obj in queryset:
-            obj.logout_all()
+        n_tokens, n_sessions = queryset.logout_all(request=request)
 
-            msg = f"logged {obj} out of all sessions."
-            self.message_user(request, msg)
+        msg = f"logged {queryset.count()} users out of all sessions ({n_tokens} tokens and {n_sessions} sessions deleted)."
+        self.message_user(request, msg)
 
     logout_all.short_description = "Logs the selected users out of all active sessions"
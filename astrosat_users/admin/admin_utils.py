@@ -0,0 +1,178 @@
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.text import slugify
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from astrosat_users.models import CustomerUser
+from astrosat_users.renditions import get_rendition_names
+from astrosat_users.storage import delete_files_on_commit
+
+
+class DeleteFilesAdminMixin:
+    """
+    Deletes the files belonging to objects deleted in bulk (ie: by the "delete_selected" action);
+    `queryset.delete()` doesn't call each object's `delete()` so they would otherwise be left behind.
+    Subclasses specify the file fields as a list of (lookup, has_renditions) pairs, where lookup
+    is relative to the admin's model (ie: "avatar" or "messages__attachments__file").
+    """
+
+    delete_file_fields = ()
+
+    def get_deleted_files(self, queryset):
+        deleted_files = []
+        for lookup, has_renditions in self.delete_file_fields:
+            field = self.get_file_field(lookup)
+            names = [
+                name for name in queryset.values_list(lookup, flat=True).distinct()
+                if name
+            ]
+            if has_renditions:
+                names += [
+                    rendition_name
+                    for name in names
+                    for rendition_name in get_rendition_names(name)
+                ]
+            deleted_files.append((field.storage, names))
+        return deleted_files
+
+    def get_file_field(self, lookup):
+        model = self.model
+        *relation_names, field_name = lookup.split("__")
+        for relation_name in relation_names:
+            model = model._meta.get_field(relation_name).related_model
+        return model._meta.get_field(field_name)
+
+    def delete_queryset(self, request, queryset):
+        # (the file names must be read before the objects are deleted)
+        deleted_files = self.get_deleted_files(queryset)
+        super().delete_queryset(request, queryset)
+        for storage, names in deleted_files:
+            delete_files_on_commit(storage, names)
+
+
+###########
+# actions #
+###########
+
+
+def make_export_action(export_fn, file_format, description, get_queryset=None):
+    """
+    Returns an admin action that streams the selected objects using one of the
+    fns in astrosat_users.exports (w/ get_queryset used to turn the selected
+    objects into the objects to export, if they are different).
+    """
+    def export_action(modeladmin, request, queryset):
+        if get_queryset is not None:
+            queryset = get_queryset(queryset)
+        return export_fn(queryset, file_format)
+
+    export_action.__name__ = slugify(description).replace("-", "_")
+    export_action.short_description = description
+    return export_action
+
+
+###########
+# filters #
+###########
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    A list_filter that renders a text input rather than a link for every choice;
+    used for related models that have far too many objects to list.
+    """
+
+    template = "astrosat_users/admin/input_filter.html"
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        # (a SimpleListFilter w/out any lookups wouldn't be displayed)
+        return True
+
+    def choices(self, changelist):
+        # only the "All" choice is needed (to remove the filter); the other parameters
+        # (filters, search, ordering, etc.) are passed along as hidden inputs in the form
+        all_choice = next(super().choices(changelist))
+        all_choice["query_parts"] = [
+            (key, value)
+            for key, value in changelist.params.items()
+            if key != self.parameter_name
+        ]
+        yield all_choice
+
+
+class UserInputFilter(InputFilter):
+    """
+    Filters objects w/ a "user" field by the start of the user's username or email.
+    """
+
+    parameter_name = "user"
+    title = "user"
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            return queryset.filter(
+                Q(user__username__istartswith=value) | Q(user__email__istartswith=value)
+            )
+
+
+class CustomerInputFilter(InputFilter):
+    """
+    Filters users by the start of the name of any of their customers.
+    """
+
+    parameter_name = "customer"
+    title = "customer"
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            # (a subquery rather than a join, so that users aren't duplicated)
+            return queryset.filter(
+                pk__in=CustomerUser.objects.filter(
+                    customer__name__istartswith=value
+                ).values("user")
+            )
+
+
+##############
+# pagination #
+##############
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A Paginator that doesn't count every row of large tables.  An unfiltered queryset
+    uses the table statistics (on PostgreSQL) once the table has more than
+    `estimate_threshold` rows; anything else is counted up to `max_count` rows.
+    Use w/ `ModelAdmin.show_full_result_count = False` to avoid a second full count.
+    """
+
+    estimate_threshold = 10000
+    max_count = 10000
+
+    @cached_property
+    def count(self):
+        estimated_count = self.get_estimated_count()
+        if estimated_count is not None and estimated_count > self.estimate_threshold:
+            return estimated_count
+        return self.object_list[:self.max_count].count()
+
+    def get_estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # (reltuples is negative, or 0 in older versions, if the table has never been analyzed)
+        return int(row[0]) if row and row[0] > 0 else None
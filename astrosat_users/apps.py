@@ -21,3 +21,10 @@ class AstrosatUsersConfig(AppConfig):
             import astrosat_users.signals  # noqa
         except ImportError:
             pass
+
+        from astrosat_users.conf import app_settings
+
+        if app_settings.ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION:
+            # load the password strength estimator now rather than during the first request
+            from astrosat_users.validators import prewarm_zxcvbn
+            prewarm_zxcvbn()
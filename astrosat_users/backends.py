@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from allauth.account.auth_backends import AuthenticationBackend as AllAuthAuthenticationBackend
+from allauth.account.models import EmailAddress
+from allauth.account.utils import filter_users_by_username
+
+from astrosat_users.instrumentation import stage
+
+UserModel = get_user_model()
+
+
+class AuthenticationBackend(AllAuthAuthenticationBackend):
+    """
+    Just like allauth's AuthenticationBackend, but the user is loaded w/ their primary
+    EmailAddress annotated (see `UserQuerySet.with_primary_emailaddress`), so the rest
+    of the login (checking verification, serializing the user, etc.) can reuse that
+    object w/out querying EmailAddress again.
+    """
+    def _authenticate_by_email(self, **credentials):
+        # (as w/ allauth, "username" is used if "email" isn't passed)
+        email = credentials.get("email", credentials.get("username"))
+        password = credentials.get("password")
+        if not email or password is None:
+            return None
+
+        # (as w/ allauth, EmailAddress is looked up separately rather than in a subquery, so
+        # both lookups can use an index; users w/ a matching verified EmailAddress are preferred)
+        emailaddresses = list(
+            EmailAddress.objects.filter(email__iexact=email).values_list("user", "verified")
+        )
+        verified_user_ids = {
+            user_id for user_id, verified in emailaddresses if verified
+        }
+        users = UserModel.objects.with_primary_emailaddress().filter(
+            Q(email__iexact=email) | Q(pk__in={user_id for user_id, _ in emailaddresses})
+        ).order_by("pk")
+        for user in sorted(users, key=lambda user: user.pk not in verified_user_ids):
+            if self._check_password(user, password):
+                return user
+        return None
+
+    def _authenticate_by_username(self, **credentials):
+        username = credentials.get("username")
+        password = credentials.get("password")
+        if username is None or password is None:
+            return None
+
+        try:
+            user = filter_users_by_username(username).with_primary_emailaddress().get()
+        except UserModel.DoesNotExist:
+            return None
+        if self._check_password(user, password):
+            return user
+        return None
+
+    def _check_password(self, user, password):
+        # (hashing is deliberately slow, so it is worth timing on its own)
+        with stage("password_hash"):
+            return super()._check_password(user, password)
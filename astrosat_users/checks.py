@@ -3,10 +3,17 @@ import operator
 from itertools import chain
 
 from django.conf import settings
-from django.core.checks import register, Error, Tags
+from django.core.checks import register, Error, Tags, Warning
+from django.utils.module_loading import import_string
+
+from rest_framework.settings import api_settings as drf_settings
+
+from allauth.account.auth_backends import AuthenticationBackend as AllAuthAuthenticationBackend
 
 from . import APP_NAME
 from .conf import app_settings
+from .password_filter import PasswordFilter
+from .validators import BREACHED_PASSWORD_VALIDATOR_NAME, get_password_filter_path
 
 # apps required by astrosat_users
 APP_DEPENDENCIES = [
@@ -89,10 +96,21 @@ def check_settings(app_configs, **kwargs):
             )
         )
 
-    authentication_backends = settings.AUTHENTICATION_BACKENDS
-    if (
-        "allauth.account.auth_backends.AuthenticationBackend"
-        not in authentication_backends
+    # (astrosat_users.backends.AuthenticationBackend, or any other subclass of allauth's backend, will do)
+    authentication_backends = []
+    for backend in settings.AUTHENTICATION_BACKENDS:
+        try:
+            authentication_backends.append(import_string(backend))
+        except ImportError:
+            errors.append(
+                Warning(
+                    f"The authentication backend '{backend}' in AUTHENTICATION_BACKENDS cannot be imported.",
+                    id=f"{APP_NAME}:W005",
+                )
+            )
+    if not any(
+        issubclass(backend, AllAuthAuthenticationBackend)
+        for backend in authentication_backends
     ):
         errors.append(
             Error(
@@ -126,3 +144,79 @@ def check_third_party_settings(app_configs, **kwargs):
             )
 
     return errors
+
+
+@register(Tags.compatibility)
+def check_password_filter(app_configs, **kwargs):
+    """
+    Makes sure that, if BreachedPasswordValidator is used, it has a
+    filter to check passwords against and it runs before StrengthPasswordValidator.
+    """
+
+    errors = []
+
+    password_validators = [
+        validator["NAME"] for validator in settings.AUTH_PASSWORD_VALIDATORS
+    ]
+    breached_validator_name = BREACHED_PASSWORD_VALIDATOR_NAME
+    strength_validator_name = "astrosat_users.validators.StrengthPasswordValidator"
+    if breached_validator_name not in password_validators:
+        return errors
+
+    breached_validator_index = password_validators.index(breached_validator_name)
+    if (
+        strength_validator_name in password_validators and
+        password_validators.index(strength_validator_name) < breached_validator_index
+    ):
+        errors.append(
+            Warning(
+                "BreachedPasswordValidator should come before StrengthPasswordValidator in AUTH_PASSWORD_VALIDATORS.",
+                id=f"{APP_NAME}:W001",
+            )
+        )
+
+    path = get_password_filter_path()
+    if not path:
+        errors.append(
+            Warning(
+                "BreachedPasswordValidator is used but ASTROSAT_USERS_PASSWORD_FILTER_PATH is not set; no passwords will be rejected.",
+                id=f"{APP_NAME}:W002",
+            )
+        )
+    else:
+        try:
+            PasswordFilter(path)
+        except (OSError, ValueError) as e:
+            errors.append(
+                Warning(
+                    f"BreachedPasswordValidator is unable to use the password filter '{path}' ({e}); no passwords will be rejected.",
+                    hint="Build it with 'python manage.py build_password_filter <password-list>'.",
+                    id=f"{APP_NAME}:W003",
+                )
+            )
+
+    return errors
+
+
+@register(Tags.security)
+def check_throttle_rates(app_configs, **kwargs):
+    """
+    Makes sure that, if requests are throttled by IP, the client IP can be worked out.
+    """
+
+    errors = []
+
+    ip_throttle_rates = [
+        scope for scope, rate in app_settings.ASTROSAT_USERS_THROTTLE_RATES.items()
+        if scope.endswith("_ip") and rate is not None
+    ]
+    if ip_throttle_rates and drf_settings.NUM_PROXIES is None:
+        errors.append(
+            Warning(
+                f"ASTROSAT_USERS_THROTTLE_RATES throttles {', '.join(ip_throttle_rates)} by IP but REST_FRAMEWORK['NUM_PROXIES'] is not set; the IP is taken from REMOTE_ADDR, so behind a proxy every client will share the proxy's IP.",
+                hint="Set REST_FRAMEWORK['NUM_PROXIES'] to the number of proxies in front of the app (0 if there are none).",
+                id=f"{APP_NAME}:W004",
+            )
+        )
+
+    return errors
@@ -106,6 +106,168 @@ ASTROSAT_USERS_NOTIFY_SIGNUPS = getattr(
     ),
 )
 
+# authentication...
+
+# API logins (which return a knox token) don't also log the user into a session; this avoids
+# writing to the session table on every API login (backend logins still use sessions)
+ASTROSAT_USERS_TOKEN_ONLY_API_LOGIN = getattr(
+    settings,
+    "ASTROSAT_USERS_TOKEN_ONLY_API_LOGIN",
+    env.bool("DJANGO_ASTROSAT_USERS_TOKEN_ONLY_API_LOGIN", default=False),
+)
+
+# the most (unexpired) knox tokens a user can have; creating another deletes the oldest (None for no limit)
+ASTROSAT_USERS_MAX_TOKENS_PER_USER = getattr(
+    settings,
+    "ASTROSAT_USERS_MAX_TOKENS_PER_USER",
+    env.int("DJANGO_ASTROSAT_USERS_MAX_TOKENS_PER_USER", default=None),
+)
+
+# how often (in seconds) each process writes the activity recorded by LastSeenMiddleware to User.last_seen
+ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL = getattr(
+    settings,
+    "ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL",
+    env.int("DJANGO_ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL", default=60),
+)
+
+# the rates (as w/ DRF, "<n>/<s|min|hour|day>") at which login, password reset & email verification
+# requests are allowed per client IP and per email; each is "<astrosat_throttle_scope>_<ip|email>" (missing or None
+# for no limit), eg: {"login_ip": "60/min", "login_email": "10/min"}; IP limits rely on DRF's NUM_PROXIES
+ASTROSAT_USERS_THROTTLE_RATES = getattr(settings, "ASTROSAT_USERS_THROTTLE_RATES", {})
+
+# password validation...
+
+# load zxcvbn (used by StrengthPasswordValidator) when the app starts rather than on first use;
+# worth setting for processes that serve registration/password changes
+ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION = getattr(
+    settings,
+    "ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION",
+    env.bool("DJANGO_ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION", default=False),
+)
+
+# only this many characters of a password are scored by StrengthPasswordValidator (zxcvbn's
+# cost grows quickly w/ length; note that some versions of zxcvbn refuse more than 72 characters)
+ASTROSAT_USERS_PASSWORD_STRENGTH_MAX_SCORED_LENGTH = getattr(
+    settings, "ASTROSAT_USERS_PASSWORD_STRENGTH_MAX_SCORED_LENGTH", 32
+)
+# passwords at least this long are considered strong w/out being scored (None to always score them)
+ASTROSAT_USERS_PASSWORD_STRENGTH_STRONG_LENGTH = getattr(
+    settings, "ASTROSAT_USERS_PASSWORD_STRENGTH_STRONG_LENGTH", None
+)
+
+# a filter of common/breached passwords built by "manage.py build_password_filter" (None to not use one);
+# passwords in it are rejected by BreachedPasswordValidator & aren't scored by StrengthPasswordValidator
+ASTROSAT_USERS_PASSWORD_FILTER_PATH = getattr(
+    settings,
+    "ASTROSAT_USERS_PASSWORD_FILTER_PATH",
+    env("DJANGO_ASTROSAT_USERS_PASSWORD_FILTER_PATH", default=None),
+)
+
+# record the time taken (and queries made) by each stage of a login; these are
+# passed to each of the sinks (dotted paths to callables that take an
+# astrosat_users.instrumentation.Recording, such as
+# "astrosat_users.instrumentation.LoggingSink" or "astrosat_users.instrumentation.StatsdSink")
+ASTROSAT_USERS_INSTRUMENTATION = getattr(
+    settings,
+    "ASTROSAT_USERS_INSTRUMENTATION",
+    env.bool("DJANGO_ASTROSAT_USERS_INSTRUMENTATION", default=False),
+)
+ASTROSAT_USERS_INSTRUMENTATION_SINKS = getattr(
+    settings, "ASTROSAT_USERS_INSTRUMENTATION_SINKS", []
+)
+# also return the timings in a "Server-Timing" header; this tells any client which
+# stages ran (eg: whether a password was checked, so whether the email belongs to a user)
+# so it should only be used in development
+ASTROSAT_USERS_INSTRUMENTATION_HEADER = getattr(
+    settings,
+    "ASTROSAT_USERS_INSTRUMENTATION_HEADER",
+    env.bool("DJANGO_ASTROSAT_USERS_INSTRUMENTATION_HEADER", default=False),
+)
+# the "host:port" of the statsd-compatible collector used by StatsdSink
+ASTROSAT_USERS_INSTRUMENTATION_STATSD_ADDRESS = getattr(
+    settings,
+    "ASTROSAT_USERS_INSTRUMENTATION_STATSD_ADDRESS",
+    env("DJANGO_ASTROSAT_USERS_INSTRUMENTATION_STATSD_ADDRESS", default="localhost:8125"),
+)
+
+# image validation...
+
+# the largest file (in bytes) that ImageDimensionsValidator will accept
+ASTROSAT_USERS_MAX_IMAGE_SIZE = getattr(
+    settings,
+    "ASTROSAT_USERS_MAX_IMAGE_SIZE",
+    env.int("DJANGO_ASTROSAT_USERS_MAX_IMAGE_SIZE", default=1024 * 1024),
+)
+# how far into a file (in bytes) ImageDimensionsValidator will look for the image dimensions
+ASTROSAT_USERS_MAX_IMAGE_HEADER_SIZE = getattr(
+    settings, "ASTROSAT_USERS_MAX_IMAGE_HEADER_SIZE", 256 * 1024
+)
+
+# permissions...
+
+# how long (in seconds) each user's permissions are cached for (they are invalidated whenever roles change anyway)
+ASTROSAT_USERS_PERMISSIONS_CACHE_TIMEOUT = getattr(
+    settings, "ASTROSAT_USERS_PERMISSIONS_CACHE_TIMEOUT", 60 * 60 * 24
+)
+
+# exports...
+
+# the number of rows read from the db at a time when streaming exports
+ASTROSAT_USERS_EXPORT_CHUNK_SIZE = getattr(
+    settings, "ASTROSAT_USERS_EXPORT_CHUNK_SIZE", 2000
+)
+
+# storage...
+
+# the number of threads used to delete files from storage after a model is deleted (0 deletes them synchronously on commit)
+ASTROSAT_USERS_STORAGE_DELETION_WORKERS = getattr(
+    settings,
+    "ASTROSAT_USERS_STORAGE_DELETION_WORKERS",
+    env.int("DJANGO_ASTROSAT_USERS_STORAGE_DELETION_WORKERS", default=4),
+)
+
+# image renditions...
+
+# the sizes (in pixels) & formats of the renditions made of avatars & logos
+ASTROSAT_USERS_RENDITION_SIZES = getattr(
+    settings, "ASTROSAT_USERS_RENDITION_SIZES", [32, 64, 128]
+)
+ASTROSAT_USERS_RENDITION_FORMATS = getattr(
+    settings, "ASTROSAT_USERS_RENDITION_FORMATS", ["webp", "png"]
+)
+# when renditions are made: "lazy" (the first time they are requested) or "worker" (by the "generate_renditions" command)
+ASTROSAT_USERS_RENDITION_MODE = getattr(
+    settings,
+    "ASTROSAT_USERS_RENDITION_MODE",
+    env("DJANGO_ASTROSAT_USERS_RENDITION_MODE", default="lazy"),
+)
+# the largest image (in pixels, read from its header) that renditions are made of; larger images just use the original
+ASTROSAT_USERS_RENDITION_MAX_PIXELS = getattr(
+    settings, "ASTROSAT_USERS_RENDITION_MAX_PIXELS", 5000 * 5000
+)
+
+# message streaming...
+
+# how new messages reach streaming clients: "local" (in-process only), "cache" (in-process
+# plus a version key in the shared cache - for multiple workers), or "db" (in-process plus polling the db)
+ASTROSAT_USERS_MESSAGE_STREAM_BACKEND = getattr(
+    settings,
+    "ASTROSAT_USERS_MESSAGE_STREAM_BACKEND",
+    env("DJANGO_ASTROSAT_USERS_MESSAGE_STREAM_BACKEND", default="local"),
+)
+# seconds between checks of the shared cache / db (ignored by the "local" backend)
+ASTROSAT_USERS_MESSAGE_STREAM_POLL_INTERVAL = getattr(
+    settings, "ASTROSAT_USERS_MESSAGE_STREAM_POLL_INTERVAL", 5
+)
+# seconds between keep-alive comments on an idle stream
+ASTROSAT_USERS_MESSAGE_STREAM_KEEPALIVE_INTERVAL = getattr(
+    settings, "ASTROSAT_USERS_MESSAGE_STREAM_KEEPALIVE_INTERVAL", 15
+)
+# seconds before a stream is closed (the client reconnects w/ "Last-Event-ID")
+ASTROSAT_USERS_MESSAGE_STREAM_TIMEOUT = getattr(
+    settings, "ASTROSAT_USERS_MESSAGE_STREAM_TIMEOUT", 300
+)
+
 # required third party settings...
 # (most of these are checked in checks.py)
 
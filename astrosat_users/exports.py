@@ -0,0 +1,295 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from allauth.account.models import EmailAddress
+
+from astrosat_users.conf import app_settings
+from astrosat_users.models import (
+    Customer,
+    CustomerUser,
+    User,
+    UserRole,
+    UserRoleEffectivePermission,
+)
+
+# exports are streamed a row at a time; the db is read in chunks (w/ a server-side
+# cursor where supported) & any related objects needed by a chunk are fetched
+# in one query per relation, so memory use doesn't depend on the number of rows
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# (multiple values in a single CSV cell are separated by this; a separator
+# w/in a value is escaped, as is the escape character, by CSV_LIST_ESCAPE)
+CSV_LIST_SEPARATOR = ";"
+CSV_LIST_ESCAPE = "\\"
+
+# spreadsheets treat a cell starting w/ one of these as a formula; since values like
+# names & emails are user-controlled, such cells are prefixed w/ "'" so they are just text
+# (as are cells that already start w/ "'", so that the prefix can always be removed again)
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+CSV_TEXT_PREFIX = "'"
+
+USER_EXPORT_FIELDS = [
+    "uuid",
+    "username",
+    "email",
+    "name",
+    "is_active",
+    "is_approved",
+    "is_verified",
+    "accepted_terms",
+    "onboarded",
+    "registration_stage",
+    "date_joined",
+    "last_login",
+    "roles",
+    "permissions",
+    "customers",
+]
+
+CUSTOMER_EXPORT_FIELDS = [
+    "id",
+    "name",
+    "official_name",
+    "is_active",
+    "created",
+    "customer_type",
+    "company_type",
+    "registered_id",
+    "vat_number",
+    "url",
+    "country",
+    "address",
+    "postcode",
+]
+
+CUSTOMER_USER_EXPORT_FIELDS = [
+    "customer_id",
+    "customer_name",
+    "user_uuid",
+    "user_email",
+    "type",
+    "status",
+    "invitation_date",
+]
+
+
+def iter_chunks(queryset, chunk_size=None):
+    """
+    Yields lists of (up to chunk_size) rows from queryset, read w/ `iterator()`.
+    """
+    chunk_size = chunk_size or app_settings.ASTROSAT_USERS_EXPORT_CHUNK_SIZE
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _get_export_queryset(model, queryset):
+    # filters on related objects (see UserFilterSet) can duplicate rows; using a subquery
+    # removes any duplicates & means the export has a stable order for iterating in chunks
+    return model.objects.filter(pk__in=queryset.values("pk")).order_by("pk")
+
+
+def iter_user_rows(queryset, chunk_size=None):
+    """
+    Yields a dictionary of USER_EXPORT_FIELDS for each user in queryset.
+    """
+    # there are few roles, so they are all read up-front...
+    role_names = dict(UserRole.objects.values_list("pk", "name"))
+    role_permission_names = defaultdict(set)
+    for role_id, permission_name in UserRoleEffectivePermission.objects.values_list(
+        "role_id", "permission__name"
+    ):
+        role_permission_names[role_id].add(permission_name)
+
+    queryset = _get_export_queryset(User, queryset).values(
+        "pk",
+        *[
+            field for field in USER_EXPORT_FIELDS
+            if field not in ("is_verified", "roles", "permissions", "customers")
+        ],
+    )
+    for chunk in iter_chunks(queryset, chunk_size):
+
+        # ...but there are lots of users, so their related objects are read a chunk at a time
+        user_ids = [row["pk"] for row in chunk]
+        verified_user_ids = set(
+            EmailAddress.objects.filter(
+                user_id__in=user_ids, primary=True, verified=True
+            ).values_list("user_id", flat=True)
+        )
+        user_role_ids = defaultdict(list)
+        for user_id, role_id in User.roles.through.objects.filter(
+            user_id__in=user_ids
+        ).values_list("user_id", "userrole_id"):
+            user_role_ids[user_id].append(role_id)
+        user_customer_names = defaultdict(list)
+        for user_id, customer_name in CustomerUser.objects.filter(
+            user_id__in=user_ids
+        ).values_list("user_id", "customer__name"):
+            user_customer_names[user_id].append(customer_name)
+
+        for row in chunk:
+            user_id = row.pop("pk")
+            role_ids = user_role_ids[user_id]
+            row["is_verified"] = user_id in verified_user_ids
+            row["roles"] = sorted(role_names[role_id] for role_id in role_ids)
+            row["permissions"] = sorted(
+                set().union(*[role_permission_names[role_id] for role_id in role_ids])
+            )
+            row["customers"] = sorted(user_customer_names[user_id])
+            yield row
+
+
+def iter_customer_rows(queryset, chunk_size=None):
+    """
+    Yields a dictionary of CUSTOMER_EXPORT_FIELDS for each customer in queryset.
+    """
+    queryset = _get_export_queryset(Customer, queryset).values(*CUSTOMER_EXPORT_FIELDS)
+    for chunk in iter_chunks(queryset, chunk_size):
+        yield from chunk
+
+
+def iter_customer_user_rows(queryset, chunk_size=None):
+    """
+    Yields a dictionary of CUSTOMER_USER_EXPORT_FIELDS for each membership in queryset.
+    """
+    queryset = _get_export_queryset(CustomerUser, queryset).values_list(
+        "customer_id",
+        "customer__name",
+        "user__uuid",
+        "user__email",
+        "customer_user_type",
+        "customer_user_status",
+        "invitation_date",
+    )
+    for chunk in iter_chunks(queryset, chunk_size):
+        for values in chunk:
+            yield dict(zip(CUSTOMER_USER_EXPORT_FIELDS, values))
+
+
+class Echo:
+    """
+    A file-like object that just returns what is written to it;
+    lets csv.writer write to a generator rather than to a buffer.
+    """
+    def write(self, value):
+        return value
+
+
+def escape_csv_list(values):
+    """
+    Joins values into a single cell, escaping any separators w/in them.
+    """
+    return CSV_LIST_SEPARATOR.join(
+        str(value).replace(CSV_LIST_ESCAPE, CSV_LIST_ESCAPE * 2).replace(
+            CSV_LIST_SEPARATOR, CSV_LIST_ESCAPE + CSV_LIST_SEPARATOR
+        ) for value in values
+    )
+
+
+def split_csv_list(value):
+    """
+    The reverse of escape_csv_list.
+    """
+    values = []
+    current_value = []
+    characters = iter(value)
+    for character in characters:
+        if character == CSV_LIST_ESCAPE:
+            current_value.append(next(characters, ""))
+        elif character == CSV_LIST_SEPARATOR:
+            values.append("".join(current_value))
+            current_value = []
+        else:
+            current_value.append(character)
+    values.append("".join(current_value))
+    return values
+
+
+def escape_csv_value(value):
+    """
+    Makes sure that value won't be interpreted as a formula by a spreadsheet.
+    """
+    if isinstance(value, list):
+        value = escape_csv_list(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES + (CSV_TEXT_PREFIX, )):
+        return CSV_TEXT_PREFIX + value
+    return value
+
+
+def unescape_csv_value(value):
+    """
+    The reverse of escape_csv_value (lists are left joined; see split_csv_list).
+    """
+    if isinstance(value, str) and value.startswith(CSV_TEXT_PREFIX):
+        return value[len(CSV_TEXT_PREFIX):]
+    return value
+
+
+def render_csv(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([escape_csv_value(row[field]) for field in fields])
+
+
+def render_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+def export_response(rows, fields, file_format, filename):
+    """
+    Returns a StreamingHttpResponse of rows (dictionaries of fields) as
+    an attachment; file_format must be one of EXPORT_FORMATS.
+    """
+    if file_format == "csv":
+        content = render_csv(rows, fields)
+    elif file_format == "ndjson":
+        content = render_ndjson(rows)
+    else:
+        raise ValueError(f"Unknown export format: '{file_format}'.")
+
+    response = StreamingHttpResponse(
+        content, content_type=EXPORT_FORMATS[file_format]
+    )
+    timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}-{timestamp}.{file_format}"'
+    )
+    return response
+
+
+def export_users(queryset, file_format):
+    return export_response(
+        iter_user_rows(queryset), USER_EXPORT_FIELDS, file_format, "users"
+    )
+
+
+def export_customers(queryset, file_format):
+    return export_response(
+        iter_customer_rows(queryset), CUSTOMER_EXPORT_FIELDS, file_format, "customers"
+    )
+
+
+def export_customer_users(queryset, file_format):
+    return export_response(
+        iter_customer_user_rows(queryset),
+        CUSTOMER_USER_EXPORT_FIELDS,
+        file_format,
+        "customer-users",
+    )
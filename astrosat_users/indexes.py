@@ -0,0 +1,33 @@
+from django.db import models
+from django.db.models import Func
+from django.db.models.expressions import ExpressionList
+from django.db.models.functions import Upper
+from django.db.models.sql import Query
+
+
+class UpperPatternIndex(models.Index):
+    """
+    An index on UPPER(<field>), which is what Django compares for case-insensitive lookups.
+    On PostgreSQL it uses the "text_pattern_ops" operator class; a plain btree index can
+    serve "iexact" but not "istartswith" ("UPPER(<field>::text) LIKE 'X%'") unless the db
+    uses the "C" collation, whereas a "text_pattern_ops" index can serve both.
+    (Expression indexes, like this, need Django 3.2+.)
+    """
+    def __init__(self, field_name, name):
+        super().__init__(Upper(field_name), name=name)
+        self.field_name = field_name
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        return (path, (self.field_name, ), {"name": self.name})
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        # (django.contrib.postgres.indexes.OpClass does this, but only if "django.contrib.postgres" is installed)
+        expressions = ExpressionList(
+            Func(Upper(self.field_name), template="%(expressions)s text_pattern_ops")
+        ).resolve_expression(Query(model, alias_cols=False))
+        return schema_editor._create_index_sql(
+            model, fields=None, name=self.name, using=using, expressions=expressions, **kwargs
+        )
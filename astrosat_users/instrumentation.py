@@ -0,0 +1,154 @@
+import contextvars
+import functools
+import logging
+import socket
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List
+
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from astrosat_users.conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+# opt-in (ASTROSAT_USERS_INSTRUMENTATION) timings of the stages of a request (like a login);
+# a view starts a recording, the code it calls marks stages w/ "with stage(name):", and when
+# the view finishes the timings & query counts of each stage are passed to the configured
+# sinks and returned as a "Server-Timing" header; when nothing is being recorded, "stage()"
+# costs no more than looking up a contextvar
+
+_recording = contextvars.ContextVar("astrosat_users_recording", default=None)
+
+
+@dataclass
+class Stage:
+    name: str
+    duration: float = 0  # (seconds)
+    n_queries: int = 0
+
+
+@dataclass
+class Recording:
+    name: str
+    stages: List[Stage] = field(default_factory=list)
+
+    def to_server_timing(self):
+        """
+        Returns the stages formatted as a "Server-Timing" header
+        (eg: 'authenticate;dur=105.2;desc="2 queries", token;dur=3.1;desc="1 queries"').
+        """
+        return ", ".join(
+            f'{stage.name};dur={stage.duration * 1000:.1f};desc="{stage.n_queries} queries"'
+            for stage in self.stages
+        )
+
+
+@contextmanager
+def recording(name):
+    """
+    Records the stages that happen w/in this block; yields the Recording
+    (or None if instrumentation is disabled) and sends it to the sinks at the end.
+    """
+    if not app_settings.ASTROSAT_USERS_INSTRUMENTATION:
+        yield None
+        return
+
+    current_recording = Recording(name)
+    token = _recording.set(current_recording)
+    try:
+        yield current_recording
+    finally:
+        _recording.reset(token)
+        for sink in get_sinks(tuple(app_settings.ASTROSAT_USERS_INSTRUMENTATION_SINKS)):
+            try:
+                sink(current_recording)
+            except Exception:
+                # (instrumentation must never break the request being instrumented)
+                logger.exception(f"Unable to send '{name}' timings to {sink}.")
+
+
+@contextmanager
+def stage(name):
+    """
+    Times the block (and counts the queries it makes) as part of the current
+    recording, if there is one.  Stages can be nested, in which case the time &
+    queries of the inner stage are included in the outer stage as well.
+    """
+    current_recording = _recording.get()
+    if current_recording is None:
+        yield
+        return
+
+    current_stage = Stage(name)
+
+    def count_queries(execute, sql, params, many, context):
+        current_stage.n_queries += 1
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_queries):
+            yield
+    finally:
+        current_stage.duration = time.perf_counter() - start
+        current_recording.stages.append(current_stage)
+
+
+#########
+# sinks #
+#########
+
+# a sink is any callable that takes a Recording; ASTROSAT_USERS_INSTRUMENTATION_SINKS
+# is a list of the dotted paths of classes (which are instantiated once) or fns
+
+
+@functools.lru_cache(maxsize=None)
+def get_sinks(sink_paths):
+    sinks = []
+    for sink_path in sink_paths:
+        sink = import_string(sink_path)
+        sinks.append(sink() if isinstance(sink, type) else sink)
+    return sinks
+
+
+class LoggingSink:
+    """
+    Logs each recording (at INFO) to the "astrosat_users.instrumentation" logger.
+    """
+    def __call__(self, recording):
+        logger.info(
+            f"{recording.name}: " + ", ".join(
+                f"{stage.name}={stage.duration * 1000:.1f}ms ({stage.n_queries} queries)"
+                for stage in recording.stages
+            )
+        )
+
+
+class StatsdSink:
+    """
+    Sends each stage's duration (as a timer) & number of queries (as a histogram) to a
+    statsd-compatible collector over UDP, as "<prefix>.<recording>.<stage>.duration|queries".
+    The collector is at ASTROSAT_USERS_INSTRUMENTATION_STATSD_ADDRESS ("host:port").
+    """
+    def __init__(self, address=None, prefix="astrosat_users"):
+        host, _, port = (
+            address or app_settings.ASTROSAT_USERS_INSTRUMENTATION_STATSD_ADDRESS
+        ).rpartition(":")
+        self.address = (host or "localhost", int(port))
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, recording):
+        metrics = []
+        for stage in recording.stages:
+            metric_name = f"{self.prefix}.{recording.name}.{stage.name}"
+            metrics.append(f"{metric_name}.duration:{stage.duration * 1000:.3f}|ms")
+            metrics.append(f"{metric_name}.queries:{stage.n_queries}|h")
+        try:
+            self.socket.sendto("\n".join(metrics).encode(), self.address)
+        except OSError:
+            # (metrics are fire-and-forget; a missing collector isn't an error)
+            pass
@@ -0,0 +1,154 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldError, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+
+def parse_filter(filter_string):
+    """
+    Turns a string like "is_active=true" or "roles__name__in=a,b" into a Q object.
+    """
+    try:
+        key, value = filter_string.split("=", 1)
+    except ValueError:
+        raise CommandError(f"Invalid filter '{filter_string}'; filters look like 'key=value'.")
+    if key.endswith("__in"):
+        value = value.split(",")
+    elif value.lower() in ("true", "false"):
+        value = value.lower() == "true"
+    elif value.lower() in ("none", "null"):
+        value = None
+    return Q(**{key: value})
+
+
+class UserSelectionCommand(BaseCommand):
+    """
+    A base class for commands that act on a selection of users
+    (rather than a single user); subclasses call `get_users()` to
+    get a queryset of all users matching the command-line options.
+    """
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--username",
+            dest="usernames",
+            nargs="+",
+            default=[],
+            help="Select users by username.",
+        )
+
+        parser.add_argument(
+            "--from-file",
+            dest="username_files",
+            nargs="+",
+            default=[],
+            help="Select users by the usernames in these files (one per line; blank lines & lines starting w/ '#' are ignored).",
+        )
+
+        parser.add_argument(
+            "--customer",
+            dest="customers",
+            nargs="+",
+            default=[],
+            help="Select all members of these customers (by name).",
+        )
+
+        parser.add_argument(
+            "--email-domain",
+            dest="email_domains",
+            nargs="+",
+            default=[],
+            help="Select all users w/ email addresses in these domains.",
+        )
+
+        parser.add_argument(
+            "--filter",
+            dest="filters",
+            nargs="+",
+            default=[],
+            help="Select users w/ queryset filters, like 'is_active=false' or 'roles__name__in=a,b'.",
+        )
+
+        parser.add_argument(
+            "--all",
+            dest="all_users",
+            action="store_true",
+            help="Select all users.",
+        )
+
+    def get_user_filters(self, options):
+        """
+        Returns a list of Q objects (one per option) to select users with;
+        subclasses can extend this to add more ways of selecting users.
+        """
+        user_filters = []
+
+        usernames = options["usernames"] + self.read_usernames(options["username_files"])
+        if usernames:
+            UserModel = get_user_model()
+            missing_usernames = set(usernames).difference(
+                UserModel.objects.filter(username__in=usernames).values_list(
+                    "username", flat=True
+                )
+            )
+            if missing_usernames:
+                msg = f"Unable to find users '{', '.join(sorted(missing_usernames))}'."
+                raise CommandError(msg)
+            user_filters.append(Q(username__in=usernames))
+
+        if options["customers"]:
+            user_filters.append(Q(customers__name__in=options["customers"]))
+
+        if options["email_domains"]:
+            user_filters.append(
+                reduce(
+                    or_,
+                    (
+                        Q(email__iendswith=f"@{email_domain.lstrip('@')}")
+                        for email_domain in options["email_domains"]
+                    ),
+                )
+            )
+
+        for filter_string in options["filters"]:
+            user_filters.append(parse_filter(filter_string))
+
+        return user_filters
+
+    def read_usernames(self, paths):
+        usernames = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    usernames.extend(
+                        line.strip() for line in f
+                        if line.strip() and not line.strip().startswith("#")
+                    )
+            except OSError as e:
+                raise CommandError(f"Unable to read '{path}': {e}")
+        return usernames
+
+    def get_users(self, options):
+        """
+        Returns the users matching all of the selection options.
+        """
+        UserModel = get_user_model()
+
+        if options["all_users"]:
+            return UserModel.objects.all()
+
+        user_filters = self.get_user_filters(options)
+        if not user_filters:
+            raise CommandError("No users selected; use --username, --from-file, --customer, --email-domain, --filter or --all.")
+
+        # (filtering on customers can match a user more than once, so use a subquery
+        # rather than `.distinct()`, which would prevent calling `.update()` or `.delete()`)
+        try:
+            return UserModel.objects.filter(
+                pk__in=UserModel.objects.filter(reduce(and_, user_filters)).values("pk")
+            )
+        except (FieldError, ValidationError, ValueError) as e:
+            raise CommandError(f"Invalid filter: {e}")
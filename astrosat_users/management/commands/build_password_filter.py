@@ -0,0 +1,86 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from astrosat_users.conf import app_settings
+from astrosat_users.password_filter import build_password_filter
+
+
+def read_passwords(path, encoding):
+    """
+    Yields the (non-blank) passwords in path, one per line.
+    """
+    # (password lists are often not valid utf-8, so undecodable bytes are ignored)
+    with open(path, encoding=encoding, errors="ignore") as f:
+        for line in f:
+            password = line.rstrip("\r\n")
+            if password:
+                yield password
+
+
+class Command(BaseCommand):
+    """
+    Builds the filter of common/breached passwords used by BreachedPasswordValidator
+    (and StrengthPasswordValidator) from a list of passwords.  The list is read twice
+    (once to size the filter, once to fill it) so it is never held in memory.
+    """
+
+    help = "Build a filter of common/breached passwords from a file w/ one password per line."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("path", help="The list of passwords.")
+
+        parser.add_argument(
+            "--output",
+            dest="output",
+            default=app_settings.ASTROSAT_USERS_PASSWORD_FILTER_PATH,
+            help="Where to write the filter (defaults to ASTROSAT_USERS_PASSWORD_FILTER_PATH).",
+        )
+
+        parser.add_argument(
+            "--false-positive-rate",
+            dest="false_positive_rate",
+            type=float,
+            default=0.001,
+            help="The proportion of passwords not in the list that will be (wrongly) rejected.",
+        )
+
+        parser.add_argument(
+            "--encoding",
+            dest="encoding",
+            default="utf-8",
+            help="The encoding of the list of passwords.",
+        )
+
+    def handle(self, *args, **options):
+
+        path = options["path"]
+        output = options["output"]
+        false_positive_rate = options["false_positive_rate"]
+        encoding = options["encoding"]
+
+        if not os.path.exists(path):
+            raise CommandError(f"Unable to find '{path}'.")
+        if not output:
+            raise CommandError(
+                "Either pass --output or set ASTROSAT_USERS_PASSWORD_FILTER_PATH."
+            )
+        if not 0 < false_positive_rate < 1:
+            raise CommandError("--false-positive-rate must be between 0 and 1.")
+
+        start_time = time.monotonic()
+
+        n_passwords = sum(1 for _ in read_passwords(path, encoding))
+        n_added, n_bits, n_hashes = build_password_filter(
+            read_passwords(path, encoding),
+            output,
+            n_passwords,
+            false_positive_rate=false_positive_rate,
+        )
+
+        self.stdout.write(
+            f"Added {n_added} passwords to '{output}' ({filesizeformat(os.path.getsize(output))}, {n_hashes} hashes) in {time.monotonic() - start_time:.1f} seconds."
+        )
@@ -0,0 +1,213 @@
+import os
+import re
+from datetime import timedelta
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+from astrosat_users.models import Customer, MessageAttachment, User
+from astrosat_users.renditions import RENDITION_FORMATS
+from astrosat_users.storage import delete_files
+
+# the storage prefixes that the upload_to functions of astrosat_users write to
+# (message attachments are stored under "users/<username>/messages/")
+UPLOAD_PREFIXES = ["users/", "customers/"]
+
+# the (model, field) pairs that reference files under those prefixes
+FILE_FIELDS = [
+    (User, "avatar"),
+    (Customer, "logo"),
+    (MessageAttachment, "file"),
+]
+
+RENDITION_REGEX = re.compile(
+    r"^(?P<root>.+)_\d+\.(?:" + "|".join(RENDITION_FORMATS.keys()) + r")$"
+)
+
+
+def walk_storage(storage, path):
+    """
+    Yields the names of all files below path, in sorted order; this is a generator
+    so only one directory listing is held in memory at a time.
+    """
+    try:
+        directories, files = storage.listdir(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    # (a directory's contents sort as if its name ended w/ "/")
+    entries = sorted(
+        [(file, False) for file in files] +
+        [(f"{directory}/", True) for directory in directories]
+    )
+    for entry, is_directory in entries:
+        if is_directory:
+            yield from walk_storage(storage, os.path.join(path, entry.rstrip("/")))
+        else:
+            yield os.path.join(path, entry)
+
+
+def get_storages():
+    """
+    Returns a list of (storage, [(model, field_name), ...]) for the distinct storages
+    used by FILE_FIELDS.
+    """
+    storages = []
+    for model, field_name in FILE_FIELDS:
+        storage = model._meta.get_field(field_name).storage
+        for other_storage, file_fields in storages:
+            if other_storage is storage:
+                file_fields.append((model, field_name))
+                break
+        else:
+            storages.append((storage, [(model, field_name)]))
+    return storages
+
+
+def get_referenced_names(file_fields, names, roots=()):
+    """
+    Returns the subset of names (plus any names starting w/ "<root>." for
+    one of roots) that are referenced by one of file_fields.
+    """
+    referenced_names = set()
+    for model, field_name in file_fields:
+        filter = reduce(
+            or_,
+            (Q(**{f"{field_name}__startswith": f"{root}."}) for root in roots),
+            Q(**{f"{field_name}__in": names}),
+        )
+        referenced_names.update(
+            model.objects.filter(filter).values_list(field_name, flat=True)
+        )
+    return referenced_names
+
+
+class Command(BaseCommand):
+    """
+    Finds (and optionally deletes) files in storage that are no longer referenced by
+    any model; these are left behind by queryset deletes, cascades & replaced avatars.
+    Storage is listed incrementally (in sorted order) and checked against the db in
+    batches, so memory use is bounded by --batch-size rather than by the number of files.
+    """
+
+    help = "Report (or delete) orphaned avatars, logos & message attachments."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            dest="delete",
+            help="Delete orphaned files (the default is just to report them).",
+        )
+
+        parser.add_argument(
+            "--min-age",
+            dest="min_age",
+            type=int,
+            default=60,
+            help="Ignore files modified w/in this many minutes (to avoid racing uploads whose objects haven't been saved yet).",
+        )
+
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=500,
+            help="The number of files to check against the db at a time.",
+        )
+
+        parser.add_argument(
+            "--prefix",
+            dest="prefixes",
+            nargs="+",
+            default=UPLOAD_PREFIXES,
+            help="The storage prefixes to check.",
+        )
+
+    def handle(self, *args, **options):
+
+        delete = options["delete"]
+        min_age = timedelta(minutes=options["min_age"])
+        batch_size = options["batch_size"]
+        prefixes = options["prefixes"]
+
+        cutoff = timezone.now() - min_age
+
+        n_checked = n_orphaned = orphaned_size = 0
+
+        for storage, file_fields in get_storages():
+            for prefix in prefixes:
+                names = walk_storage(storage, prefix.rstrip("/"))
+                previous_batch = []
+                while True:
+                    batch = list(islice(names, batch_size))
+                    if not batch:
+                        break
+                    n_checked += len(batch)
+                    orphaned_names = [
+                        name for name in self.get_orphaned_names(file_fields, batch, previous_batch)
+                        if self.is_old_enough(storage, name, cutoff)
+                    ]
+                    for name in orphaned_names:
+                        try:
+                            orphaned_size += storage.size(name)
+                        except (FileNotFoundError, NotImplementedError):
+                            pass
+                        if options["verbosity"] > 1:
+                            self.stdout.write(f"{'deleted' if delete else 'orphaned'}: {name}")
+                    if delete and orphaned_names:
+                        delete_files(storage, orphaned_names)
+                    n_orphaned += len(orphaned_names)
+                    previous_batch = batch
+
+        self.stdout.write(
+            f"Checked {n_checked} files; {'deleted' if delete else 'found'} {n_orphaned} orphaned files ({filesizeformat(orphaned_size)})."
+        )
+
+    def get_orphaned_names(self, file_fields, names, previous_names):
+        rendition_roots = {}
+        for name in names:
+            match = RENDITION_REGEX.match(name)
+            if match:
+                rendition_roots[name] = match.group("root")
+        roots = set(rendition_roots.values())
+
+        # an unreferenced name might still be a rendition of a referenced file; that file is
+        # normally in storage just before its renditions (storage is walked in sorted order),
+        # so it is checked along w/ names (or w/ the previous batch)...
+        candidate_originals = [
+            name for name in previous_names if os.path.splitext(name)[0] in roots
+        ]
+        referenced_names = get_referenced_names(file_fields, names + candidate_originals)
+        referenced_roots = {os.path.splitext(name)[0] for name in referenced_names}
+
+        # and otherwise it is looked for by prefix...
+        unresolved_roots = roots - referenced_roots
+        if unresolved_roots:
+            referenced_roots.update(
+                os.path.splitext(name)[0]
+                for name in get_referenced_names(file_fields, [], roots=unresolved_roots)
+            )
+
+        return [
+            name for name in names
+            if name not in referenced_names and rendition_roots.get(name) not in referenced_roots
+        ]
+
+    def is_old_enough(self, storage, name, cutoff):
+        try:
+            modified_time = storage.get_modified_time(name)
+        except FileNotFoundError:
+            # it has already gone
+            return False
+        except NotImplementedError:
+            # the storage can't say; only collect it if the user opted out of the age check
+            return cutoff >= timezone.now()
+        if timezone.is_naive(modified_time):
+            modified_time = timezone.make_aware(modified_time)
+        return modified_time <= cutoff
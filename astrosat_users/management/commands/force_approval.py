@@ -1,34 +1,20 @@
-from django.core.management.base import BaseCommand, CommandError
+from astrosat_users.management.commands._base import UserSelectionCommand
 
-from astrosat_users.models import User
 
-
-class Command(BaseCommand):
+class Command(UserSelectionCommand):
     """
-    Allows me to force a user to be approved.
+    Allows me to force users to be approved
+    (all of the selected users are updated w/ a single query).
     """
 
-    help = "Force approval of a user"
-
-    def add_arguments(self, parser):
-
-        parser.add_argument(
-            "--username",
-            required=True,
-            dest="username",
-            help="The username to approve.",
-        )
+    help = "Force approval of the selected users."
 
     def handle(self, *args, **options):
 
-        username = options["username"]
+        users = self.get_users(options)
 
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            msg = f"Unable to find user '{username}'."
-            raise CommandError(msg)
+        n_approved = users.filter(is_approved=False).update(is_approved=True)
 
-        if not user.is_approved:
-            user.is_approved = True
-            user.save()
+        self.stdout.write(
+            f"Approved {n_approved} users ({users.count() - n_approved} were already approved)."
+        )
@@ -1,25 +1,21 @@
-from itertools import chain
-
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+
+from astrosat_users.management.commands._base import UserSelectionCommand
 
 
-class Command(BaseCommand):
+class Command(UserSelectionCommand):
     """
-    Allows me to force a user to be members of the specified groups.
+    Allows me to force users to be members of the specified groups
+    (the memberships are inserted in bulk, so no `m2m_changed` signals are sent).
     """
 
-    help = "Force user membership to the specified groups."
+    help = "Force the selected users' membership to the specified groups."
 
     def add_arguments(self, parser):
 
-        parser.add_argument(
-            "--username",
-            required=True,
-            dest="username",
-            help="The username to verify."
-        )
+        super().add_arguments(parser)
 
         parser.add_argument(
             "--groups",
@@ -38,31 +34,42 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
 
-        username = options["username"]
         group_names = options["group_names"]
         is_regex = options["is_regex"]
 
-        try:
-            UserModel = get_user_model()
-            user = UserModel.objects.get(username=username)
-        except UserModel.DoesNotExist:
-            msg = f"Unable to find user '{username}'."
-            raise CommandError(msg)
+        users = self.get_users(options)
 
         if is_regex:
             filter_expr = "name__iregex"
         else:
             filter_expr = "name__iexact"
 
-        groups = []
+        groups = {}
         for group_name in group_names:
             filtered_groups = Group.objects.filter(**{filter_expr: group_name})
             if not filtered_groups.exists():
                 msg = f"Unable to find any groups matching '{group_name}'"
                 raise CommandError(msg)
-            groups.append(filtered_groups)
+            groups.update({group.pk: group for group in filtered_groups})
+
+        UserGroups = get_user_model().groups.through
+        user_ids = list(users.values_list("pk", flat=True))
+        existing_memberships = set(
+            UserGroups.objects.filter(
+                user_id__in=user_ids, group_id__in=list(groups)
+            ).values_list("user_id", "group_id")
+        )
+        new_memberships = UserGroups.objects.bulk_create(
+            [
+                UserGroups(user_id=user_id, group_id=group_id)
+                for user_id in user_ids
+                for group_id in groups.keys()
+                if (user_id, group_id) not in existing_memberships
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
 
-        user.groups.add(*chain.from_iterable(groups))
         self.stdout.write(
-            f"successfully assigned user '{user}' to groups: '{', '.join([group.name for group in chain.from_iterable(groups)])}'."
+            f"successfully added {len(new_memberships)} memberships for {len(user_ids)} users to groups: '{', '.join(sorted(group.name for group in groups.values()))}'."
         )
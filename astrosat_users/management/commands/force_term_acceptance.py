@@ -1,34 +1,20 @@
-from django.core.management.base import BaseCommand, CommandError
+from astrosat_users.management.commands._base import UserSelectionCommand
 
-from astrosat_users.models import User
 
-
-class Command(BaseCommand):
+class Command(UserSelectionCommand):
     """
-    Allows me to force a user to have accepted terms & conditions.
+    Allows me to force users to have accepted terms & conditions
+    (all of the selected users are updated w/ a single query).
     """
 
-    help = "Force term acceptance of a user"
-
-    def add_arguments(self, parser):
-
-        parser.add_argument(
-            "--username",
-            required=True,
-            dest="username",
-            help="The username to approve.",
-        )
+    help = "Force term acceptance of the selected users."
 
     def handle(self, *args, **options):
 
-        username = options["username"]
+        users = self.get_users(options)
 
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            msg = f"Unable to find user '{username}'."
-            raise CommandError(msg)
+        n_accepted = users.filter(accepted_terms=False).update(accepted_terms=True)
 
-        if not user.accepted_terms:
-            user.accepted_terms = True
-            user.save()
+        self.stdout.write(
+            f"Accepted terms for {n_accepted} users ({users.count() - n_accepted} had already accepted terms)."
+        )
@@ -1,35 +1,22 @@
-from django.core.management.base import BaseCommand, CommandError
-from allauth.account.models import EmailAddress
+from astrosat_users.management.commands._base import UserSelectionCommand
 
-from astrosat_users.models import User
 
-
-class Command(BaseCommand):
+class Command(UserSelectionCommand):
     """
-    Allows me to force a user's primary email address to be verified,
-    as if they had replied to the email confirmation message.
+    Allows me to force users' primary email addresses to be verified,
+    as if they had replied to the email confirmation message
+    (any missing email addresses are created in bulk).
     """
 
-    help = "Force verification of a user's primary email address."
-
-    def add_arguments(self, parser):
-
-        parser.add_argument(
-            "--username",
-            required=True,
-            dest="username",
-            help="The username to verify."
-        )
+    help = "Force verification of the selected users' primary email addresses."
 
     def handle(self, *args, **options):
 
-        username = options["username"]
+        users = self.get_users(options)
 
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            msg = f"Unable to find user '{username}'."
-            raise CommandError(msg)
+        n_already_verified = users.get_emailaddresses().filter(verified=True).count()
+        n_created, n_verified, _ = users.set_verified(True)
 
-        if not user.is_verified:
-            user.verify()
+        self.stdout.write(
+            f"Verified {n_verified - n_already_verified} email addresses ({n_created} created; {n_already_verified} were already verified)."
+        )
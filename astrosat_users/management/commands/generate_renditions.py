@@ -0,0 +1,55 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+
+from astrosat_users.models import Customer, User
+from astrosat_users.renditions import (
+    generate_renditions,
+    get_rendition_names,
+)
+
+
+class Command(BaseCommand):
+    """
+    Generates renditions of user avatars & customer logos ahead of time;
+    this is required when ASTROSAT_USERS_RENDITION_MODE is "worker", and
+    is optional (but saves the first requests some work) when it is "lazy".
+    """
+
+    help = "Generate renditions of user avatars & customer logos."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            dest="force",
+            help="Regenerate renditions even if they already exist.",
+        )
+
+    def handle(self, *args, **options):
+
+        force = options["force"]
+
+        n_generated = 0
+        field_files = chain(
+            (user.avatar for user in User.objects.only("avatar").iterator()),
+            (customer.logo for customer in Customer.objects.only("logo").iterator()),
+        )
+
+        for field_file in field_files:
+            if not field_file:
+                continue
+            if not force and all(
+                field_file.storage.exists(rendition_name)
+                for rendition_name in get_rendition_names(field_file.name)
+            ):
+                continue
+            if generate_renditions(field_file):
+                n_generated += 1
+            else:
+                self.stdout.write(
+                    self.style.WARNING(f"Unable to generate renditions of '{field_file.name}'.")
+                )
+
+        self.stdout.write(f"Generated renditions for {n_generated} images.")
@@ -0,0 +1,356 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_datetime
+
+from allauth.account.models import EmailAddress
+
+from astrosat_users.exports import CSV_LIST_SEPARATOR, split_csv_list, unescape_csv_value
+from astrosat_users.models import Customer, CustomerUser, User, UserRole
+from astrosat_users.models.models_customers import CustomerUserStatus, CustomerUserType
+
+# the columns (or NDJSON keys) that can be imported; this is a superset of
+# the columns of a user export (see astrosat_users.exports), so an export
+# can be imported as-is ("uuid" & "permissions" are ignored)
+BOOLEAN_FIELDS = ["is_active", "is_approved", "accepted_terms", "onboarded"]
+STRING_FIELDS = ["name", "phone", "description"]
+DATETIME_FIELDS = ["date_joined", "last_login"]
+
+TRUE_VALUES = ("true", "t", "yes", "y", "1")
+FALSE_VALUES = ("false", "f", "no", "n", "0", "")
+
+
+def parse_bool(value):
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def parse_list(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in split_csv_list(value or "") if item.strip()]
+
+
+def read_rows(path, file_format):
+    """
+    Yields a dictionary for each row of a CSV or NDJSON file (one at a time).
+    """
+    with open(path, newline="") as f:
+        if file_format == "csv":
+            # (undoing the escaping of exported values; see astrosat_users.exports)
+            for row in csv.DictReader(f):
+                yield {key: unescape_csv_value(value) for key, value in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# password hashing is deliberately slow, so it is shared among a pool of
+# processes; they just need Django set up enough to read PASSWORD_HASHERS
+
+
+def _init_worker(settings_module):
+    if settings_module:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+class Command(BaseCommand):
+    """
+    Imports users (w/ their email addresses, roles & customers) from a CSV or NDJSON file.
+    Unlike creating users one at a time (which hashes each password & saves each object
+    in turn) the file is read in chunks, the passwords of each chunk are hashed in parallel,
+    and everything is inserted w/ a handful of `bulk_create` calls per chunk.
+    Note that this means no `post_save` or `m2m_changed` signals are sent.
+    """
+
+    help = (
+        "Import users from a CSV or NDJSON file w/ the columns: username, email, password "
+        "(or password_hash), name, phone, description, is_active, is_approved, accepted_terms, "
+        "onboarded, is_verified, registration_stage, date_joined, last_login, roles & customers "
+        f"(roles & customers are names separated by '{CSV_LIST_SEPARATOR}' in CSV or lists in NDJSON); "
+        "only email is required."
+    )
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("path", help="The CSV or NDJSON file to import.")
+
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=["csv", "ndjson"],
+            help="The format of the file (by default this is guessed from its extension).",
+        )
+
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=1000,
+            help="The number of rows to insert at a time.",
+        )
+
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="The number of processes used to hash passwords (0 hashes them in this process).",
+        )
+
+        parser.add_argument(
+            "--checkpoint",
+            dest="checkpoint",
+            help="A file recording how many rows have been imported; if it exists, those rows are skipped (so an interrupted import can be resumed).",
+        )
+
+    def handle(self, *args, **options):
+
+        path = options["path"]
+        file_format = options["file_format"] or (
+            "csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson"
+        )
+        batch_size = options["batch_size"]
+        checkpoint = options["checkpoint"]
+        verbosity = options["verbosity"]
+
+        if not os.path.exists(path):
+            raise CommandError(f"Unable to find '{path}'.")
+
+        self.role_ids = dict(UserRole.objects.values_list("name", "pk"))
+        self.customer_ids = dict(Customer.objects.values_list("name", "pk"))
+
+        n_skipped_rows = self.read_checkpoint(checkpoint)
+        rows = enumerate(read_rows(path, file_format), start=1)
+        if n_skipped_rows:
+            self.stdout.write(f"Resuming after row {n_skipped_rows}.")
+            rows = islice(rows, n_skipped_rows, None)
+
+        executor = None
+        self.n_workers = options["workers"]
+        if self.n_workers > 0:
+            executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(getattr(settings, "SETTINGS_MODULE", None), ),
+            )
+
+        n_rows = n_imported = n_errors = 0
+        start_time = time.monotonic()
+        try:
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+
+                users, errors = self.prepare_users(chunk)
+                self.hash_passwords(users, executor)
+                with transaction.atomic():
+                    self.create_users(users)
+
+                n_rows += len(chunk)
+                n_imported += len(users)
+                n_errors += len(errors)
+                self.write_checkpoint(checkpoint, chunk[-1][0])
+
+                for row_number, error in errors:
+                    self.stderr.write(f"row {row_number}: {error}")
+                if verbosity > 1:
+                    self.stdout.write(
+                        f"...{chunk[-1][0]} rows read ({self.get_rate(n_rows, start_time):.0f} rows/sec)"
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(
+            f"Imported {n_imported} users from {n_rows} rows ({n_errors} errors) in {time.monotonic() - start_time:.1f} seconds ({self.get_rate(n_rows, start_time):.0f} rows/sec)."
+        )
+
+    def get_rate(self, n_rows, start_time):
+        return n_rows / max(time.monotonic() - start_time, 1e-6)
+
+    def read_checkpoint(self, checkpoint):
+        if checkpoint and os.path.exists(checkpoint):
+            try:
+                with open(checkpoint) as f:
+                    return int(f.read().strip() or 0)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Unable to read checkpoint '{checkpoint}': {e}")
+        return 0
+
+    def write_checkpoint(self, checkpoint, row_number):
+        # (written to a temporary file & then renamed, so it is never left half-written)
+        if checkpoint:
+            tmp_checkpoint = f"{checkpoint}.tmp"
+            with open(tmp_checkpoint, "w") as f:
+                f.write(str(row_number))
+            os.replace(tmp_checkpoint, checkpoint)
+
+    def prepare_users(self, chunk):
+        """
+        Validates a chunk of (row_number, row) pairs; returns a list of (user, row)
+        pairs (for the rows that can be imported) and a list of (row_number, error) pairs.
+        """
+        users = []
+        errors = []
+
+        # users that already exist (or appear earlier in this chunk) are errors;
+        # checking for them up-front avoids IntegrityErrors during bulk_create
+        usernames = set()
+        emails = set()
+        for _, row in chunk:
+            email = User.objects.normalize_email((row.get("email") or "").strip())
+            usernames.add(User.normalize_username((row.get("username") or "").strip() or email))
+            emails.add(email.lower())
+        existing_usernames = set(
+            User.objects.filter(username__in=usernames).values_list("username", flat=True)
+        )
+        # (emails are compared case-insensitively, since existing ones may not be lowercase)
+        existing_emails = set(
+            EmailAddress.objects.annotate(email_lower=Lower("email")).filter(
+                email_lower__in=emails
+            ).values_list("email_lower", flat=True)
+        ) | set(
+            User.objects.annotate(email_lower=Lower("email")).filter(
+                email_lower__in=emails
+            ).values_list("email_lower", flat=True)
+        )
+
+        for row_number, row in chunk:
+            try:
+                user = self.prepare_user(row)
+            except (KeyError, ValueError, ValidationError) as e:
+                errors.append((row_number, e))
+                continue
+            if user.username in existing_usernames:
+                errors.append((row_number, f"username '{user.username}' already exists"))
+                continue
+            if user.email.lower() in existing_emails:
+                errors.append((row_number, f"email '{user.email}' already exists"))
+                continue
+            existing_usernames.add(user.username)
+            existing_emails.add(user.email.lower())
+            users.append((user, row))
+
+        return users, errors
+
+    def prepare_user(self, row):
+        email = User.objects.normalize_email((row.get("email") or "").strip())
+        if not email:
+            raise ValueError("an email is required")
+        username = User.normalize_username((row.get("username") or "").strip() or email)
+
+        user = User(username=username, email=email)
+        for field_name in STRING_FIELDS:
+            if row.get(field_name):
+                setattr(user, field_name, row[field_name])
+        for field_name in BOOLEAN_FIELDS:
+            if row.get(field_name) not in (None, ""):
+                setattr(user, field_name, parse_bool(row[field_name]))
+        for field_name in DATETIME_FIELDS:
+            if row.get(field_name):
+                value = parse_datetime(str(row[field_name]))
+                if value is None:
+                    raise ValueError(f"invalid {field_name} '{row[field_name]}'")
+                setattr(user, field_name, value)
+        # (not a User field; it is used when creating the user's primary EmailAddress)
+        user._is_verified = parse_bool(row.get("is_verified"))
+        if row.get("registration_stage"):
+            user.registration_stage = row["registration_stage"]
+
+        for role_name in parse_list(row.get("roles")):
+            if role_name not in self.role_ids:
+                raise ValueError(f"unknown role '{role_name}'")
+        for customer_name in parse_list(row.get("customers")):
+            if customer_name not in self.customer_ids:
+                raise ValueError(f"unknown customer '{customer_name}'")
+
+        password_hash = row.get("password_hash")
+        if password_hash:
+            identify_hasher(password_hash)  # (raises ValueError if it's not a valid hash)
+            user.password = password_hash
+        elif not row.get("password"):
+            user.set_unusable_password()
+
+        # (this checks field lengths, choices, etc; uniqueness is checked per chunk)
+        user.full_clean(exclude=["password"], validate_unique=False)
+        return user
+
+    def hash_passwords(self, users, executor):
+        users_with_passwords = [
+            (user, row["password"]) for user, row in users
+            if row.get("password") and not row.get("password_hash")
+        ]
+        passwords = [password for _, password in users_with_passwords]
+        if executor is None:
+            password_hashes = map(_hash_password, passwords)
+        else:
+            chunksize = max(1, len(passwords) // (self.n_workers * 4))
+            password_hashes = executor.map(_hash_password, passwords, chunksize=chunksize)
+        for (user, _), password_hash in zip(users_with_passwords, password_hashes):
+            user.password = password_hash
+
+    def create_users(self, users):
+        User.objects.bulk_create([user for user, _ in users])
+
+        # (not every db backend sets the pks of objects created in bulk, so read them back)
+        user_ids = dict(
+            User.objects.filter(
+                username__in=[user.username for user, _ in users]
+            ).values_list("username", "pk")
+        )
+
+        email_addresses = []
+        role_links = []
+        customer_users = []
+        for user, row in users:
+            user_id = user_ids[user.username]
+            email_addresses.append(
+                EmailAddress(
+                    user_id=user_id,
+                    email=user.email,
+                    primary=True,
+                    verified=user._is_verified,
+                )
+            )
+            role_links.extend([
+                User.roles.through(user_id=user_id, userrole_id=self.role_ids[role_name])
+                for role_name in set(parse_list(row.get("roles")))
+            ])
+            customer_users.extend([
+                CustomerUser(
+                    user_id=user_id,
+                    customer_id=self.customer_ids[customer_name],
+                    customer_user_type=CustomerUserType.MEMBER,
+                    customer_user_status=CustomerUserStatus.ACTIVE,
+                )
+                for customer_name in set(parse_list(row.get("customers")))
+            ])
+
+        EmailAddress.objects.bulk_create(email_addresses)
+        User.roles.through.objects.bulk_create(role_links)
+        CustomerUser.objects.bulk_create(customer_users)
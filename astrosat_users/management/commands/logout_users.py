@@ -0,0 +1,20 @@
+from astrosat_users.management.commands._base import UserSelectionCommand
+
+
+class Command(UserSelectionCommand):
+    """
+    Logs the selected users out of all sessions at once
+    (ie: to revoke access for a whole customer after a security incident).
+    """
+
+    help = "Log the selected users out of all sessions."
+
+    def handle(self, *args, **options):
+
+        users = self.get_users(options)
+
+        n_tokens, n_sessions = users.logout_all()
+
+        self.stdout.write(
+            f"Logged {users.count()} users out ({n_tokens} tokens and {n_sessions} sessions deleted)."
+        )
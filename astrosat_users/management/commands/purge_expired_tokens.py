@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from knox.models import AuthToken
+
+
+class Command(BaseCommand):
+    """
+    Deletes expired knox tokens.  knox only deletes an expired token when someone
+    tries to use it, so tokens that are never used again stay in the table forever.
+    Tokens are deleted in batches so as not to hold long locks on the table.
+    """
+
+    help = "Delete expired knox tokens."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=1000,
+            help="The number of tokens to delete at a time.",
+        )
+
+    def handle(self, *args, **options):
+
+        batch_size = options["batch_size"]
+        now = timezone.now()
+
+        expired_tokens = AuthToken.objects.filter(expiry__lt=now)
+        n_deleted = 0
+        while True:
+            batch = list(expired_tokens.values_list("pk", flat=True)[:batch_size])
+            if not batch:
+                break
+            n_batch_deleted, _ = AuthToken.objects.filter(pk__in=batch).delete()
+            n_deleted += n_batch_deleted
+            if options["verbosity"] > 1:
+                self.stdout.write(f"...{n_deleted} tokens deleted")
+
+        self.stdout.write(f"Deleted {n_deleted} expired tokens.")
@@ -0,0 +1,339 @@
+import json
+import os
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from astrosat_users.models import UserPermission, UserRole
+from astrosat_users.models.models_roles import get_ancestor_ids
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+EXAMPLE_SPEC = """
+{
+  "permissions": [
+    {"name": "can-view", "description": "optional"},
+    "can-edit"
+  ],
+  "roles": [
+    {"name": "Viewer", "permissions": ["can-view"]},
+    {"name": "Editor", "description": "optional", "permissions": ["can-edit"], "parents": ["Viewer"]}
+  ]
+}
+"""
+
+
+def normalize_spec_items(items):
+    """
+    Spec items can be just a name or a dictionary w/ a name;
+    returns a dictionary of {name: item}.
+    """
+    normalized_items = {}
+    for item in items or []:
+        if isinstance(item, str):
+            item = {"name": item}
+        try:
+            normalized_items[item["name"]] = item
+        except (KeyError, TypeError):
+            raise CommandError(f"Invalid spec item: {item}.")
+    return normalized_items
+
+
+def diff_links(desired_links, existing_links):
+    return desired_links - existing_links, existing_links - desired_links
+
+
+class Command(BaseCommand):
+    """
+    Makes the UserRoles & UserPermissions in the db match a spec file (JSON or YAML).
+    Unlike `loaddata`, this diffs the spec against the db w/ a handful of queries and
+    then only inserts/deletes what has changed (in bulk).  The permissions & parents
+    of each role in the spec are set to exactly those in the spec.
+    """
+
+    help = f"Sync UserRoles & UserPermissions w/ a spec file, like: {EXAMPLE_SPEC}"
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("spec", help="The JSON or YAML file to sync with.")
+
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            dest="dry_run",
+            help="Report what would change w/out changing anything.",
+        )
+
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            dest="prune",
+            help="Also delete any roles & permissions that are not in the spec.",
+        )
+
+    def handle(self, *args, **options):
+
+        spec = self.load_spec(options["spec"])
+        dry_run = options["dry_run"]
+        prune = options["prune"]
+
+        spec_roles = normalize_spec_items(spec.get("roles"))
+        spec_permissions = normalize_spec_items(spec.get("permissions"))
+        for spec_role in spec_roles.values():
+            # (permissions used by roles don't have to be listed separately)
+            for permission_name in spec_role.get("permissions", []):
+                spec_permissions.setdefault(permission_name, {"name": permission_name})
+
+        # read the current state of the db...
+
+        existing_permissions = {
+            name: (pk, description)
+            for pk, name, description in UserPermission.objects.values_list("pk", "name", "description")
+        }
+        existing_roles = {
+            name: (pk, description)
+            for pk, name, description in UserRole.objects.values_list("pk", "name", "description")
+        }
+        permission_names = {pk: name for name, (pk, _) in existing_permissions.items()}
+        role_names = {pk: name for name, (pk, _) in existing_roles.items()}
+        existing_permission_links = {
+            (role_names[role_id], permission_names[permission_id])
+            for role_id, permission_id in UserRole.permissions.through.objects.values_list("userrole_id", "userpermission_id")
+        }
+        existing_parent_links = {
+            (role_names[role_id], role_names[parent_id])
+            for role_id, parent_id in UserRole.parents.through.objects.values_list("from_userrole_id", "to_userrole_id")
+        }
+
+        # work out what needs to change...
+
+        permissions_to_create = [
+            name for name in spec_permissions if name not in existing_permissions
+        ]
+        for name in permissions_to_create:
+            try:
+                UserPermission._meta.get_field("name").run_validators(name)
+            except ValidationError as e:
+                raise CommandError(f"Invalid permission '{name}': {' '.join(e.messages)}")
+        permissions_to_update = [
+            name for name, item in spec_permissions.items()
+            if name in existing_permissions and "description" in item and item["description"] != existing_permissions[name][1]
+        ]
+        permissions_to_delete = [
+            name for name in existing_permissions if name not in spec_permissions
+        ] if prune else []
+
+        roles_to_create = [name for name in spec_roles if name not in existing_roles]
+        roles_to_update = [
+            name for name, item in spec_roles.items()
+            if name in existing_roles and "description" in item and item["description"] != existing_roles[name][1]
+        ]
+        roles_to_delete = [
+            name for name in existing_roles if name not in spec_roles
+        ] if prune else []
+
+        all_role_names = set(spec_roles) | (set(existing_roles) - set(roles_to_delete))
+        for spec_role in spec_roles.values():
+            for parent_name in spec_role.get("parents", []):
+                if parent_name not in all_role_names:
+                    raise CommandError(
+                        f"Role '{spec_role['name']}' has an unknown parent '{parent_name}'."
+                    )
+
+        permission_links_to_add, permission_links_to_remove = diff_links(
+            {
+                (name, permission_name)
+                for name, item in spec_roles.items()
+                for permission_name in item.get("permissions", [])
+            },
+            {link for link in existing_permission_links if link[0] in spec_roles},
+        )
+        parent_links_to_add, parent_links_to_remove = diff_links(
+            {
+                (name, parent_name)
+                for name, item in spec_roles.items()
+                for parent_name in item.get("parents", [])
+            },
+            {link for link in existing_parent_links if link[0] in spec_roles},
+        )
+
+        self.check_cycles(
+            {
+                link for link in existing_parent_links - parent_links_to_remove
+                if not set(link).intersection(roles_to_delete)
+            } | parent_links_to_add
+        )
+
+        changes = [
+            ("permissions created", permissions_to_create),
+            ("permissions updated", permissions_to_update),
+            ("permissions deleted", permissions_to_delete),
+            ("roles created", roles_to_create),
+            ("roles updated", roles_to_update),
+            ("roles deleted", roles_to_delete),
+            ("role permissions added", permission_links_to_add),
+            ("role permissions removed", permission_links_to_remove),
+            ("role parents added", parent_links_to_add),
+            ("role parents removed", parent_links_to_remove),
+        ]
+
+        if not dry_run:
+            with transaction.atomic():
+                self.apply_changes(
+                    spec_permissions,
+                    spec_roles,
+                    permissions_to_create,
+                    permissions_to_update,
+                    permissions_to_delete,
+                    roles_to_create,
+                    roles_to_update,
+                    roles_to_delete,
+                    permission_links_to_add,
+                    permission_links_to_remove,
+                    parent_links_to_add,
+                    parent_links_to_remove,
+                )
+
+        for description, changed in changes:
+            if changed:
+                self.stdout.write(
+                    f"{'would have ' if dry_run else ''}{description}: {len(changed)}"
+                )
+                if options["verbosity"] > 1:
+                    for item in sorted(changed):
+                        self.stdout.write(f"  {item}")
+        if not any(changed for _, changed in changes):
+            self.stdout.write("Nothing to change.")
+
+    def load_spec(self, path):
+        try:
+            with open(path) as f:
+                if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+                    if yaml is None:
+                        raise CommandError("Reading YAML requires PyYAML to be installed.")
+                    return yaml.safe_load(f) or {}
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Unable to read '{path}': {e}")
+
+    def check_cycles(self, parent_links):
+        graph = defaultdict(set)
+        for role_name, parent_name in parent_links:
+            graph[role_name].add(parent_name)
+        for role_name, parent_name in parent_links:
+            if role_name in get_ancestor_ids(graph, parent_name):
+                raise CommandError(
+                    f"Role '{role_name}' cannot inherit from '{parent_name}'; that would create a cycle."
+                )
+
+    def apply_changes(
+        self,
+        spec_permissions,
+        spec_roles,
+        permissions_to_create,
+        permissions_to_update,
+        permissions_to_delete,
+        roles_to_create,
+        roles_to_update,
+        roles_to_delete,
+        permission_links_to_add,
+        permission_links_to_remove,
+        parent_links_to_add,
+        parent_links_to_remove,
+    ):
+        UserPermission.objects.bulk_create([
+            UserPermission(
+                name=name, description=spec_permissions[name].get("description")
+            ) for name in permissions_to_create
+        ])
+        UserRole.objects.bulk_create([
+            UserRole(name=name, description=spec_roles[name].get("description"))
+            for name in roles_to_create
+        ])
+
+        permissions = UserPermission.objects.in_bulk(
+            permissions_to_update + [link[1] for link in permission_links_to_add | permission_links_to_remove],
+            field_name="name",
+        )
+        roles = UserRole.objects.in_bulk(
+            roles_to_update + [name for link in permission_links_to_add | permission_links_to_remove | parent_links_to_add | parent_links_to_remove for name in link],
+            field_name="name",
+        )
+
+        for name in permissions_to_update:
+            permissions[name].description = spec_permissions[name]["description"]
+        UserPermission.objects.bulk_update(
+            [permissions[name] for name in permissions_to_update], ["description"]
+        )
+        for name in roles_to_update:
+            roles[name].description = spec_roles[name]["description"]
+        UserRole.objects.bulk_update(
+            [roles[name] for name in roles_to_update], ["description"]
+        )
+
+        # the through tables are modified directly (w/out sending m2m_changed for every link)...
+
+        PermissionLink = UserRole.permissions.through
+        ParentLink = UserRole.parents.through
+
+        PermissionLink.objects.bulk_create(
+            [
+                PermissionLink(
+                    userrole_id=roles[role_name].pk,
+                    userpermission_id=permissions[permission_name].pk,
+                ) for role_name, permission_name in permission_links_to_add
+            ],
+            ignore_conflicts=True,
+        )
+        if permission_links_to_remove:
+            PermissionLink.objects.filter(
+                reduce(
+                    or_,
+                    (
+                        Q(userrole_id=roles[role_name].pk, userpermission_id=permissions[permission_name].pk)
+                        for role_name, permission_name in permission_links_to_remove
+                    ),
+                )
+            ).delete()
+
+        ParentLink.objects.bulk_create(
+            [
+                ParentLink(
+                    from_userrole_id=roles[role_name].pk,
+                    to_userrole_id=roles[parent_name].pk,
+                ) for role_name, parent_name in parent_links_to_add
+            ],
+            ignore_conflicts=True,
+        )
+        if parent_links_to_remove:
+            ParentLink.objects.filter(
+                reduce(
+                    or_,
+                    (
+                        Q(from_userrole_id=roles[role_name].pk, to_userrole_id=roles[parent_name].pk)
+                        for role_name, parent_name in parent_links_to_remove
+                    ),
+                )
+            ).delete()
+
+        # ...so update the effective permissions (and invalidate any cached user permissions) in one go
+        changed_role_ids = {
+            roles[link[0]].pk
+            for link in permission_links_to_add | permission_links_to_remove | parent_links_to_add | parent_links_to_remove
+        }
+        if changed_role_ids:
+            UserRole.objects.rebuild_effective_permissions(changed_role_ids)
+
+        # (deleting roles & permissions goes through the ORM, so that signals are sent)
+        if roles_to_delete:
+            UserRole.objects.filter(name__in=roles_to_delete).delete()
+        if permissions_to_delete:
+            UserPermission.objects.filter(name__in=permissions_to_delete).delete()
@@ -1,8 +1,16 @@
-from django.contrib.auth.models import BaseUserManager
+from django.contrib.auth.models import UserManager as AuthUserManager
 from django.db import models
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+
+from allauth.account.models import EmailAddress
+
+from knox.models import AuthToken
+
+from astrosat_users.signals import users_logged_out
+from astrosat_users.utils import delete_user_sessions
 
 # Using a custom QuerySet _and_ a custom Manager may seem needlessly complicated.  But I can't just use
-# "QuerySet.as_manager()" w/ AbstractUser b/c I also need to override create_user & create_superuser.
+# "QuerySet.as_manager()" w/ AbstractUser b/c I also need to extend auth's UserManager (create_superuser, etc.)
 # (as per https://docs.djangoproject.com/en/2.2/topics/auth/customizing/#writing-a-manager-for-a-custom-user-model)
 
 
@@ -13,8 +21,132 @@ class UserQuerySet(models.QuerySet):
     def approved(self):
         return self.filter(is_approved=True)
 
+    def with_primary_emailaddress(self):
+        """
+        Annotates each user w/ the email & verification status of their primary EmailAddress
+        ("primary_emailaddress_email" & "primary_emailaddress_verified"); `User.is_verified`
+        uses these, if present, instead of querying EmailAddress.
+        """
+        primary_emailaddresses = EmailAddress.objects.filter(
+            user=OuterRef("pk"), primary=True
+        )
+        return self.annotate(
+            primary_emailaddress_email=Subquery(
+                primary_emailaddresses.values("email")[:1]
+            ),
+            primary_emailaddress_verified=Exists(
+                primary_emailaddresses.filter(verified=True)
+            ),
+        )
+
+    # bulk methods...
+    # (these each use a fixed number of queries regardless of the number of users)
+
+    def toggle(self, field_name):
+        """
+        Negates a boolean field of every user.  Returns the number of users
+        for which the field is now True and the number for which it is now False.
+        """
+        counts = self.aggregate(
+            n_true=Count("pk", filter=Q(**{field_name: False}), distinct=True),
+            n_false=Count("pk", filter=Q(**{field_name: True}), distinct=True),
+        )
+        # (doing this w/ negated F expressions is not supported - https://code.djangoproject.com/ticket/17186)
+        self.model.objects.filter(pk__in=self.values("pk")).update(
+            **{
+                field_name:
+                    Case(
+                        When(**{field_name: True}, then=Value(False)),
+                        default=Value(True),
+                    )
+            }
+        )
+        return (counts["n_true"], counts["n_false"])
+
+    def get_emailaddresses(self):
+        """
+        Returns the primary EmailAddresses of these users (the ones `User.is_verified` checks).
+        """
+        return EmailAddress.objects.filter(user__in=self.values("pk"), primary=True)
+
+    def create_emailaddresses(self):
+        """
+        Gives each user that doesn't have a primary EmailAddress one (as per `User.verify`);
+        the EmailAddress matching their email becomes primary, creating it if needed.
+        Returns the number of EmailAddresses created.
+        """
+        users_without_primary_emailaddresses = self.exclude(
+            Exists(EmailAddress.objects.filter(user=OuterRef("pk"), primary=True))
+        )
+
+        EmailAddress.objects.filter(
+            user__in=users_without_primary_emailaddresses.values("pk"),
+            email=F("user__email"),
+        ).update(primary=True)
+
+        emailaddresses = EmailAddress.objects.bulk_create(
+            [
+                EmailAddress(user_id=user_id, email=email, primary=True)
+                for user_id, email in users_without_primary_emailaddresses.values_list(
+                    "pk", "email"
+                ).distinct()
+            ],
+            batch_size=1000,
+        )
+
+        return len(emailaddresses)
+
+    def set_verified(self, verified=True):
+        """
+        Sets each user's primary EmailAddress as verified or unverified (or toggles
+        it if verified is None), creating it if needed.  Returns the number of EmailAddresses
+        created, the number now verified and the number now unverified.
+        """
+        n_created = self.create_emailaddresses()
+        emailaddresses = self.get_emailaddresses()
+        if verified is None:
+            counts = emailaddresses.aggregate(
+                n_verified=Count("pk", filter=Q(verified=False)),
+                n_unverified=Count("pk", filter=Q(verified=True)),
+            )
+            emailaddresses.update(
+                verified=Case(
+                    When(verified=True, then=Value(False)),
+                    default=Value(True),
+                )
+            )
+            return (n_created, counts["n_verified"], counts["n_unverified"])
+
+        n_updated = emailaddresses.update(verified=verified)
+        return (n_created, n_updated if verified else 0, 0 if verified else n_updated)
+
+    def logout_all(self, request=None):
+        """
+        Logs all users out of all sessions; deletes their tokens (in a single query)
+        and their sessions.  Sends `users_logged_out` once for all of the users.
+        Returns the number of tokens and the number of sessions deleted.
+        """
+        user_ids = set(self.values_list("pk", flat=True))
+        if not user_ids:
+            return (0, 0)
+
+        n_tokens, _ = AuthToken.objects.filter(user__in=self.values("pk")).delete()
+        n_sessions = delete_user_sessions(user_ids)
+
+        users_logged_out.send(
+            sender=self.model, request=request, user_ids=user_ids
+        )
+
+        return (n_tokens, n_sessions)
+
 
-class UserManager(BaseUserManager):
+class UserManager(AuthUserManager):
+    """
+    Just like django.contrib.auth's UserManager (so create_user, with_perm, etc. work as usual)
+    but w/ the chainable methods of UserQuerySet, and superusers are always approved.
+    """
+
+    use_in_migrations = True
 
     # chainable methods...
 
@@ -27,36 +159,15 @@ class UserManager(BaseUserManager):
     def approved(self):
         return self.get_queryset().approved()
 
-    # special user methods...
-
-    def _create_user(self, username, email, password, **extra_fields):
-        """
-        Create and save a user with the given username, email, and password.
-        """
-        if not username:
-            raise ValueError("The given username must be set")
-        email = self.normalize_email(email)
-        username = self.model.normalize_username(username)
-        user = self.model(username=username, email=email, **extra_fields)
-        user.set_password(password)
-        user.save(using=self._db)
-        return user
+    def with_primary_emailaddress(self):
+        return self.get_queryset().with_primary_emailaddress()
 
-    def create_user(self, username, email=None, password=None, **extra_fields):
-        extra_fields.setdefault("is_staff", False)
-        extra_fields.setdefault("is_superuser", False)
-        return self._create_user(username, email, password, **extra_fields)
+    # special user methods...
 
-    def create_superuser(self, username, email, password, **extra_fields):
-        extra_fields.setdefault("is_staff", True)
-        extra_fields.setdefault("is_superuser", True)
+    def create_superuser(self, username, email=None, password=None, **extra_fields):
         extra_fields.setdefault("is_approved", True)
 
-        if extra_fields.get("is_staff") is not True:
-            raise ValueError("Superuser must have is_staff=True.")
-        if extra_fields.get("is_superuser") is not True:
-            raise ValueError("Superuser must have is_superuser=True.")
         if extra_fields.get("is_approved") is not True:
             raise ValueError("Superuser must have is_approved=True.")
 
-        return self._create_user(username, email, password, **extra_fields)
+        return super().create_superuser(username, email, password, **extra_fields)
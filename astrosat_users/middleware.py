@@ -0,0 +1,26 @@
+from django.utils.functional import SimpleLazyObject, empty
+
+from astrosat_users.activity import maybe_flush_last_seen, record_last_seen
+
+
+class LastSeenMiddleware:
+    """
+    Records when each authenticated user was last seen (see astrosat_users.activity).
+    This doesn't load the user if the view didn't; DRF views set request.user
+    to the token- or session-authenticated user as they authenticate.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        user = getattr(request, "user", None)
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            # (AuthenticationMiddleware's lazy user was never used)
+            user = None
+        if user is not None and user.is_authenticated:
+            record_last_seen(user.pk)
+        maybe_flush_last_seen()
+
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.15 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astrosat_users', '0031_auto_20220406_1246'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userrole',
+            name='parents',
+            field=models.ManyToManyField(blank=True, help_text='This role inherits all of the permissions of these roles.', related_name='children', to='astrosat_users.UserRole'),
+        ),
+        migrations.CreateModel(
+            name='UserRoleEffectivePermission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('permission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='astrosat_users.userpermission')),
+                ('role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='astrosat_users.userrole')),
+            ],
+            options={
+                'verbose_name': 'User Role Effective Permission',
+                'verbose_name_plural': 'User Role Effective Permissions',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userroleeffectivepermission',
+            constraint=models.UniqueConstraint(fields=('role', 'permission'), name='unique_role_effective_permission'),
+        ),
+        migrations.AddField(
+            model_name='userrole',
+            name='effective_permissions',
+            field=models.ManyToManyField(editable=False, help_text="This role's permissions plus those of all its ancestors.", related_name='effective_roles', through='astrosat_users.UserRoleEffectivePermission', to='astrosat_users.UserPermission'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.15 on 2026-10-19 09:14
+
+from django.db import migrations
+
+
+def populate_effective_permissions(apps, schema_editor):
+    # (no roles have parents yet, so each role's effective permissions are just its own permissions)
+    UserRole = apps.get_model("astrosat_users", "UserRole")
+    UserRoleEffectivePermission = apps.get_model(
+        "astrosat_users", "UserRoleEffectivePermission"
+    )
+
+    UserRoleEffectivePermission.objects.bulk_create(
+        [
+            UserRoleEffectivePermission(
+                role_id=role_id, permission_id=permission_id
+            ) for role_id, permission_id in UserRole.permissions.through.objects.
+            values_list("userrole_id", "userpermission_id")
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astrosat_users', '0032_userrole_parents_effective_permissions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            populate_effective_permissions,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
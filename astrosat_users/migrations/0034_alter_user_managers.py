@@ -0,0 +1,20 @@
+# Generated by Django 3.2.15 on 2026-10-19 10:02
+
+import astrosat_users.managers
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astrosat_users', '0033_userrole_effective_permissions_data'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', astrosat_users.managers.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.15 on 2026-10-19 11:20
+
+import astrosat_users.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astrosat_users', '0034_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=astrosat_users.indexes.UpperPatternIndex('username', name='astrosat_users_uname_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=astrosat_users.indexes.UpperPatternIndex('email', name='astrosat_users_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=astrosat_users.indexes.UpperPatternIndex('name', name='astrosat_users_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=astrosat_users.indexes.UpperPatternIndex('name', name='astrosat_cust_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=astrosat_users.indexes.UpperPatternIndex('official_name', name='astrosat_cust_oname_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrole',
+            index=astrosat_users.indexes.UpperPatternIndex('name', name='astrosat_role_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userpermission',
+            index=astrosat_users.indexes.UpperPatternIndex('name', name='astrosat_perm_name_upper_idx'),
+        ),
+    ]
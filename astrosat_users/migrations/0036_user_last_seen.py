@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astrosat_users', '0035_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When this user was last active (to the nearest minute); see astrosat_users.activity.', null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.15 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astrosat_users', '0036_user_last_seen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('session_key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='session key')),
+                ('session_data', models.TextField(verbose_name='session data')),
+                ('expire_date', models.DateTimeField(db_index=True, verbose_name='expire date')),
+                ('auth_user_id', models.CharField(blank=True, db_index=True, help_text='The pk of the user this session is authenticated as.', max_length=255, null=True)),
+            ],
+            options={
+                'verbose_name': 'User Session',
+                'verbose_name_plural': 'User Sessions',
+                'abstract': False,
+            },
+        ),
+    ]
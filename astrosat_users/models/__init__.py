@@ -1,6 +1,7 @@
 from .models_customers import Customer, CustomerUser
 from .models_profiles import PROFILES_REGISTRY
-from .models_roles import UserRole, UserPermission
+from .models_roles import UserRole, UserRoleEffectivePermission, UserPermission
+from .models_sessions import UserSession
 from .models_settings import UserSettings
 from .models_users import User, get_sentinel_user
 from .models_messages import Message, MessageAttachment
@@ -10,6 +10,9 @@ from allauth.account import app_settings as allauth_app_settings
 from allauth.account.adapter import get_adapter
 from allauth.account.utils import user_username
 
+from astrosat_users.indexes import UpperPatternIndex
+from astrosat_users.renditions import delete_renditions
+from astrosat_users.storage import delete_files_on_commit
 from astrosat_users.signals import customer_added_user, customer_removed_user
 
 
@@ -45,6 +48,11 @@ class Customer(models.Model):
         # abstract = True
         verbose_name = "Customer"
         verbose_name_plural = "Customers"
+        indexes = [
+            # admin prefix searches (see CustomerAdmin.search_fields)
+            UpperPatternIndex("name", name="astrosat_cust_name_upper_idx"),
+            UpperPatternIndex("official_name", name="astrosat_cust_oname_upper_idx"),
+        ]
 
     class CompanyTypes(models.TextChoices):
         NON_PROFIT = 'NON_PROFIT', _('Non-Profit Organisation')
@@ -120,15 +128,24 @@ class Customer(models.Model):
     #     self.customer_users.remove_user(user)
     #     customer_removed_user.send(sender=self, user=user)
 
+    def save(self, *args, **kwargs):
+        """
+        When a new logo is saved, delete any (out-of-date) renditions of its name;
+        storages that overwrite files may give it the same name as the one it replaces.
+        """
+        logo_changed = bool(self.logo) and not self.logo._committed
+        super().save(*args, **kwargs)
+        if logo_changed:
+            delete_renditions(self.logo)
+
     def delete(self, *args, **kwargs):
         """
-        When a customer is deleted, delete the corresponding logo storage.
+        When a customer is deleted, delete the corresponding logo storage (and any renditions).
+        (The files are only deleted once the transaction commits.)
         """
         if self.logo:
-            logo_name = self.logo.name
-            logo_storage = self.logo.storage
-            if logo_storage.exists(logo_name):
-                logo_storage.delete(logo_name)
+            delete_renditions(self.logo)
+            delete_files_on_commit(self.logo.storage, [self.logo.name])
 
         return super().delete(*args, **kwargs)
 
@@ -2,6 +2,9 @@ from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from astrosat_users.pubsub import publish_messages
+from astrosat_users.storage import delete_files_on_commit
+
 ###########
 # helpers #
 ###########
@@ -19,7 +22,10 @@ def message_attachment_path(instance, filename):
 
 
 class MessageManager(models.Manager):
-    pass
+    def bulk_create(self, objs, *args, **kwargs):
+        messages = super().bulk_create(objs, *args, **kwargs)
+        publish_messages(messages)
+        return messages
 
 
 class MessageQuerySet(models.QuerySet):
@@ -81,10 +87,8 @@ class MessageAttachment(models.Model):
     def delete(self, *args, **kwargs):
         """
         When an attachment is deleted, delete the corresponding attatchment storage.
+        (The file is only deleted once the transaction commits.)
         """
-        attachment_name = self.file.name
-        attachment_storage = self.file.storage
-        if attachment_storage.exists(attachment_name):
-            attachment_storage.delete(attachment_name)
+        delete_files_on_commit(self.file.storage, [self.file.name])
 
         return super().delete(*args, **kwargs)
@@ -1,10 +1,64 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
-# TODO: SHOULD ROLES BE COMPOSABLE
-# R3 = R2 + R1 (means Role3 inherits Role2's permissions & Role1's permissions, plus any of its own)
-# ?
+from astrosat_users.indexes import UpperPatternIndex
+from astrosat_users.permissions import invalidate_user_permissions
+
+# roles are composable: R3 = R2 + R1 (means Role3 inherits Role2's permissions & Role1's permissions, plus any of its own)
+# rather than walk the role hierarchy every time permissions are checked, the "effective" permissions
+# of each role (its own plus all of its ancestors') are stored in UserRoleEffectivePermission; that
+# table is kept up-to-date by the signal handlers at the bottom of this module
+
+###########
+# helpers #
+###########
+
+
+def get_ancestor_ids(graph, role_id):
+    """
+    Returns the ids of role_id and all of its ancestors;
+    graph is a dictionary of {role_id: {parent_ids}}.
+    """
+    ancestor_ids = set()
+    role_ids = [role_id]
+    while role_ids:
+        role_id = role_ids.pop()
+        if role_id not in ancestor_ids:
+            ancestor_ids.add(role_id)
+            role_ids.extend(graph.get(role_id, ()))
+    return ancestor_ids
+
+
+def get_descendant_ids(graph, role_ids):
+    """
+    Returns the ids of role_ids and all of their descendants;
+    graph is a dictionary of {role_id: {parent_ids}}.
+    """
+    children = defaultdict(set)
+    for child_id, parent_ids in graph.items():
+        for parent_id in parent_ids:
+            children[parent_id].add(child_id)
+    descendant_ids = set()
+    role_ids = list(role_ids)
+    while role_ids:
+        role_id = role_ids.pop()
+        if role_id not in descendant_ids:
+            descendant_ids.add(role_id)
+            role_ids.extend(children.get(role_id, ()))
+    return descendant_ids
+
+
+########################
+# managers & querysets #
+########################
 
 
 class UserRoleManager(models.Manager):
@@ -15,6 +69,109 @@ class UserRoleManager(models.Manager):
     def get_by_natural_key(self, name):
         return self.get(name=name)
 
+    def get_graph(self):
+        """
+        Returns the role hierarchy as a dictionary of {role_id: {parent_ids}}.
+        """
+        graph = defaultdict(set)
+        role_parents = UserRole.parents.through.objects.values_list(
+            "from_userrole_id", "to_userrole_id"
+        )
+        for role_id, parent_id in role_parents:
+            graph[role_id].add(parent_id)
+        return graph
+
+    def check_parents(self, role_id, parent_ids, graph=None):
+        """
+        Raises a ValidationError if making parent_ids the parents of role_id would create a cycle.
+        """
+        if graph is None:
+            graph = self.get_graph()
+        for parent_id in parent_ids:
+            if role_id in get_ancestor_ids(graph, parent_id):
+                raise ValidationError(
+                    _("A role cannot inherit from itself or its descendants."),
+                    code="invalid_parents",
+                )
+
+    def rebuild_effective_permissions(self, role_ids=None):
+        """
+        Recomputes the effective permissions of role_ids and all of their
+        descendants (or of all roles if role_ids is None); only the rows that
+        have changed are inserted/deleted.  Returns the ids of the roles whose
+        effective permissions changed.
+        """
+        graph = self.get_graph()
+
+        roles_qs = self.get_queryset()
+        if role_ids is not None:
+            roles_qs = roles_qs.filter(
+                pk__in=get_descendant_ids(graph, role_ids)
+            )
+        role_ids = set(roles_qs.values_list("pk", flat=True))
+        if not role_ids:
+            return set()
+
+        role_ancestor_ids = {
+            role_id: get_ancestor_ids(graph, role_id)
+            for role_id in role_ids
+        }
+
+        permission_ids = defaultdict(set)
+        role_permissions = UserRole.permissions.through.objects.filter(
+            userrole_id__in=set().union(*role_ancestor_ids.values())
+        ).values_list("userrole_id", "userpermission_id")
+        for role_id, permission_id in role_permissions:
+            permission_ids[role_id].add(permission_id)
+
+        expected_pairs = {
+            (role_id, permission_id)
+            for role_id, ancestor_ids in role_ancestor_ids.items()
+            for ancestor_id in ancestor_ids
+            for permission_id in permission_ids[ancestor_id]
+        }  # yapf: disable
+        existing_pairs = set(
+            UserRoleEffectivePermission.objects.filter(
+                role_id__in=role_ids
+            ).values_list("role_id", "permission_id")
+        )
+
+        pairs_to_add = expected_pairs - existing_pairs
+        pairs_to_remove = existing_pairs - expected_pairs
+
+        if pairs_to_add:
+            UserRoleEffectivePermission.objects.bulk_create(
+                [
+                    UserRoleEffectivePermission(
+                        role_id=role_id, permission_id=permission_id
+                    ) for role_id, permission_id in pairs_to_add
+                ],
+                ignore_conflicts=True,
+            )
+
+        if pairs_to_remove:
+            permission_ids_to_remove = defaultdict(set)
+            for role_id, permission_id in pairs_to_remove:
+                permission_ids_to_remove[role_id].add(permission_id)
+            UserRoleEffectivePermission.objects.filter(
+                reduce(
+                    or_,
+                    (
+                        models.Q(role_id=role_id, permission_id__in=permission_ids)
+                        for role_id, permission_ids in permission_ids_to_remove.items()
+                    ),
+                )
+            ).delete()
+
+        changed_role_ids = {
+            role_id for role_id, permission_id in pairs_to_add | pairs_to_remove
+        }
+        if changed_role_ids:
+            # (roles are shared by many users, so just invalidate everybody's cached permissions)
+            invalidate_user_permissions()
+
+        return changed_role_ids
+
 
 class UserRole(models.Model):
     """
@@ -24,6 +181,10 @@ class UserRole(models.Model):
     class Meta:
         verbose_name = "User Role"
         verbose_name_plural = "User Roles"
+        indexes = [
+            # admin prefix searches (see UserRoleAdmin.search_fields)
+            UpperPatternIndex("name", name="astrosat_role_name_upper_idx"),
+        ]
 
     objects = UserRoleManager()
 
@@ -36,6 +197,22 @@ class UserRole(models.Model):
         "UserPermission", related_name="roles", blank=True
     )
 
+    parents = models.ManyToManyField(
+        "self",
+        symmetrical=False,
+        related_name="children",
+        blank=True,
+        help_text=_("This role inherits all of the permissions of these roles."),
+    )
+
+    effective_permissions = models.ManyToManyField(
+        "UserPermission",
+        through="UserRoleEffectivePermission",
+        related_name="effective_roles",
+        editable=False,
+        help_text=_("This role's permissions plus those of all its ancestors."),
+    )
+
     def __str__(self):
         return self.name
 
@@ -43,6 +220,33 @@ class UserRole(models.Model):
         return (self.name, )
 
 
+class UserRoleEffectivePermission(models.Model):
+    """
+    The transitive closure of roles & permissions; there is one row for each permission
+    that a role has either directly or via its ancestors.  Do not modify this directly;
+    it is maintained by `UserRole.objects.rebuild_effective_permissions()`.
+    """
+    class Meta:
+        verbose_name = "User Role Effective Permission"
+        verbose_name_plural = "User Role Effective Permissions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["role", "permission"],
+                name="unique_role_effective_permission",
+            )
+        ]
+
+    role = models.ForeignKey(
+        UserRole, on_delete=models.CASCADE, related_name="+"
+    )
+    permission = models.ForeignKey(
+        "UserPermission", on_delete=models.CASCADE, related_name="+"
+    )
+
+    def __str__(self):
+        return f"{self.role}: {self.permission}"
+
+
 class UserPermissionManager(models.Manager):
     """
     This manager lets me deserialize using natural_keys
@@ -56,6 +260,10 @@ class UserPermission(models.Model):
     class Meta:
         verbose_name = "User Permission"
         verbose_name_plural = "User Permissions"
+        indexes = [
+            # admin prefix searches (see UserPermissionAdmin.search_fields)
+            UpperPatternIndex("name", name="astrosat_perm_name_upper_idx"),
+        ]
 
     objects = UserPermissionManager()
 
@@ -80,3 +288,68 @@ class UserPermission(models.Model):
 
     def natural_key(self):
         return (self.name, )
+
+
+###########
+# signals #
+###########
+
+
+@receiver(m2m_changed, sender=UserRole.parents.through)
+def role_parents_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_add":
+        if reverse:
+            # role.children.add(...)
+            graph = UserRole.objects.get_graph()
+            for child_id in pk_set:
+                UserRole.objects.check_parents(child_id, [instance.pk], graph=graph)
+        else:
+            # role.parents.add(...)
+            UserRole.objects.check_parents(instance.pk, pk_set)
+    elif action in ("post_add", "post_remove"):
+        role_ids = pk_set if reverse else {instance.pk}
+        if role_ids:
+            UserRole.objects.rebuild_effective_permissions(role_ids)
+    elif action == "post_clear":
+        # (after role.children.clear() the former children are unknown, so rebuild everything)
+        UserRole.objects.rebuild_effective_permissions(
+            None if reverse else {instance.pk}
+        )
+
+
+@receiver(m2m_changed, sender=UserRole.permissions.through)
+def role_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove"):
+        role_ids = pk_set if reverse else {instance.pk}
+        if role_ids:
+            UserRole.objects.rebuild_effective_permissions(role_ids)
+    elif action == "post_clear":
+        # (after permission.roles.clear() the former roles are unknown, so rebuild everything)
+        UserRole.objects.rebuild_effective_permissions(
+            None if reverse else {instance.pk}
+        )
+
+
+@receiver(pre_delete, sender=UserRole)
+def role_pre_delete(sender, instance, **kwargs):
+    # the hierarchy is gone once the role has been deleted,
+    # so make a note of the roles that inherited from it now
+    instance._descendant_ids = get_descendant_ids(
+        UserRole.objects.get_graph(), [instance.pk]
+    ) - {instance.pk}
+
+
+@receiver(post_delete, sender=UserRole)
+def role_post_delete(sender, instance, **kwargs):
+    descendant_ids = getattr(instance, "_descendant_ids", None)
+    if descendant_ids:
+        UserRole.objects.rebuild_effective_permissions(descendant_ids)
+    invalidate_user_permissions()
+
+
+@receiver(post_save, sender=UserPermission)
+@receiver(post_delete, sender=UserPermission)
+def permission_changed(sender, instance, created=False, **kwargs):
+    # (a new permission doesn't belong to any roles yet)
+    if not created:
+        invalidate_user_permissions()
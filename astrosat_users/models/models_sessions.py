@@ -0,0 +1,30 @@
+from django.contrib.sessions.base_session import AbstractBaseSession
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class UserSession(AbstractBaseSession):
+    """
+    A db-backed session that also records the pk of its (authenticated) user,
+    so that a user's sessions can be found w/out decoding every session;
+    used by the "astrosat_users.sessions.db" & "astrosat_users.sessions.cached_db"
+    SESSION_ENGINEs.
+    """
+    class Meta(AbstractBaseSession.Meta):
+        verbose_name = "User Session"
+        verbose_name_plural = "User Sessions"
+
+    # (stored as a string, as in the session data itself, so that it works w/ any type of pk)
+    auth_user_id = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text=_("The pk of the user this session is authenticated as."),
+    )
+
+    @classmethod
+    def get_session_store_class(cls):
+        from astrosat_users.sessions.db import SessionStore
+
+        return SessionStore
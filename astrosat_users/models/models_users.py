@@ -5,8 +5,11 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.signals import user_logged_out
 from django.contrib.sites.models import Site
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.template.exceptions import TemplateDoesNotExist
 from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from allauth.account.adapter import get_adapter
@@ -14,6 +17,12 @@ from allauth.account.models import EmailAddress
 
 from astrosat.utils import validate_no_tags
 
+from astrosat_users.indexes import UpperPatternIndex
+from astrosat_users.managers import UserManager
+from astrosat_users.permissions import get_user_permissions, invalidate_user_permissions
+from astrosat_users.pubsub import publish_messages
+from astrosat_users.renditions import delete_renditions
+from astrosat_users.storage import delete_files_on_commit
 from astrosat_users.validators import ImageDimensionsValidator
 
 
@@ -42,8 +51,16 @@ class UserRegistrationStageType(models.TextChoices):
 
 
 class User(AbstractUser):
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # case-insensitive lookups (allauth finds users by "email__iexact")
+            # and admin prefix searches (see UserAdmin.search_fields)
+            UpperPatternIndex("username", name="astrosat_users_uname_upper_idx"),
+            UpperPatternIndex("email", name="astrosat_users_email_upper_idx"),
+            UpperPatternIndex("name", name="astrosat_users_name_upper_idx"),
+        ]
 
-    # TODO: CUSTOM MANAGER ?
+    objects = UserManager()
 
     PROFILE_KEYS = []
 
@@ -103,6 +120,14 @@ class User(AbstractUser):
             "A record of the most recent key used to verify the user's email address."
         ),
     )
+    last_seen = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text=_(
+            "When this user was last active (to the nearest minute); see astrosat_users.activity."
+        ),
+    )
 
     def get_absolute_url(self):
         return reverse("user-detail", kwargs={"email": self.email})
@@ -121,13 +146,31 @@ class User(AbstractUser):
     def is_verified(self):
         """
         Checks if the primary email address belonging to this user has been verified.
+        (Users loaded w/ `User.objects.with_primary_emailaddress()` already know this.)
         """
+        if "primary_emailaddress_verified" in self.__dict__:
+            return self.primary_emailaddress_verified
         return (
             self.emailaddress_set.only("verified", "primary").filter(
                 primary=True, verified=True
             ).exists()
         )
 
+    @cached_property
+    def astrosat_permissions(self):
+        """
+        Returns a frozenset of the names of all UserPermissions belonging to this user
+        (via its roles); this is computed at most once per instance (ie: per request)
+        and is otherwise read from the cache.
+        """
+        return get_user_permissions(self)
+
+    def has_astrosat_permission(self, *permission_names):
+        """
+        Checks if this user has all of the named UserPermissions.
+        """
+        return self.astrosat_permissions.issuperset(permission_names)
+
     def logout_all(self):
         """
         Logs a user out of all sessions.
@@ -153,16 +196,28 @@ class User(AbstractUser):
         primary_emailaddress.verified = True
         primary_emailaddress.save()
 
+        self.primary_emailaddress_email = primary_emailaddress.email
+        self.primary_emailaddress_verified = True
+
+    def save(self, *args, **kwargs):
+        """
+        When a new avatar is saved, delete any (out-of-date) renditions of its name;
+        storages that overwrite files may give it the same name as the one it replaces.
+        """
+        avatar_changed = bool(self.avatar) and not self.avatar._committed
+        super().save(*args, **kwargs)
+        if avatar_changed:
+            delete_renditions(self.avatar)
+
     def delete(self, *args, **kwargs):
         """
-        When a user is deleted, delete the corresponding avatar storage.
+        When a user is deleted, delete the corresponding avatar storage (and any renditions).
         Doing it in a method instead of via signals to handle the case where objects are deleted in bulk.
+        (The files are only deleted once the transaction commits.)
         """
         if self.avatar:
-            avatar_name = self.avatar.name
-            avatar_storage = self.avatar.storage
-            if avatar_storage.exists(avatar_name):
-                avatar_storage.delete(avatar_name)
+            delete_renditions(self.avatar)
+            delete_files_on_commit(self.avatar.storage, [self.avatar.name])
 
         return super().delete(*args, **kwargs)
 
@@ -202,4 +257,23 @@ class User(AbstractUser):
         message.full_clean(
         )  # this will raise an error if the msg content is invalid
         message.save()
+        publish_messages([message])
         return message
+
+
+###########
+# signals #
+###########
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def user_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # role.users.add(...); (after role.users.clear() the former users are unknown, so invalidate everybody)
+        invalidate_user_permissions(None if action == "post_clear" else pk_set)
+    else:
+        # user.roles.add(...)
+        instance.__dict__.pop("astrosat_permissions", None)
+        invalidate_user_permissions([instance.pk])
@@ -0,0 +1,119 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+# a Bloom filter of common/breached passwords; it is built (by the "build_password_filter"
+# command) from a list of passwords & stored in a file that is memory-mapped, so checking
+# a password costs a hash & a handful of lookups & the filter is shared between processes
+# (a Bloom filter has no false negatives, but a small rate of false positives)
+
+MAGIC = b"AUPF"
+VERSION = 1
+# magic, version, (padding), number of bits, number of passwords, number of hashes
+HEADER = struct.Struct("<4sB3xQQI")
+
+
+def normalize_password(password):
+    # (a common password is just as common w/ different capitalisation)
+    return password.lower().encode("utf-8", errors="surrogatepass")
+
+
+def get_bit_indexes(password, n_bits, n_hashes):
+    """
+    Returns the n_hashes bits that password maps to; these are derived from
+    two halves of a single blake2b digest (ie: Kirsch-Mitzenmacher double hashing).
+    """
+    digest = hashlib.blake2b(normalize_password(password), digest_size=16).digest()
+    h1, h2 = struct.unpack("<QQ", digest)
+    h2 |= 1  # (an odd step means the indexes don't repeat when n_bits is even)
+    return [(h1 + i * h2) % n_bits for i in range(n_hashes)]
+
+
+def get_filter_size(n_passwords, false_positive_rate):
+    """
+    Returns the optimal number of bits & hashes for a
+    filter of n_passwords w/ the given false_positive_rate.
+    """
+    n_passwords = max(n_passwords, 1)
+    n_bits = math.ceil(-n_passwords * math.log(false_positive_rate) / math.log(2)**2)
+    n_hashes = max(1, round(n_bits / n_passwords * math.log(2)))
+    return n_bits, n_hashes
+
+
+def build_password_filter(passwords, path, n_passwords, false_positive_rate=0.001):
+    """
+    Writes a filter of passwords (an iterable of at most n_passwords strings) to path.
+    Returns the number of passwords added, the number of bits and the number of hashes.
+    """
+    n_bits, n_hashes = get_filter_size(n_passwords, false_positive_rate)
+    bits = bytearray(math.ceil(n_bits / 8))
+    n_added = 0
+    for password in passwords:
+        for index in get_bit_indexes(password, n_bits, n_hashes):
+            bits[index >> 3] |= 1 << (index & 7)
+        n_added += 1
+
+    # (written to a temporary file & then renamed, so a running process never sees half a filter)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n_bits, n_added, n_hashes))
+        f.write(bits)
+    os.replace(tmp_path, path)
+
+    return n_added, n_bits, n_hashes
+
+
+class PasswordFilter:
+    """
+    A read-only, memory-mapped password filter; use "password in filter".
+    Raises ValueError if path isn't a valid filter.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"'{path}' is empty.")
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"'{path}' is not a password filter.")
+        magic, version, self.n_bits, self.n_passwords, self.n_hashes = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a password filter.")
+        if not self.n_bits or not self.n_hashes or len(self._mmap) < HEADER.size + math.ceil(self.n_bits / 8):
+            raise ValueError(f"'{path}' is not a valid password filter.")
+
+    def __contains__(self, password):
+        mm = self._mmap
+        for index in get_bit_indexes(password, self.n_bits, self.n_hashes):
+            if not mm[HEADER.size + (index >> 3)] & (1 << (index & 7)):
+                return False
+        return True
+
+
+_password_filters = {}
+_password_filters_lock = threading.Lock()
+
+
+def get_password_filter(path):
+    """
+    Returns the PasswordFilter at path (or None if there isn't one).
+    The filter is opened once per process, and re-opened if the file changes.
+    """
+    if not path:
+        return None
+    try:
+        modified_time = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _password_filters_lock:
+        cached_modified_time, password_filter = _password_filters.get(path, (None, None))
+        if cached_modified_time != modified_time:
+            try:
+                password_filter = PasswordFilter(path)
+            except (OSError, ValueError):
+                password_filter = None
+            _password_filters[path] = (modified_time, password_filter)
+    return password_filter
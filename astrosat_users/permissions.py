@@ -0,0 +1,101 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from rest_framework.permissions import BasePermission
+
+from astrosat_users.conf import app_settings
+
+# each user's effective UserPermission names are cached in the shared cache
+# (see User.astrosat_permissions); rather than trying to find & delete stale
+# entries, the cache keys include a global version (changed whenever roles or
+# permissions change) and a per-user version (changed whenever a user's roles change)
+
+PERMISSIONS_VERSION_CACHE_KEY = "astrosat_users:permissions:version"
+USER_PERMISSIONS_VERSION_CACHE_KEY = "astrosat_users:permissions:{user_id}:version"
+USER_PERMISSIONS_CACHE_KEY = "astrosat_users:permissions:{user_id}:{version}:{user_version}"
+
+
+def get_user_permissions_cache_key(user_id):
+    version_keys = [
+        PERMISSIONS_VERSION_CACHE_KEY,
+        USER_PERMISSIONS_VERSION_CACHE_KEY.format(user_id=user_id),
+    ]
+    versions = cache.get_many(version_keys)
+    return USER_PERMISSIONS_CACHE_KEY.format(
+        user_id=user_id,
+        version=versions.get(version_keys[0], 0),
+        user_version=versions.get(version_keys[1], 0),
+    )
+
+
+def _invalidate_user_permissions(user_ids):
+    if user_ids is None:
+        cache.set(PERMISSIONS_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+    else:
+        version = uuid.uuid4().hex
+        cache.set_many(
+            {
+                USER_PERMISSIONS_VERSION_CACHE_KEY.format(user_id=user_id): version
+                for user_id in user_ids
+            },
+            timeout=None,
+        )
+
+
+def invalidate_user_permissions(user_ids=None):
+    """
+    Invalidates the cached permissions of user_ids (or of all users if user_ids is None).
+    This happens straightaway (for the rest of the current transaction) and again once
+    the transaction commits (in case another request re-cached the old permissions
+    before the new ones were visible in the db).
+    """
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+    _invalidate_user_permissions(user_ids)
+    transaction.on_commit(lambda: _invalidate_user_permissions(user_ids))
+
+
+def get_user_permissions(user):
+    """
+    Returns a frozenset of the names of all the UserPermissions that user has
+    (via its roles & their ancestors); this hits the db at most once per change.
+    """
+    from astrosat_users.models import UserPermission
+
+    cache_key = get_user_permissions_cache_key(user.pk)
+    permission_names = cache.get(cache_key)
+    if permission_names is None:
+        permission_names = frozenset(
+            UserPermission.objects.filter(
+                effective_roles__users=user
+            ).values_list("name", flat=True)
+        )
+        cache.set(
+            cache_key,
+            permission_names,
+            timeout=app_settings.ASTROSAT_USERS_PERMISSIONS_CACHE_TIMEOUT,
+        )
+    return permission_names
+
+
+def HasAstrosatPermission(*permission_names):
+    """
+    This fn is a factory that returns a _dynamic_ DRF Permission.
+    Only a request.user w/ all of the named UserPermissions is granted permission.
+    usage: `permission_classes = [IsAuthenticated, HasAstrosatPermission("can_do_stuff")]`
+    """
+    class _HasAstrosatPermission(BasePermission):
+        message = f"User must have the permission(s) '{', '.join(permission_names)}' to perform this action."
+
+        def has_permission(self, request, view):
+            user = request.user
+            return bool(
+                user and user.is_authenticated and
+                user.has_astrosat_permission(*permission_names)
+            )
+
+    return _HasAstrosatPermission
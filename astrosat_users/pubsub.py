@@ -0,0 +1,141 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+from astrosat_users.conf import app_settings
+
+# a very lightweight publish/subscribe layer; used to push new Messages
+# to connected clients (see MessageViewSet.stream) w/out polling the db
+
+MESSAGE_STREAM_CACHE_KEY = "astrosat_users:messages:{user_id}:version"
+
+
+class MessageStreamBackend:
+    LOCAL = "local"  # in-process only (a single worker)
+    CACHE = "cache"  # in-process + the shared cache (multiple workers)
+    DB = "db"  # in-process + polling the db (multiple workers w/out a shared cache)
+
+
+class Subscription:
+    """
+    A single listener on a channel.  Payloads are delivered either to a
+    thread-safe queue (for sync consumers) or to an asyncio queue bound to
+    the consumer's event loop (for async consumers).
+    """
+    def __init__(self, broker, channel, loop=None):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue() if loop is not None else queue.Queue()
+
+    def put(self, payload):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+        else:
+            self.queue.put_nowait(payload)
+
+    def get(self, timeout=None):
+        """
+        Blocks until a payload arrives; returns None if nothing arrived w/in timeout.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout=None):
+        """
+        Awaits a payload; returns None if nothing arrived w/in timeout.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Keeps track of subscriptions per channel and fans published payloads out to them.
+    Publishing to a channel w/ no subscribers is (almost) free.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel, loop=None):
+        subscription = Subscription(self, channel, loop=loop)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(payload)
+
+    def has_subscribers(self, channel):
+        with self._lock:
+            return bool(self._subscriptions.get(channel))
+
+
+message_broker = Broker()
+
+
+def get_message_stream_cache_key(user_id):
+    return MESSAGE_STREAM_CACHE_KEY.format(user_id=user_id)
+
+
+def get_message_stream_version(user_id):
+    return cache.get(get_message_stream_cache_key(user_id), 0)
+
+
+def _publish_message_ids(user_id, message_ids):
+    if app_settings.ASTROSAT_USERS_MESSAGE_STREAM_BACKEND == MessageStreamBackend.CACHE:
+        # let the other workers know there is something new...
+        key = get_message_stream_cache_key(user_id)
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # the key was evicted in the meantime
+                cache.set(key, 1, timeout=None)
+    message_broker.publish(user_id, message_ids)
+
+
+def publish_messages(messages):
+    """
+    Notifies any subscribers that new messages have been created.
+    This is deferred until the current transaction commits, so that
+    subscribers never try to read messages that aren't in the db yet.
+    """
+    message_ids_by_user = defaultdict(list)
+    for message in messages:
+        message_ids_by_user[message.user_id].append(message.pk)
+
+    # (some dbs don't return pks from bulk_create; that's ok - subscribers
+    # only use the payload as a signal to look for messages they haven't seen)
+    for user_id, message_ids in message_ids_by_user.items():
+        transaction.on_commit(
+            partial(
+                _publish_message_ids,
+                user_id,
+                [pk for pk in message_ids if pk is not None],
+            )
+        )
@@ -0,0 +1,175 @@
+import io
+import os
+
+from PIL import Image, UnidentifiedImageError
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.urls import reverse
+
+from astrosat_users.conf import app_settings
+from astrosat_users.storage import delete_files_on_commit
+
+# renditions are small, fixed-size copies of an image (ie: avatars & logos) for
+# use in lists, etc.; they are stored alongside the original image, and are
+# generated either by the "generate_renditions" command or on first request;
+# since they are named after the original, they are deleted whenever a new
+# original is saved (which may have the same name as the one it replaces)
+
+RENDITION_FORMATS = {
+    "webp": "WEBP",
+    "png": "PNG",
+}
+
+RENDITION_CACHE_KEY = "astrosat_users:renditions:{name}"
+# (images that renditions can't be made of are remembered, so they aren't decoded on every request)
+RENDITION_FAILED_CACHE_KEY = "astrosat_users:renditions:failed:{name}"
+
+
+class RenditionMode:
+    LAZY = "lazy"  # generated the first time they are requested
+    WORKER = "worker"  # generated by the "generate_renditions" command
+
+
+def get_rendition_sizes():
+    return sorted(app_settings.ASTROSAT_USERS_RENDITION_SIZES, reverse=True)
+
+
+def get_rendition_formats():
+    return [
+        format for format in app_settings.ASTROSAT_USERS_RENDITION_FORMATS
+        if format in RENDITION_FORMATS
+    ]
+
+
+def is_valid_rendition(size, format):
+    return size in get_rendition_sizes() and format in get_rendition_formats()
+
+
+def get_rendition_name(name, size, format):
+    """
+    Returns the storage name of a rendition of the image called "name".
+    >>> get_rendition_name("users/bob/avatar.jpg", 64, "webp")
+    'users/bob/avatar_64.webp'
+    """
+    root, _ = os.path.splitext(name)
+    return f"{root}_{size}.{format}"
+
+
+def get_rendition_names(name):
+    return [
+        get_rendition_name(name, size, format)
+        for size in get_rendition_sizes()
+        for format in get_rendition_formats()
+    ]
+
+
+def _save_rendition(storage, name, image, format):
+    content = io.BytesIO()
+    image.save(content, RENDITION_FORMATS[format])
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content.getvalue()))
+    cache.set(RENDITION_CACHE_KEY.format(name=name), True, timeout=None)
+
+
+def generate_renditions(field_file, sizes=None, formats=None):
+    """
+    Generates renditions of the image in "field_file".
+    Returns the names of the renditions generated; returns an empty list
+    if the file is not an image (a customer logo might be an svg).
+    """
+    sizes = sorted(sizes or get_rendition_sizes(), reverse=True)
+    formats = formats or get_rendition_formats()
+    storage = field_file.storage
+
+    try:
+        with field_file.open("rb") as f:
+            image = Image.open(f)
+            # (the dimensions are read from the header, so this is checked before decoding anything)
+            if image.width * image.height > app_settings.ASTROSAT_USERS_RENDITION_MAX_PIXELS:
+                return []
+            # (for jpegs, this lets PIL decode a lower-resolution version directly)
+            image.draft("RGB", (sizes[0], sizes[0]))
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return []
+
+    if image.mode in ("RGBA", "LA", "P") or "transparency" in image.info:
+        image = image.convert("RGBA")
+    else:
+        image = image.convert("RGB")
+
+    rendition_names = []
+    for size in sizes:
+        # each rendition is made from the previous (larger) one
+        image.thumbnail((size, size), Image.LANCZOS)
+        for format in formats:
+            rendition_name = get_rendition_name(field_file.name, size, format)
+            _save_rendition(storage, rendition_name, image, format)
+            rendition_names.append(rendition_name)
+
+    return rendition_names
+
+
+def get_or_generate_rendition(field_file, size, format):
+    """
+    Returns the name of the specified rendition, generating it if needed;
+    returns None if the rendition cannot be generated.
+    """
+    rendition_name = get_rendition_name(field_file.name, size, format)
+    cache_key = RENDITION_CACHE_KEY.format(name=rendition_name)
+    failed_cache_key = RENDITION_FAILED_CACHE_KEY.format(name=field_file.name)
+    cached_values = cache.get_many([cache_key, failed_cache_key])
+    if cached_values.get(failed_cache_key):
+        return None
+    if cached_values.get(cache_key) or field_file.storage.exists(rendition_name):
+        cache.set(cache_key, True, timeout=None)
+        return rendition_name
+
+    if rendition_name in generate_renditions(field_file):
+        return rendition_name
+
+    cache.set(failed_cache_key, True, timeout=None)
+    return None
+
+
+def delete_renditions(field_file):
+    """
+    Deletes all renditions of "field_file" once the current transaction commits.
+    """
+    rendition_names = get_rendition_names(field_file.name)
+    cache.delete_many([
+        RENDITION_CACHE_KEY.format(name=rendition_name)
+        for rendition_name in rendition_names
+    ] + [RENDITION_FAILED_CACHE_KEY.format(name=field_file.name)])
+    delete_files_on_commit(field_file.storage, rendition_names)
+
+
+def get_rendition_urls(field_file, url_name, url_kwargs, request=None):
+    """
+    Returns a dictionary of rendition urls keyed by size & format;
+    In "lazy" mode the urls point to a view that generates the rendition
+    as needed, otherwise they point directly at the storage.
+    """
+    if not field_file:
+        return None
+
+    rendition_urls = {}
+    for size in get_rendition_sizes():
+        rendition_urls[str(size)] = {}
+        for format in get_rendition_formats():
+            if app_settings.ASTROSAT_USERS_RENDITION_MODE == RenditionMode.LAZY:
+                url = reverse(
+                    url_name,
+                    kwargs=dict(url_kwargs, size=size, format=format),
+                )
+            else:
+                url = field_file.storage.url(
+                    get_rendition_name(field_file.name, size, format)
+                )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            rendition_urls[str(size)][format] = url
+
+    return rendition_urls
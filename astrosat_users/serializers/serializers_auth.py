@@ -22,6 +22,7 @@ from dj_rest_auth.registration.serializers import (
 from astrosat.serializers import ConsolidatedErrorsSerializerMixin
 
 from astrosat_users.conf import app_settings
+from astrosat_users.instrumentation import stage
 from astrosat_users.models import User, Customer
 from astrosat_users.models.models_users import UserRegistrationStageType
 from astrosat_users.utils import rest_decode_user_pk
@@ -54,7 +55,8 @@ class LoginSerializer(
         (this is the right place to put it; the KnoxLoginView has its own KnoxTokenSerializer for users and tokens,
         but that uses this serializer for the user and so validation will be checked when processing the view.)
         """
-        self.instance = super().validate(attrs)
+        with stage("authenticate"):
+            self.instance = super().validate(attrs)
         user = self.instance["user"]
 
         adapter = get_adapter(self.context.get("request"))
@@ -68,8 +70,10 @@ class LoginSerializer(
                 )
                 if user.accepted_terms != accepted_terms_value:
                     user.accepted_terms = accepted_terms_value
-                    user.save()
-            adapter.check_user(user)
+                    with stage("accepted_terms"):
+                        user.save()
+            with stage("check_user"):
+                adapter.check_user(user)
         except Exception as e:
             msg = {drf_settings.NON_FIELD_ERRORS_KEY: str(e)}
             raise ValidationError(msg)
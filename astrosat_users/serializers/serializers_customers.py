@@ -5,6 +5,7 @@ from allauth.account.adapter import get_adapter
 from astrosat.serializers import ContextVariableDefault
 
 from astrosat_users.models import Customer, CustomerUser, User, UserRole
+from astrosat_users.renditions import get_rendition_urls
 
 from .serializers_users import UserSerializerBasic
 from .serializers_auth import RegisterSerializer
@@ -23,6 +24,7 @@ class CustomerSerializer(serializers.ModelSerializer):
             "vat_number",
             "description",
             "logo",
+            "logo_renditions",
             "url",
             "country",
             "address",
@@ -31,6 +33,15 @@ class CustomerSerializer(serializers.ModelSerializer):
 
     id = serializers.UUIDField(read_only=True)
     type = serializers.CharField(source="customer_type")
+    logo_renditions = serializers.SerializerMethodField()
+
+    def get_logo_renditions(self, obj):
+        return get_rendition_urls(
+            obj.logo,
+            "customer-logo-rendition",
+            {"customer_id": obj.id},
+            request=self.context.get("request"),
+        )
 
     def validate(self, data):
         # the client sometimes includes empty strings as data
@@ -9,6 +9,7 @@ from astrosat_users.models import (
     UserPermission,
     CustomerUser,
 )
+from astrosat_users.renditions import get_rendition_urls
 
 
 class UserSerializerLite(serializers.ModelSerializer):
@@ -79,12 +80,9 @@ class UserSerializerBasic(serializers.ModelSerializer):
     def get_permissions(self, obj):
         """
         returns a read-only list of permissions belonging to the user
+        (including those inherited by the user's roles)
         """
-        roles_qs = obj.roles.exclude(permissions__isnull=True)
-        permission_names_qs = roles_qs.values_list(
-            "permissions__name", flat=True
-        )
-        return permission_names_qs.distinct()
+        return sorted(obj.astrosat_permissions)
 
     def to_representation(self, instance):
 
@@ -152,7 +150,9 @@ class UserSerializer(UserSerializerBasic):
             "is_approved",
             "registration_stage",
             "avatar",
+            "avatar_renditions",
             "customers",
+            "last_seen",
         ]
 
     class _CustomerUserSerializer(serializers.Serializer):
@@ -165,6 +165,16 @@ class UserSerializer(UserSerializerBasic):
 
     customers = serializers.SerializerMethodField()
 
+    avatar_renditions = serializers.SerializerMethodField()
+
+    def get_avatar_renditions(self, obj):
+        return get_rendition_urls(
+            obj.avatar,
+            "user-avatar-rendition",
+            {"user_id": obj.uuid},
+            request=self.context.get("request"),
+        )
+
     @swagger_serializer_method(
         serializer_or_field=_CustomerUserSerializer(many=True)
     )
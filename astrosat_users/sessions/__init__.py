@@ -0,0 +1,20 @@
+# session engines that store sessions in UserSession (ie: along w/ the pk of their user)
+# so that `delete_user_sessions` can find a user's sessions w/out decoding every session;
+# to use them set SESSION_ENGINE to "astrosat_users.sessions.db" or "astrosat_users.sessions.cached_db"
+
+from django.contrib.auth import SESSION_KEY
+
+
+class UserSessionStoreMixin:
+    @classmethod
+    def get_model_class(cls):
+        # (imported here, as w/ django.contrib.sessions, to avoid loading models too early)
+        from astrosat_users.models import UserSession
+
+        return UserSession
+
+    def create_model_instance(self, data):
+        obj = super().create_model_instance(data)
+        user_id = data.get(SESSION_KEY)
+        obj.auth_user_id = str(user_id) if user_id is not None else None
+        return obj
@@ -0,0 +1,8 @@
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+from astrosat_users.sessions import UserSessionStoreMixin
+
+
+class SessionStore(UserSessionStoreMixin, CachedDBStore):
+
+    cache_key_prefix = "astrosat_users.sessions.cached_db"
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from astrosat_users.sessions import UserSessionStoreMixin
+
+
+class SessionStore(UserSessionStoreMixin, DBStore):
+    pass
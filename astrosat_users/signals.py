@@ -13,3 +13,11 @@ from allauth.account.signals import password_changed
 customer_added_user = django.dispatch.Signal()
 # args passed = ["customer", "user"]
 customer_removed_user = django.dispatch.Signal()
+
+#########
+# users #
+#########
+
+# sent once when many users are logged out at once (see UserQuerySet.logout_all)
+# args passed = ["request", "user_ids"]
+users_logged_out = django.dispatch.Signal()
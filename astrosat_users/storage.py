@@ -0,0 +1,86 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+
+from astrosat_users.conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+# deleting files from (remote) storage is slow & shouldn't hold up a request, and
+# shouldn't happen at all if the db delete is rolled back; so deletions are deferred
+# until the transaction commits and then handed off to a small pool of threads
+
+S3_MAX_DELETE_KEYS = 1000  # the most keys a single S3 "DeleteObjects" request accepts
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_deletion_executor():
+    """
+    Returns the (lazily-created) pool used to delete files, or None if
+    ASTROSAT_USERS_STORAGE_DELETION_WORKERS is 0 (delete synchronously).
+    """
+    global _executor
+    max_workers = app_settings.ASTROSAT_USERS_STORAGE_DELETION_WORKERS
+    if not max_workers:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="astrosat_users_storage",
+            )
+    return _executor
+
+
+def delete_files(storage, names):
+    """
+    Deletes names from storage.  S3-like storages (django-storages' S3Boto3Storage)
+    delete up to S3_MAX_DELETE_KEYS files per request; other storages delete them one
+    at a time.  There is no need to check `storage.exists()` first; deleting a
+    missing file is not an error.
+    """
+    bucket = getattr(storage, "bucket", None)
+    if bucket is not None and hasattr(storage, "_normalize_name"):
+        for i in range(0, len(names), S3_MAX_DELETE_KEYS):
+            bucket.delete_objects(
+                Delete={
+                    "Objects": [
+                        {"Key": storage._normalize_name(name)}
+                        for name in names[i:i + S3_MAX_DELETE_KEYS]
+                    ],
+                    "Quiet": True,
+                }
+            )
+    else:
+        for name in names:
+            storage.delete(name)
+
+
+def _delete_files(storage, names):
+    try:
+        delete_files(storage, names)
+    except Exception:
+        # (this may be running in a worker thread, so there is nobody to raise to)
+        logger.exception(f"Unable to delete {len(names)} file(s) from storage.")
+
+
+def _submit_delete_files(storage, names):
+    executor = get_deletion_executor()
+    if executor is None:
+        _delete_files(storage, names)
+    else:
+        executor.submit(_delete_files, storage, names)
+
+
+def delete_files_on_commit(storage, names):
+    """
+    Deletes names from storage once the current transaction commits
+    (or straightaway if there is no transaction).
+    """
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: _submit_delete_files(storage, names))
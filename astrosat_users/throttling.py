@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+
+from collections.abc import Mapping
+
+from django.core.cache import cache
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from astrosat_users.conf import app_settings
+
+# login, password reset & email verification requests are throttled (before any password is
+# hashed or email is sent) by client IP and by the email they name; each (scope, key) pair has
+# a counter per fixed window in the shared cache, and the number of requests in the sliding
+# window ending now is estimated from the current & previous counters (weighting the previous
+# one by how much of it overlaps the sliding window); once a key is over its limit, that is
+# remembered in-process until it might not be, so a burst is rejected w/out touching the cache
+
+THROTTLE_CACHE_KEY = "astrosat_users:throttle:{scope}:{key}:{window}"
+
+THROTTLE_DURATIONS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+
+MAX_BLOCKED_KEYS = 10000  # (the most over-limit keys remembered in-process)
+
+_blocked = {}  # (scope, key) -> time when it might be allowed again
+_blocked_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """
+    Parses a rate like "5/min" (as w/ DRF) into (number of requests, duration in seconds).
+    """
+    if rate is None:
+        return (None, None)
+    num, period = rate.split("/")
+    return (int(num), THROTTLE_DURATIONS[period[0]])
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttles requests to views w/ an "astrosat_throttle_scope" at the rate in
+    ASTROSAT_USERS_THROTTLE_RATES for "<astrosat_throttle_scope>_<key_name>".
+    (This is separate from DRF's "throttle_scope", so that any ScopedRateThrottle
+    the view uses - such as dj-rest-auth's "dj_rest_auth" scope - still applies.)
+    Subclasses define key_name & get_key.
+    """
+
+    key_name = None
+
+    def get_key(self, request, view):
+        """
+        Returns the (unhashed) key to count this request against, or None to not throttle it.
+        """
+        raise NotImplementedError()
+
+    def allow_request(self, request, view):
+
+        self.wait_time = None
+
+        scope = getattr(view, "astrosat_throttle_scope", None)
+        if not scope:
+            return True
+        scope = f"{scope}_{self.key_name}"
+        num_requests, duration = parse_rate(
+            app_settings.ASTROSAT_USERS_THROTTLE_RATES.get(scope)
+        )
+        if num_requests is None:
+            return True
+
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        key = hashlib.sha256(key.encode()).hexdigest()
+
+        now = time.time()
+
+        # the in-process fast path...
+        blocked_until = _blocked.get((scope, key))
+        if blocked_until is not None:
+            if now < blocked_until:
+                self.wait_time = blocked_until - now
+                return False
+            with _blocked_lock:
+                _blocked.pop((scope, key), None)
+
+        window, elapsed = divmod(now, duration)
+        window = int(window)
+        current_cache_key = THROTTLE_CACHE_KEY.format(scope=scope, key=key, window=window)
+        previous_cache_key = THROTTLE_CACHE_KEY.format(scope=scope, key=key, window=window - 1)
+        counts = cache.get_many([current_cache_key, previous_cache_key])
+        current_count = counts.get(current_cache_key, 0)
+        previous_count = counts.get(previous_cache_key, 0)
+
+        overlap = 1 - elapsed / duration
+        if previous_count * overlap + current_count >= num_requests:
+            self.wait_time = self.get_wait_time(
+                num_requests, duration, elapsed, current_count, previous_count
+            )
+            self.block(scope, key, now + self.wait_time)
+            return False
+
+        # (the counters must outlive the window after theirs, since that one reads them too)
+        if not cache.add(current_cache_key, 1, timeout=2 * duration):
+            try:
+                cache.incr(current_cache_key)
+            except ValueError:
+                # (it expired between "add" & "incr")
+                cache.add(current_cache_key, 1, timeout=2 * duration)
+        return True
+
+    def get_wait_time(self, num_requests, duration, elapsed, current_count, previous_count):
+        if current_count < num_requests and previous_count:
+            # wait until enough of the previous window has slid out of the sliding window
+            return max(
+                duration * (1 - (num_requests - current_count) / previous_count) - elapsed, 0
+            )
+        # wait for the next window (and until enough of this one has slid out of the sliding window)
+        return duration - elapsed + max(0, duration * (1 - num_requests / current_count))
+
+    def block(self, scope, key, until):
+        with _blocked_lock:
+            if len(_blocked) >= MAX_BLOCKED_KEYS:
+                now = time.time()
+                for blocked_key, blocked_until in list(_blocked.items()):
+                    if blocked_until <= now:
+                        del _blocked[blocked_key]
+                if len(_blocked) >= MAX_BLOCKED_KEYS:
+                    _blocked.clear()
+            _blocked[(scope, key)] = until
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """
+    Throttles requests by client IP.  W/ DRF's NUM_PROXIES setting, that is read from
+    "X-Forwarded-For" (as per DRF); w/out it, "X-Forwarded-For" is ignored (since
+    a client could send a different one w/ every request) in favour of "REMOTE_ADDR".
+    """
+
+    key_name = "ip"
+
+    def get_key(self, request, view):
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get("REMOTE_ADDR")
+        return self.get_ident(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    """
+    Throttles requests by the (case-insensitive) email in the request data.
+    """
+
+    key_name = "email"
+
+    def get_key(self, request, view):
+        # (the body could be any JSON value; a list or a scalar just has no email to throttle)
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get("email") or request.data.get("username")
+        if not email or not isinstance(email, str):
+            return None
+        return email.strip().lower()
@@ -27,12 +27,17 @@ from .views import (
     UserViewSet,
     UserProfileView,
     MessageViewSet,
+    avatar_rendition_view,
+    logo_rendition_view,
     CustomerCreateView,
     CustomerUpdateView,
     CustomerUserListView,
     CustomerUserDetailView,
     CustomerUserInviteView,
     CustomerUserOnboardView,
+    UserExportView,
+    CustomerExportView,
+    CustomerUserExportView,
 )
 
 # API views that still authenticate w/ backend...
@@ -48,18 +53,36 @@ api_router.register(
     "users/(?P<user_id>[^/.]+)/messages", MessageViewSet, basename="messages"
 )
 api_urlpatterns = [
+    # (these must come before the routes whose ids would otherwise match "export")
+    path("users/export", UserExportView.as_view(), name="users-export"),
+    path("customers/export", CustomerExportView.as_view(), name="customers-export"),
+    path(
+        "customers/<slug:customer_id>/users/export",
+        CustomerUserExportView.as_view(),
+        name="customer-users-export",
+    ),
     path("", include(api_router.urls)),
     path(
         "users/<slug:user_id>/profiles/<str:profile_name>/",
         UserProfileView.as_view(),
         name="user-profiles"
     ),
+    path(
+        "users/<slug:user_id>/avatar/<int:size>.<str:format>",
+        avatar_rendition_view,
+        name="user-avatar-rendition",
+    ),
     path("customers/", CustomerCreateView.as_view(), name="customers-list"),
     path(
         "customers/<slug:customer_id>/",
         CustomerUpdateView.as_view(),
         name="customers-detail"
     ),
+    path(
+        "customers/<slug:customer_id>/logo/<int:size>.<str:format>",
+        logo_rendition_view,
+        name="customer-logo-rendition",
+    ),
     path(
         "customers/<slug:customer_id>/users/",
         CustomerUserListView.as_view(),
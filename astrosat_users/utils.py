@@ -1,19 +1,96 @@
+from importlib import import_module
+
 from knox.models import AuthToken
 
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBSessionStore
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 
+from astrosat_users.conf import app_settings
+from astrosat_users.instrumentation import stage
+from astrosat_users.sessions import UserSessionStoreMixin
+
 
 def create_knox_token(token_model, user, serializer):
-    instance, token = AuthToken.objects.create(user=user)
+    with stage("token"):
+        instance, token = AuthToken.objects.create(user=user)
+        max_tokens = app_settings.ASTROSAT_USERS_MAX_TOKENS_PER_USER
+        if max_tokens:
+            delete_surplus_tokens(user, max_tokens)
     # return token.token_key
     # token = AuthToken.objects.create(user=user)
     return (instance, token)
 
 
+def delete_surplus_tokens(user, max_tokens):
+    """
+    Deletes user's expired tokens and all but the newest max_tokens of their live tokens
+    (in a single query); returns the number deleted.
+    """
+    now = timezone.now()
+    user_tokens = AuthToken.objects.filter(user=user)
+    surplus_tokens = user_tokens.exclude(expiry__lt=now).order_by(
+        "-created", "-pk"
+    ).values("pk")[max_tokens:]
+    n_deleted, _ = user_tokens.filter(
+        Q(expiry__lt=now) | Q(pk__in=surplus_tokens)
+    ).delete()
+    return n_deleted
+
+
 def rest_encode_user_pk(user):
     return urlsafe_base64_encode(force_bytes(user.pk))
 
 
 def rest_decode_user_pk(encoded_user):
     return force_str(urlsafe_base64_decode(encoded_user))
+
+
+def delete_user_sessions(user_ids, batch_size=1000):
+    """
+    Deletes all of the sessions belonging to user_ids; returns the number deleted.
+    W/ the "astrosat_users.sessions" engines each session records its user, so they
+    are found directly.  Otherwise session data is encoded, so each unexpired session
+    has to be read & decoded (in batches).  Only db-backed sessions can be searched
+    like this; sessions stored only in the cache or in cookies cannot be found by user.
+    """
+    SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+    if not issubclass(SessionStore, DBSessionStore):
+        return 0
+
+    session_store = SessionStore()
+    session_model = SessionStore.get_model_class()
+    user_ids = set(map(str, user_ids))
+
+    if issubclass(SessionStore, UserSessionStoreMixin):
+        session_keys = list(
+            session_model.objects.filter(auth_user_id__in=user_ids).values_list(
+                "session_key", flat=True
+            )
+        )
+    else:
+        session_keys = [
+            session_key for session_key, session_data in session_model.objects.filter(
+                expire_date__gt=timezone.now()
+            ).values_list("session_key", "session_data").iterator(chunk_size=batch_size)
+            if str(session_store.decode(session_data).get(SESSION_KEY)) in user_ids
+        ]
+
+    n_deleted = 0
+    for i in range(0, len(session_keys), batch_size):
+        batch_session_keys = session_keys[i:i + batch_size]
+        n_deleted += session_model.objects.filter(
+            session_key__in=batch_session_keys
+        ).delete()[0]
+        if issubclass(SessionStore, CachedDBSessionStore):
+            session_store._cache.delete_many([
+                SessionStore.cache_key_prefix + session_key
+                for session_key in batch_session_keys
+            ])
+
+    return n_deleted
@@ -1,29 +1,137 @@
+import struct
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files.images import get_image_dimensions
+from django.template.defaultfilters import filesizeformat
 from django.utils.deconstruct import deconstructible
 
-from zxcvbn import zxcvbn
-
 from astrosat_users.conf import app_settings as astrosat_users_settings
+from astrosat_users.password_filter import get_password_filter
 
 #########################
 # user image validation #
 #########################
 
 
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+GIF_SIGNATURES = (b"GIF87a", b"GIF89a")
+JPEG_SIGNATURE = b"\xff\xd8"
+# JPEG "start of frame" markers (the ones that hold the dimensions)
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+}  # yapf: disable
+
+
+def _get_jpeg_dimensions(file, max_header_size):
+    # walks the JPEG segments (seeking over the ones that aren't needed)
+    # until it finds a SOF segment; gives up after "max_header_size" bytes
+    file.seek(len(JPEG_SIGNATURE))
+    while file.tell() < max_header_size:
+        marker = file.read(2)
+        while marker[:1] == b"\xff" and marker[1:] == b"\xff":
+            # skip fill bytes
+            marker = marker[1:] + file.read(1)
+        if len(marker) != 2 or marker[0] != 0xFF:
+            break
+        marker_type = marker[1]
+        if marker_type == 0xD9 or marker_type == 0xDA:
+            # end of image / start of scan; there's no frame header to be found
+            break
+        if marker_type == 0x01 or 0xD0 <= marker_type <= 0xD7:
+            # standalone markers w/ no length
+            continue
+        segment_length_data = file.read(2)
+        if len(segment_length_data) != 2:
+            break
+        (segment_length, ) = struct.unpack(">H", segment_length_data)
+        if marker_type in JPEG_SOF_MARKERS:
+            frame_data = file.read(5)
+            if len(frame_data) != 5:
+                break
+            _, height, width = struct.unpack(">BHH", frame_data)
+            return (width, height)
+        file.seek(segment_length - 2, 1)
+    return (None, None)
+
+
+def _get_webp_dimensions(header):
+    chunk_type = header[12:16]
+    if chunk_type == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        # lossy
+        width, height = struct.unpack("<HH", header[26:30])
+        return (width & 0x3FFF, height & 0x3FFF)
+    if chunk_type == b"VP8L" and header[20:21] == b"\x2f":
+        # lossless
+        (bits, ) = struct.unpack("<I", header[21:25])
+        return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk_type == b"VP8X":
+        # extended
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return (width, height)
+    return (None, None)
+
+
+def get_image_header_dimensions(file, max_header_size=64 * 1024):
+    """
+    Returns the (width, height) of a PNG, JPEG, GIF or WebP image by only
+    parsing its header; no more than "max_header_size" bytes are examined
+    (and JPEG segments are skipped over rather than read).
+    Returns (None, None) if the format isn't recognised.
+    """
+    file_pos = file.tell()
+    file.seek(0)
+    try:
+        header = file.read(32)
+        if header.startswith(PNG_SIGNATURE) and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in GIF_SIGNATURES:
+            return struct.unpack("<HH", header[6:10])
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return _get_webp_dimensions(header)
+        if header.startswith(JPEG_SIGNATURE):
+            return _get_jpeg_dimensions(file, max_header_size)
+        return (None, None)
+    except struct.error:
+        return (None, None)
+    finally:
+        file.seek(file_pos)
+
+
 @deconstructible
 class ImageDimensionsValidator:
     """
-    Validates the user image file has the correct dimensions
+    Validates the user image file has the correct dimensions.
+    The size of the file is checked first, and the dimensions are
+    read from the image header w/out decoding the image.
     """
-    def __init__(self, max_width=100, max_height=100):
+    def __init__(self, max_width=100, max_height=100, max_size=None):
         assert max_width > 0 and max_height > 0, "Invalid AvatarDimensionsValidator"
+        assert max_size is None or max_size > 0, "Invalid AvatarDimensionsValidator"
         self.max_width = max_width
         self.max_height = max_height
+        self.max_size = max_size
 
     def __call__(self, avatar):
 
-        width, height = get_image_dimensions(avatar)
+        max_size = self.max_size or astrosat_users_settings.ASTROSAT_USERS_MAX_IMAGE_SIZE
+        if max_size and avatar.size > max_size:
+            raise ValidationError(
+                f"avatar must not be larger than {filesizeformat(max_size)}"
+            )
+
+        width, height = get_image_header_dimensions(
+            avatar,
+            max_header_size=astrosat_users_settings.ASTROSAT_USERS_MAX_IMAGE_HEADER_SIZE,
+        )
+        if width is None or height is None:
+            # not a format w/ a header I understand; let PIL have a go
+            # (the file size has already been checked, so this is bounded)
+            width, height = get_image_dimensions(avatar)
+        if width is None or height is None:
+            raise ValidationError("Unable to determine the dimensions of avatar")
+
         if width > self.max_width or height > self.max_height:
             raise ValidationError(
                 f"avatar must not be greater than {self.max_width} x {self.max_height} pixels"
@@ -33,7 +141,8 @@ class ImageDimensionsValidator:
         return (
             isinstance(other, ImageDimensionsValidator) and
             (self.max_height == other.max_height) and
-            (self.max_width == other.max_width)
+            (self.max_width == other.max_width) and
+            (self.max_size == other.max_size)
         )
 
 
@@ -77,6 +186,79 @@ class LengthPasswordValidator:
         return f"The password must contain between {self.min_length} and {self.max_length} characters."
 
 
+BREACHED_PASSWORD_VALIDATOR_NAME = "astrosat_users.validators.BreachedPasswordValidator"
+
+
+def get_password_filter_path(path=None):
+    """
+    Returns the path of the password filter shared by BreachedPasswordValidator &
+    StrengthPasswordValidator: path if it is given, otherwise the "path" option of
+    BreachedPasswordValidator in AUTH_PASSWORD_VALIDATORS, otherwise
+    ASTROSAT_USERS_PASSWORD_FILTER_PATH.
+    """
+    if path:
+        return path
+    for validator in settings.AUTH_PASSWORD_VALIDATORS:
+        if validator["NAME"] == BREACHED_PASSWORD_VALIDATOR_NAME:
+            path = validator.get("OPTIONS", {}).get("path")
+            if path:
+                return path
+    return astrosat_users_settings.ASTROSAT_USERS_PASSWORD_FILTER_PATH
+
+
+class BreachedPasswordValidator:
+    """
+    Validates the password is not in a list of common/breached passwords.
+    The list is a (memory-mapped) filter built by "manage.py build_password_filter";
+    path defaults to ASTROSAT_USERS_PASSWORD_FILTER_PATH.  Checking a password costs a
+    few microseconds, so this should come before StrengthPasswordValidator.
+    Note the filter can have (rare) false positives, but no false negatives.
+    """
+    def __init__(self, path=None):
+        self.path = path
+
+    def get_password_filter(self):
+        return get_password_filter(get_password_filter_path(self.path))
+
+    def validate(self, password, user=None):
+
+        password_filter = self.get_password_filter()
+        if password_filter is not None and password in password_filter:
+            raise ValidationError(
+                "This password is too common.", code="password_too_common"
+            )
+
+    def get_help_text(self):
+        return "The password must not be a commonly used password."
+
+
+# zxcvbn builds large frequency dictionaries when it is imported; so it is only
+# imported when a password is first validated (or when the app is ready, if
+# ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION is set), rather than by every process
+# that happens to import this module
+
+_zxcvbn = None
+
+
+def get_zxcvbn():
+    """
+    Returns the zxcvbn fn (importing it the first time this is called).
+    """
+    global _zxcvbn
+    if _zxcvbn is None:
+        from zxcvbn import zxcvbn
+        _zxcvbn = zxcvbn
+    return _zxcvbn
+
+
+def prewarm_zxcvbn():
+    """
+    Imports zxcvbn and scores a password, so that the first
+    real validation doesn't pay for loading the dictionaries.
+    """
+    get_zxcvbn()("prewarm-Passw0rd", user_inputs=["prewarm@example.com"])
+
+
 class StrengthPasswordValidator:
     """
     Validates a password using the zxcvbn strength estimator.
@@ -86,23 +268,52 @@ class StrengthPasswordValidator:
         2 # somewhat guessable: protection from unthrottled online attacks. (guesses < 10^8)
         3 # safely unguessable: moderate protection from offline slow-hash scenario. (guesses < 10^10)
         4 # very unguessable: strong protection from offline slow-hash scenario. (guesses >= 10^10)
+    Passwords in the password filter score 0 w/out being scored; path defaults to the
+    one used by BreachedPasswordValidator (see get_password_filter_path).  zxcvbn's cost grows quickly w/ the length of the password, so only the
+    first max_scored_length characters are scored (which bounds the cost of each estimate).
+    Passwords of at least strong_length characters (if set) are considered strong w/out being scored.
     """
-    def __init__(self, strength=astrosat_users_settings.PASSWORD_STRENGTH):
+    def __init__(
+        self,
+        strength=astrosat_users_settings.PASSWORD_STRENGTH,
+        max_scored_length=None,
+        strong_length=None,
+        path=None,
+    ):
         assert 0 <= strength <= 4, "Invalid StrongPasswordValidator strength."
         self.strength = strength
+        self.path = path
+        self.max_scored_length = max_scored_length or astrosat_users_settings.ASTROSAT_USERS_PASSWORD_STRENGTH_MAX_SCORED_LENGTH
+        self.strong_length = strong_length or astrosat_users_settings.ASTROSAT_USERS_PASSWORD_STRENGTH_STRONG_LENGTH
 
-    def validate(self, password, user=None):
+    def get_score(self, password, user=None):
+
+        password_filter = get_password_filter(get_password_filter_path(self.path))
+        if password_filter is not None and password in password_filter:
+            return 0
+
+        if self.strong_length and len(password) >= self.strong_length:
+            return 4
 
         user_inputs = [user.email, user.username, user.name
                       ] if user is not None else []
 
-        password_results = zxcvbn(password, user_inputs=user_inputs)
+        password_results = get_zxcvbn()(
+            password[:self.max_scored_length], user_inputs=user_inputs
+        )
+        return password_results["score"]
+
+    def check_score(self, score):
 
-        if password_results["score"] < self.strength:
+        if score < self.strength:
             error_msg = "The password must not be weak."
             # error_msg += password_results["feedback"]["warning"]
             # error_msg += "; ".join(password_results["feedback"]["suggestions"])
             raise ValidationError(error_msg, code="password_too_weak")
 
+    def validate(self, password, user=None):
+
+        self.check_score(self.get_score(password, user))
+
     def get_help_text(self):
         return f"The password must be strong."
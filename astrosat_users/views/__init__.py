@@ -17,7 +17,13 @@ from .views_customers import (
     CustomerUserInviteView,
     CustomerUserOnboardView,
 )
+from .views_exports import (
+    CustomerExportView,
+    CustomerUserExportView,
+    UserExportView,
+)
 from .views_users import UserViewSet, UserListView, UserDetailView, UserUpdateView
 from .views_profiles import UserProfileView
 from .views_messages import MessageViewSet
+from .views_renditions import avatar_rendition_view, logo_rendition_view
 from .views_text import text_view
@@ -1,5 +1,6 @@
 from collections import OrderedDict
 
+from django.contrib.auth.models import update_last_login
 from django.utils.decorators import method_decorator
 from django.views.decorators.debug import sensitive_post_parameters
 from django.utils.translation import gettext_lazy as _
@@ -9,6 +10,7 @@ from rest_framework.exceptions import ValidationError, PermissionDenied
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import BasePermission, IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from drf_yasg2 import openapi
 from drf_yasg2.utils import swagger_auto_schema
@@ -31,6 +33,7 @@ from dj_rest_auth.registration.views import (
 )
 
 from astrosat_users.conf import app_settings as astrosat_users_settings
+from astrosat_users.instrumentation import recording, stage
 from astrosat_users.models.models_users import UserRegistrationStageType
 from astrosat_users.serializers import (
     UserSerializerLite,
@@ -38,6 +41,7 @@ from astrosat_users.serializers import (
     VerifyEmailSerializer,
     SendEmailVerificationSerializer,
 )
+from astrosat_users.throttling import EmailThrottle, IPThrottle
 from astrosat_users.utils import create_knox_token
 
 REGISTRATION_CLOSED_MSG = _(
@@ -146,6 +150,9 @@ class LoginView(RestAuthLoginView):
     """
 
     permission_classes = [IsNotAuthenticated]
+    # (throttles are checked before the request is validated, so before any password is hashed)
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [IPThrottle, EmailThrottle]
+    astrosat_throttle_scope = "login"
 
     def get_success_response(self):
         # this creates a response based on the KnoxTokenSerializer
@@ -168,13 +175,32 @@ class LoginView(RestAuthLoginView):
             error_details["user"] = user_serializer_lite.data
         return Response(error_details, status=status.HTTP_400_BAD_REQUEST)
 
+    def process_login(self):
+        if astrosat_users_settings.ASTROSAT_USERS_TOKEN_ONLY_API_LOGIN:
+            # the client authenticates w/ the knox token, so don't bother creating a
+            # session (or sending "user_logged_in"); just update last_login
+            update_last_login(None, self.user)
+        else:
+            super().process_login()
+
     def post(self, request, *args, **kwargs):
+        with recording("login") as login_recording:
+            response = self.post_login(request, *args, **kwargs)
+        if login_recording is not None and astrosat_users_settings.ASTROSAT_USERS_INSTRUMENTATION_HEADER:
+            response["Server-Timing"] = login_recording.to_server_timing()
+        return response
+
+    def post_login(self, request, *args, **kwargs):
         self.request = request
         self.serializer = self.get_serializer(data=self.request.data)
         # the base class automatically raises an error on an invalid request
-        if self.serializer.is_valid():
-            self.login()
-            return self.get_success_response()
+        with stage("validate"):
+            is_valid = self.serializer.is_valid()
+        if is_valid:
+            with stage("login"):
+                self.login()
+            with stage("response"):
+                return self.get_success_response()
         # but this class manually creates the invalid response
         return self.get_error_response()
 
@@ -207,7 +233,8 @@ class PasswordResetView(RestAuthPasswordResetView):
     Calls Django Auth PasswordResetForm save method.
     """
 
-    pass
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [IPThrottle, EmailThrottle]
+    astrosat_throttle_scope = "password_reset"
 
 
 class PasswordResetConfirmView(RestAuthPasswordResetConfirmView):
@@ -324,6 +351,8 @@ class SendEmailVerificationView(GenericAPIView):
     """
 
     serializer_class = SendEmailVerificationSerializer
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [IPThrottle, EmailThrottle]
+    astrosat_throttle_scope = "email_verification"
 
     def post(self, request, *args, **kwargs):
 
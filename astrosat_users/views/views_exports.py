@@ -0,0 +1,87 @@
+import json
+
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from django_filters import rest_framework as filters
+
+from astrosat_users.exports import (
+    EXPORT_FORMATS,
+    export_customer_users,
+    export_customers,
+    export_users,
+)
+from astrosat_users.models import Customer, User
+from astrosat_users.views.views_customers import (
+    CustomerUserFilterSet,
+    CustomerUserViewMixin,
+    IsManagerPermission,
+)
+from astrosat_users.views.views_users import UserFilterSet
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets DRF's content negotiation choose the export format (either
+    via "?format=<format>" or the "Accept" header); the actual content
+    is written by the StreamingHttpResponse of the views below.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # only used for errors (the export itself bypasses renderers)
+        return json.dumps(data, cls=JSONEncoder)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = EXPORT_FORMATS["csv"]
+    format = "csv"
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = EXPORT_FORMATS["ndjson"]
+    format = "ndjson"
+
+
+class ExportViewMixin(object):
+    """
+    Streams the (filtered) queryset using export_fn;
+    "?format=csv" (the default) or "?format=ndjson".
+    """
+
+    renderer_classes = [CSVExportRenderer, NDJSONExportRenderer]
+    filter_backends = (filters.DjangoFilterBackend, )
+    swagger_schema = None  # (the content isn't described by a serializer)
+
+    export_fn = None
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.export_fn(queryset, request.accepted_renderer.format)
+
+
+class UserExportView(ExportViewMixin, generics.GenericAPIView):
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    filterset_class = UserFilterSet
+    queryset = User.objects.all()
+    export_fn = staticmethod(export_users)
+
+
+class CustomerExportView(ExportViewMixin, generics.GenericAPIView):
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    queryset = Customer.objects.all()
+    export_fn = staticmethod(export_customers)
+
+
+class CustomerUserExportView(
+    ExportViewMixin, CustomerUserViewMixin, generics.GenericAPIView
+):
+
+    permission_classes = [IsAuthenticated, IsManagerPermission]
+    filterset_class = CustomerUserFilterSet
+    export_fn = staticmethod(export_customer_users)
@@ -1,20 +1,45 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+
+import django
 from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.db.models import Max
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import decorators
 from django.utils.decorators import method_decorator
 from django.utils.functional import cached_property
 
-from rest_framework import generics, mixins, viewsets
+from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, BasePermission
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
 from django_filters import rest_framework as filters
 
 from astrosat.decorators import swagger_fake
 from astrosat.views import BetterBooleanFilter
 
+from astrosat_users.conf import app_settings
 from astrosat_users.models import Message
+from astrosat_users.pubsub import (
+    MessageStreamBackend,
+    get_message_stream_version,
+    message_broker,
+)
 from astrosat_users.serializers import MessageSerializer
 
+# Django only serves async iterators asynchronously from 4.2; before that, ASGIHandler iterates
+# the response on the event loop, so a (blocking) stream would stall every other request
+ASYNC_STREAMING_SUPPORTED = django.VERSION >= (4, 2)
+
 
 class IsAdminOrSelf(BasePermission):
     def has_permission(self, request, view):
@@ -34,6 +59,163 @@ class MessageFilterSet(filters.FilterSet):
     archived = BetterBooleanFilter()
 
 
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF's content negotiation accept "text/event-stream";
+    the actual content is written by MessageEventStream below.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # only used for errors (the stream itself bypasses renderers)
+        return f"event: error\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
+
+
+class MessageEventStream:
+    """
+    Pushes a user's new messages to the client as server-sent events.
+
+    Can be consumed either synchronously (iter, for WSGI) or asynchronously (aiter,
+    for ASGI w/ a version of Django that supports async streaming responses).  While the stream
+    is idle it waits on the in-process message_broker and so costs no db queries
+    (nor holds a db connection - see release_connection); when running multiple workers,
+    set ASTROSAT_USERS_MESSAGE_STREAM_BACKEND to "cache" (or "db") so that messages
+    created by other workers are noticed too.
+    """
+    def __init__(self, user, last_id=None, context=None):
+        self.user = user
+        self.last_id = last_id
+        self.context = context or {}
+        self.cache_version = None
+
+        self.backend = app_settings.ASTROSAT_USERS_MESSAGE_STREAM_BACKEND
+        self.keepalive_interval = (
+            app_settings.ASTROSAT_USERS_MESSAGE_STREAM_KEEPALIVE_INTERVAL
+        )
+        self.timeout = app_settings.ASTROSAT_USERS_MESSAGE_STREAM_TIMEOUT
+        if self.backend == MessageStreamBackend.LOCAL:
+            self.wait_interval = self.keepalive_interval
+        else:
+            self.wait_interval = min(
+                self.keepalive_interval,
+                app_settings.ASTROSAT_USERS_MESSAGE_STREAM_POLL_INTERVAL,
+            )
+
+    def setup(self):
+        if self.last_id is None:
+            # only messages created after connecting are sent...
+            messages_aggregate = self.user.messages.aggregate(max_id=Max("id"))
+            self.last_id = messages_aggregate["max_id"] or 0
+            self.release_connection()
+        if self.backend == MessageStreamBackend.CACHE:
+            self.cache_version = get_message_stream_version(self.user.pk)
+
+    def release_connection(self):
+        """
+        Closes this thread's db connection; a stream stays open for a long time but only
+        queries the db now & then, so it shouldn't hold onto a connection in between.
+        """
+        # (closing a connection inside a transaction would break the transaction;
+        # the stream is consumed after the view returns, so that is only the case in tests)
+        if not connection.in_atomic_block:
+            connection.close()
+
+    def poll(self):
+        """
+        Checks for messages published by other workers.
+        Returns True if there may be new messages.
+        """
+        if self.backend == MessageStreamBackend.CACHE:
+            cache_version = get_message_stream_version(self.user.pk)
+            if cache_version != self.cache_version:
+                self.cache_version = cache_version
+                return True
+        elif self.backend == MessageStreamBackend.DB:
+            return True
+        return False
+
+    def fetch(self):
+        messages = list(
+            self.user.messages.filter(
+                id__gt=self.last_id
+            ).order_by("id").prefetch_related("attachments")
+        )  # yapf: disable
+        if messages:
+            self.last_id = messages[-1].id
+        events = [
+            (message.id, MessageSerializer(message, context=self.context).data)
+            for message in messages
+        ]
+        self.release_connection()
+        return events
+
+    def render(self, events):
+        return "".join(
+            f"id: {message_id}\nevent: message\ndata: {json.dumps(message_data, cls=JSONEncoder)}\n\n"
+            for message_id, message_data in events
+        )
+
+    def render_preamble(self):
+        # tells the client how long to wait (in ms) before reconnecting
+        return f"retry: {int(self.wait_interval * 1000)}\n\n"
+
+    def render_keepalive(self):
+        return ": keepalive\n\n"
+
+    def __iter__(self):
+        subscription = message_broker.subscribe(self.user.pk)
+        try:
+            self.setup()
+            yield self.render_preamble()
+            events = self.fetch() if self.context.get("resume") else []
+            if events:
+                yield self.render(events)
+            deadline = time.monotonic() + self.timeout
+            last_write = time.monotonic()
+            while time.monotonic() < deadline:
+                payload = subscription.get(timeout=self.wait_interval)
+                if payload is not None or self.poll():
+                    events = self.fetch()
+                    if events:
+                        last_write = time.monotonic()
+                        yield self.render(events)
+                        continue
+                if time.monotonic() - last_write >= self.keepalive_interval:
+                    last_write = time.monotonic()
+                    yield self.render_keepalive()
+        finally:
+            subscription.close()
+
+    async def aiter(self):
+        subscription = message_broker.subscribe(
+            self.user.pk, loop=asyncio.get_running_loop()
+        )
+        try:
+            await sync_to_async(self.setup)()
+            yield self.render_preamble()
+            events = await sync_to_async(self.fetch)() if self.context.get("resume") else []
+            if events:
+                yield self.render(events)
+            deadline = time.monotonic() + self.timeout
+            last_write = time.monotonic()
+            while time.monotonic() < deadline:
+                payload = await subscription.aget(timeout=self.wait_interval)
+                if payload is not None or await sync_to_async(self.poll)():
+                    events = await sync_to_async(self.fetch)()
+                    if events:
+                        last_write = time.monotonic()
+                        yield self.render(events)
+                        continue
+                if time.monotonic() - last_write >= self.keepalive_interval:
+                    last_write = time.monotonic()
+                    yield self.render_keepalive()
+        finally:
+            subscription.close()
+
+
 @method_decorator(name="get_object", decorator=swagger_fake(None))
 class MessageViewSet(
     mixins.ListModelMixin,
@@ -64,3 +246,42 @@ class MessageViewSet(
         else:
             context["user"] = self.user
         return context
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="stream",
+        renderer_classes=[EventStreamRenderer, JSONRenderer],
+        filter_backends=[],
+    )
+    def stream(self, request, *args, **kwargs):
+        """
+        Streams new messages as server-sent events.  A client that reconnects
+        w/ a "Last-Event-ID" header is sent any messages it has missed.
+        """
+        last_event_id = request.META.get("HTTP_LAST_EVENT_ID")
+        try:
+            last_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_id = None
+
+        if isinstance(request._request, ASGIRequest) and not ASYNC_STREAMING_SUPPORTED:
+            return Response(
+                {"detail": "Streaming messages is not supported under ASGI w/ this version of Django."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        context = self.get_serializer_context()
+        context["resume"] = last_id is not None
+
+        # (Django w/ async streaming support would consume a sync iterator in a thread under ASGI
+        # and would buffer an async iterator entirely under WSGI, so pass whichever one fits)
+        message_event_stream = MessageEventStream(self.user, last_id=last_id, context=context)
+        response = StreamingHttpResponse(
+            message_event_stream.aiter()
+            if isinstance(request._request, ASGIRequest) else iter(message_event_stream),
+            content_type=EventStreamRenderer.media_type,
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+        return response
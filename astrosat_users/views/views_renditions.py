@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.views.decorators.http import require_GET
+
+from astrosat_users.models import Customer
+from astrosat_users.renditions import get_or_generate_rendition, is_valid_rendition
+
+
+def _rendition_response(field_file, size, format):
+    if not field_file or not is_valid_rendition(size, format):
+        raise Http404()
+
+    rendition_name = get_or_generate_rendition(field_file, size, format)
+    if rendition_name is None:
+        # this isn't an image that can be resized; just use the original
+        return redirect(field_file.url)
+
+    return redirect(field_file.storage.url(rendition_name))
+
+
+@require_GET
+def avatar_rendition_view(request, user_id, size, format):
+    """
+    Redirects to a rendition of a user's avatar (generating it if needed).
+    (Avatars are public - they are served from MEDIA_URL - so no authentication is needed.)
+    """
+    user = get_object_or_404(get_user_model(), uuid=user_id)
+    return _rendition_response(user.avatar, size, format)
+
+
+@require_GET
+def logo_rendition_view(request, customer_id, size, format):
+    """
+    Redirects to a rendition of a customer's logo (generating it if needed).
+    (Logos are public - they are served from MEDIA_URL - so no authentication is needed.)
+    """
+    customer = get_object_or_404(Customer, id=customer_id)
+    return _rendition_response(customer.logo, size, format)
@@ -119,18 +119,18 @@ class UserFilterSet(filters.FilterSet):
     def filter_permissions_or(self, queryset, name, value):
         permission_names = value.split(",")
         return queryset.filter(
-            roles__permissions__name__in=permission_names
+            roles__effective_permissions__name__in=permission_names
         ).distinct()  # yapf: disable
 
     def filter_permissions_and(self, queryset, name, value):
         permission_names = value.split(",")
         return (
             queryset.filter(
-                roles__permissions__name__in=permission_names
+                roles__effective_permissions__name__in=permission_names
             ).annotate(
-                num_permissions=Count("roles__permissions")
+                num_permissions=Count("roles__effective_permissions", distinct=True)
             ).filter(
-                num_permissions=len(permission_names)
+                num_permissions=len(set(permission_names))
             )
         )  # yapf: disable
 
@@ -0,0 +1,81 @@
+"""
+Compares the peak memory & latency of validating large "avatar" uploads
+using PIL (django's get_image_dimensions) and ImageDimensionsValidator.
+"""
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "example.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from PIL import Image  # noqa: E402
+
+from django.core.exceptions import ValidationError  # noqa: E402
+from django.core.files.images import get_image_dimensions  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+
+from astrosat_users.validators import ImageDimensionsValidator  # noqa: E402
+
+N_REPEATS = 5
+
+
+def make_upload(name, size, format, **kwargs):
+    content = io.BytesIO()
+    Image.effect_noise(size, 64).convert("RGB").save(content, format, **kwargs)
+    return SimpleUploadedFile(name=name, content=content.getvalue())
+
+
+def measure(fn, upload):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(N_REPEATS):
+        upload.seek(0)
+        try:
+            fn(upload)
+        except ValidationError:
+            pass
+    elapsed = (time.perf_counter() - start) / N_REPEATS
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    uploads = [
+        make_upload("large.png", (4000, 4000), "PNG"),
+        make_upload("large.webp", (4000, 4000), "WEBP"),
+        make_upload("large.jpg", (4000, 4000), "JPEG"),
+        # a JPEG whose frame header is a long way into the file
+        make_upload(
+            "late_header.jpg", (64, 64), "JPEG", exif=b"Exif\x00\x00" + b"x" * 65000
+        ),
+    ]
+
+    validators = [
+        ("get_image_dimensions", get_image_dimensions),
+        ("ImageDimensionsValidator", ImageDimensionsValidator()),
+        (
+            "ImageDimensionsValidator (no size cap)",
+            ImageDimensionsValidator(max_size=sys.maxsize),
+        ),
+    ]
+
+    print(f"{'upload':<18}{'size':>12}  {'method':<40}{'latency (ms)':>14}{'peak (KiB)':>12}")
+    for upload in uploads:
+        for validator_name, validator in validators:
+            elapsed, peak = measure(validator, upload)
+            print(
+                f"{upload.name:<18}{upload.size:>12}  {validator_name:<40}{elapsed * 1000:>14.3f}{peak / 1024:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
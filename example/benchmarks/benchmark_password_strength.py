@@ -0,0 +1,80 @@
+"""
+Compares the latency of scoring passwords of increasing length w/ zxcvbn
+on the whole password and w/ StrengthPasswordValidator (which only scores
+a prefix of ASTROSAT_USERS_PASSWORD_STRENGTH_MAX_SCORED_LENGTH characters).
+"""
+
+import inspect
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "example.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.exceptions import ValidationError  # noqa: E402
+
+from astrosat_users.conf import app_settings  # noqa: E402
+from astrosat_users.validators import StrengthPasswordValidator, get_zxcvbn  # noqa: E402
+
+LENGTHS = [8, 16, 32, 64, 128, 255]
+
+N_REPEATS = 5
+
+CHARACTERS = string.ascii_letters + string.digits + string.punctuation
+
+
+def make_passwords(length):
+    rng = random.Random(length)
+    return {
+        "random": "".join(rng.choice(CHARACTERS) for _ in range(length)),
+        "words": "".join(
+            rng.choice(["password", "dragon", "monkey", "1234", "qwerty"])
+            for _ in range(length)
+        )[:length],
+    }
+
+
+def score_whole_password(password):
+    zxcvbn = get_zxcvbn()
+    if "max_length" in inspect.signature(zxcvbn).parameters:
+        # (newer versions of zxcvbn refuse long passwords by default)
+        return zxcvbn(password, max_length=len(password))
+    return zxcvbn(password)
+
+
+def validate(password):
+    try:
+        StrengthPasswordValidator().validate(password)
+    except ValidationError:
+        pass
+
+
+def measure(fn, password):
+    fn(password)  # (warm up)
+    start = time.perf_counter()
+    for _ in range(N_REPEATS):
+        fn(password)
+    return (time.perf_counter() - start) / N_REPEATS
+
+
+def main():
+    print(
+        f"(scoring at most {app_settings.ASTROSAT_USERS_PASSWORD_STRENGTH_MAX_SCORED_LENGTH} characters)"
+    )
+    print(f"{'length':>8}  {'password':<10}{'zxcvbn (ms)':>14}{'validator (ms)':>16}")
+    for length in LENGTHS:
+        for kind, password in make_passwords(length).items():
+            print(
+                f"{length:>8}  {kind:<10}{measure(score_whole_password, password) * 1000:>14.2f}{measure(validate, password) * 1000:>16.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the startup time, memory (RSS) & first/subsequent password validation
+latency of a process where zxcvbn is imported eagerly (as it used to be), lazily
+(on first use), or pre-warmed when the app is ready.  Each mode is measured in a
+fresh process, since the point is what happens when a worker starts.
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+EXAMPLE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ["eager", "lazy", "prewarm"]
+
+N_REPEATS = 20
+
+PASSWORD = "correct-Horse-battery-staple-42"
+
+
+def get_rss():
+    # (the current RSS where /proc is available, otherwise the peak RSS)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def measure(mode):
+    # runs in a child process...
+    sys.path.insert(0, EXAMPLE_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "example.settings")
+
+    start = time.perf_counter()
+    if mode == "eager":
+        import zxcvbn  # noqa: F401
+    import django
+    django.setup()
+    startup_time = time.perf_counter() - start
+    startup_rss = get_rss()
+
+    from django.contrib.auth import get_user_model
+    from astrosat_users.validators import StrengthPasswordValidator
+
+    validator = StrengthPasswordValidator()
+    user = get_user_model()(username="bob", email="bob@example.com", name="Bob")
+
+    start = time.perf_counter()
+    validator.validate(PASSWORD, user=user)
+    first_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(N_REPEATS):
+        validator.validate(PASSWORD, user=user)
+    subsequent_time = (time.perf_counter() - start) / N_REPEATS
+
+    return {
+        "startup_time": startup_time,
+        "startup_rss": startup_rss,
+        "first_time": first_time,
+        "subsequent_time": subsequent_time,
+        "final_rss": get_rss(),
+    }
+
+
+def main():
+    print(
+        f"{'mode':<10}{'startup (ms)':>14}{'startup RSS (MiB)':>20}{'1st validation (ms)':>22}{'nth validation (ms)':>22}{'final RSS (MiB)':>18}"
+    )
+    for mode in MODES:
+        env = dict(os.environ)
+        env["DJANGO_ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION"] = str(mode == "prewarm")
+        output = subprocess.run(
+            [sys.executable, __file__, mode],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results = json.loads(output.splitlines()[-1])
+        print(
+            f"{mode:<10}{results['startup_time'] * 1000:>14.1f}{results['startup_rss'] / 2**20:>20.1f}{results['first_time'] * 1000:>22.2f}{results['subsequent_time'] * 1000:>22.2f}{results['final_rss'] / 2**20:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+    else:
+        main()
@@ -64,6 +64,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "astrosat_users.middleware.LastSeenMiddleware",
 ]
 
 ROOT_URLCONF = "example.urls"
@@ -123,7 +124,11 @@ REST_FRAMEWORK = {
         # "rest_framework.authentication.TokenAuthentication",  # tokens
         # "dj_rest_auth.utils.JWTCookieAuthentication",  # JWT tokens
         "knox.auth.TokenAuthentication"  # secure tokens
-    ]
+    ],
+    "DEFAULT_THROTTLE_CLASSES": ["rest_framework.throttling.ScopedRateThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "dj_rest_auth": None,  # (dj-rest-auth's views; None means no limit)
+    },
 }
 
 SWAGGER_SETTINGS = {
@@ -163,7 +168,8 @@ AUTH_USER_MODEL = "astrosat_users.User"
 
 AUTHENTICATION_BACKENDS = (
     "django.contrib.auth.backends.ModelBackend",
-    "allauth.account.auth_backends.AuthenticationBackend",
+    # (like "allauth.account.auth_backends.AuthenticationBackend" but w/ fewer queries)
+    "astrosat_users.backends.AuthenticationBackend",
 )
 
 ACCOUNT_ADAPTER = "astrosat_users.adapters.AccountAdapter"
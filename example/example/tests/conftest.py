@@ -1,15 +1,18 @@
 import pytest
 import factory
+import time
 from factory.faker import (
     Faker as FactoryFaker,
 )  # note I use FactoryBoy's wrapper of Faker
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 
 from django.test import Client
 from rest_framework.test import APIClient
 
+from astrosat_users import activity, throttling
 from astrosat_users.models import UserSettings
 from astrosat_users.serializers import UserSerializer
 from astrosat_users.tests.utils import *
@@ -80,3 +83,32 @@ def api_client(user):
 def user_settings():
     user_settings = UserSettings.load()
     return user_settings
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    The cache outlives each test's db transaction (and pks are reused),
+    so make sure nothing cached by one test leaks into the next.
+    """
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_last_seen():
+    """
+    LastSeenMiddleware buffers activity in-process (and pks are reused), so make sure
+    each test starts w/ an empty buffer and isn't interrupted by a periodic flush.
+    """
+    activity._pending.clear()
+    activity._seen_this_minute.clear()
+    activity._last_flush = time.monotonic()
+
+
+@pytest.fixture(autouse=True)
+def reset_throttling():
+    """
+    The throttles remember over-limit keys in-process, so make sure
+    one test's throttled requests don't throttle the next test's.
+    """
+    throttling._blocked.clear()
@@ -0,0 +1,69 @@
+import pytest
+
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from astrosat.tests.utils import *
+
+from astrosat_users.activity import flush_last_seen, record_last_seen
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+@pytest.mark.django_db
+class TestLastSeen:
+    def test_record_last_seen(self, mock_storage, django_assert_num_queries):
+        users = [UserFactory() for _ in range(3)]
+        now = timezone.now()
+        minute = now.replace(second=0, microsecond=0)
+
+        # activity is recorded once per user per minute...
+        assert record_last_seen(users[0].pk, now=now) is True
+        assert record_last_seen(users[0].pk, now=now + timedelta(seconds=1)) is False
+        for user in users[1:]:
+            assert record_last_seen(user.pk, now=now) is True
+
+        # and written w/ a single query...
+        with django_assert_num_queries(1):
+            assert flush_last_seen() == 3
+        for user in users:
+            user.refresh_from_db()
+            assert user.last_seen == minute
+
+        # last_seen never moves backwards...
+        record_last_seen(users[0].pk, now=now - timedelta(minutes=5))
+        flush_last_seen()
+        users[0].refresh_from_db()
+        assert users[0].last_seen == minute
+
+        # and there's nothing to write when nobody has been seen...
+        with django_assert_num_queries(0):
+            assert flush_last_seen() == 0
+
+    def test_last_seen_middleware(self, user, settings):
+        settings.ASTROSAT_USERS_LAST_SEEN_FLUSH_INTERVAL = 0
+
+        _, key = create_auth_token(user)
+        client = APIClient()
+        url = reverse("users-list")
+
+        # anonymous requests aren't recorded...
+        response = client.get(url)
+        assert status.is_client_error(response.status_code)
+
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        response = client.get(url)
+        assert status.is_success(response.status_code)
+
+        user.refresh_from_db()
+        assert user.last_seen is not None
+        assert timezone.now() - user.last_seen < timedelta(minutes=2)
+
+        response = client.get(reverse("users-detail", kwargs={"id": "current"}))
+        assert response.json()["last_seen"] is not None
@@ -0,0 +1,289 @@
+import pytest
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from astrosat.tests.utils import *
+
+from astrosat_users.admin.admin_utils import EstimatedCountPaginator
+from astrosat_users.models import Customer, Message, User, UserPermission, UserRole
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+@pytest.fixture
+def admin_client(admin):
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.mark.django_db
+class TestUserAdminActions:
+
+    changelist_url = reverse("admin:astrosat_users_user_changelist")
+
+    def test_update_roles_action(
+        self, admin_client, mock_storage, django_assert_max_num_queries
+    ):
+        role_1, role_2 = [UserRoleFactory() for _ in range(2)]
+        users = [UserFactory() for _ in range(20)]
+        for user in users[:10]:
+            user.roles.add(role_2)
+
+        # the number of queries doesn't depend on the number of users...
+        with django_assert_max_num_queries(20):
+            response = admin_client.post(
+                self.changelist_url,
+                {
+                    "action": "update_roles_action",
+                    ACTION_CHECKBOX_NAME: [user.pk for user in users],
+                    "included_roles": [role_1.pk],
+                    "excluded_roles": [role_2.pk],
+                    "apply": "Update Roles",
+                },
+            )
+        assert response.status_code == 302
+
+        response = admin_client.get(response.url)
+        assert "added 20 and removed 10 role assignments" in response.content.decode()
+        for user in User.objects.filter(pk__in=[user.pk for user in users]):
+            assert list(user.roles.all()) == [role_1]
+
+    def test_update_roles_action_invalidates_permissions(self, admin_client, mock_storage):
+        role = UserRoleFactory()
+        user = UserFactory()
+        assert user.astrosat_permissions == frozenset()
+
+        admin_client.post(
+            self.changelist_url,
+            {
+                "action": "update_roles_action",
+                ACTION_CHECKBOX_NAME: [user.pk],
+                "included_roles": [role.pk],
+                "apply": "Update Roles",
+            },
+        )
+
+        user = User.objects.get(pk=user.pk)
+        assert user.astrosat_permissions == set(
+            role.permissions.values_list("name", flat=True)
+        )
+
+    def test_toggle_approval(self, admin_client, mock_storage, django_assert_max_num_queries):
+        users = [UserFactory(is_approved=i % 2 == 0) for i in range(10)]
+
+        with django_assert_max_num_queries(10):
+            admin_client.post(
+                self.changelist_url,
+                {
+                    "action": "toggle_approval",
+                    ACTION_CHECKBOX_NAME: [user.pk for user in users],
+                },
+            )
+
+        for user in users:
+            is_approved = user.is_approved
+            user.refresh_from_db()
+            assert user.is_approved is not is_approved
+
+    def test_toggle_verification(self, admin_client, mock_storage):
+        users = [UserFactory() for _ in range(4)]
+        users[0].verify()
+        users[1].emailaddress_set.all().delete()
+
+        admin_client.post(
+            self.changelist_url,
+            {
+                "action": "toggle_verication",
+                ACTION_CHECKBOX_NAME: [user.pk for user in users],
+            },
+        )
+
+        assert [
+            User.objects.get(pk=user.pk).is_verified for user in users
+        ] == [False, True, True, True]
+
+
+@pytest.mark.django_db
+class TestAdminPageWeight:
+    """
+    Related objects are chosen via autocomplete widgets, so the size of
+    these pages should not depend on how many users/roles there are.
+    """
+
+    N_EXTRA_OBJECTS = 100
+
+    def get_content_length(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        return len(response.content)
+
+    def test_customer_change_page(self, admin_client, mock_storage):
+        customer = CustomerFactory(logo=None)
+        for _ in range(3):
+            customer.add_user(UserFactory())
+        url = reverse("admin:astrosat_users_customer_change", args=[customer.pk])
+
+        content_length = self.get_content_length(admin_client, url)
+        for _ in range(self.N_EXTRA_OBJECTS):
+            UserFactory()
+        assert self.get_content_length(admin_client, url) == content_length
+
+    def test_user_change_page(self, admin_client, mock_storage):
+        user = UserFactory()
+        user.roles.add(UserRoleFactory())
+        url = reverse("admin:astrosat_users_user_change", args=[user.pk])
+
+        content_length = self.get_content_length(admin_client, url)
+        for _ in range(self.N_EXTRA_OBJECTS):
+            UserRoleFactory(permissions=[])
+        assert self.get_content_length(admin_client, url) == content_length
+
+    def test_update_roles_action_page(self, admin_client, mock_storage):
+        user = UserFactory()
+        data = {
+            "action": "update_roles_action",
+            ACTION_CHECKBOX_NAME: [user.pk],
+        }
+        url = reverse("admin:astrosat_users_user_changelist")
+
+        content_length = len(admin_client.post(url, data).content)
+        for _ in range(self.N_EXTRA_OBJECTS):
+            UserRoleFactory(permissions=[])
+        assert len(admin_client.post(url, data).content) == content_length
+
+    def test_search_users(self, admin_client, mock_storage):
+        user = UserFactory(email="findme@example.com")
+        UserFactory(email="other.findme@example.com")
+        url = reverse("admin:astrosat_users_user_changelist")
+
+        response = admin_client.get(url, {"q": "FINDME"})
+        assert response.context["cl"].result_count == 1
+        assert list(response.context["cl"].result_list) == [user]
+
+
+@pytest.mark.django_db
+class TestUserManager:
+    def test_create_superuser(self):
+        superuser = User.objects.create_superuser("superuser", "superuser@example.com", "password")
+        assert superuser.is_superuser and superuser.is_staff and superuser.is_approved
+
+        with pytest.raises(ValueError):
+            User.objects.create_superuser("another", is_approved=False)
+
+    def test_with_perm(self, mock_storage):
+        # (django.contrib.auth's UserManager methods are still available)
+        user = UserFactory()
+        UserFactory()
+        user.user_permissions.add(Permission.objects.get(codename="view_group"))
+
+        assert list(
+            User.objects.with_perm(
+                "auth.view_group", backend="django.contrib.auth.backends.ModelBackend"
+            )
+        ) == [user]
+
+
+@pytest.mark.django_db
+class TestUserSearch:
+
+    changelist_url = reverse("admin:astrosat_users_user_changelist")
+
+    def test_user_search(self, admin_client, mock_storage):
+        user = UserFactory(username="Someone", email="Someone@Example.com", name="Some One")
+        UserFactory(username="other", email="other@example.com", name="Other")
+
+        # searches are case-insensitive prefix searches...
+        for search_term in ["someo", "SOMEONE@", "Some"]:
+            response = admin_client.get(self.changelist_url, {"q": search_term})
+            assert list(response.context["cl"].result_list) == [user]
+
+        # (so they don't match the middle of a field)...
+        response = admin_client.get(self.changelist_url, {"q": "example.com"})
+        assert list(response.context["cl"].result_list) == []
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql", reason="expression indexes w/ pattern ops are PostgreSQL-specific"
+    )
+    def test_search_uses_indexes(self, mock_storage):
+        with connection.cursor() as cursor:
+            # (the table is tiny, so make sure the planner would rather use an index)
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        for model, field_name, index_name in [
+            (User, "username", "astrosat_users_uname_upper_idx"),
+            (User, "email", "astrosat_users_email_upper_idx"),
+            (User, "name", "astrosat_users_name_upper_idx"),
+            (Customer, "name", "astrosat_cust_name_upper_idx"),
+            (Customer, "official_name", "astrosat_cust_oname_upper_idx"),
+            (UserRole, "name", "astrosat_role_name_upper_idx"),
+            (UserPermission, "name", "astrosat_perm_name_upper_idx"),
+        ]:
+            plan = model.objects.filter(**{f"{field_name}__istartswith": "some"}).explain()
+            assert index_name in plan
+            plan = model.objects.filter(**{f"{field_name}__iexact": "someone"}).explain()
+            assert index_name in plan
+
+
+@pytest.mark.django_db
+class TestChangelistFiltersAndCounts:
+
+    def test_message_user_filter(self, admin_client, mock_storage):
+        user_1 = UserFactory(email="someone@example.com")
+        user_2 = UserFactory(email="someone.else@example.com")
+        messages = [MessageFactory(user=user_1) for _ in range(2)]
+        MessageFactory(user=user_2)
+        url = reverse("admin:astrosat_users_message_changelist")
+
+        response = admin_client.get(url, {"user": "someone@"})
+        assert response.status_code == 200
+        assert set(response.context["cl"].result_list) == set(messages)
+        assert 'name="user" value="someone@"' in response.content.decode()
+
+    def test_user_customer_filter(self, admin_client, mock_storage):
+        customer_1 = CustomerFactory(name="Customer One", logo=None)
+        customer_2 = CustomerFactory(name="Customer Two", logo=None)
+        user = UserFactory()
+        customer_1.add_user(user)
+        customer_2.add_user(user)
+        customer_2.add_user(UserFactory())
+        url = reverse("admin:astrosat_users_user_changelist")
+
+        response = admin_client.get(url, {"customer": "customer"})
+        assert response.status_code == 200
+        assert response.context["cl"].result_count == 2
+
+        response = admin_client.get(url, {"customer": "customer one"})
+        assert list(response.context["cl"].result_list) == [user]
+
+    def test_input_filter_keeps_search_and_ordering(self, admin_client, mock_storage):
+        customer = CustomerFactory(name="Customer One", logo=None)
+        user = UserFactory(username="someone")
+        customer.add_user(user)
+        customer.add_user(UserFactory(username="other"))
+        url = reverse("admin:astrosat_users_user_changelist")
+
+        response = admin_client.get(url, {"customer": "customer", "q": "some", "o": "1"})
+        assert list(response.context["cl"].result_list) == [user]
+
+        # submitting the filter's form keeps the current search & ordering...
+        content = response.content.decode()
+        assert '<input type="hidden" name="q" value="some" />' in content
+        assert '<input type="hidden" name="o" value="1" />' in content
+
+    def test_estimated_count_paginator(self, mock_storage):
+        class TestPaginator(EstimatedCountPaginator):
+            max_count = 5
+
+        user = UserFactory()
+        for _ in range(10):
+            MessageFactory(user=user)
+
+        # (sqlite has no table statistics; so the count is capped)
+        paginator = TestPaginator(Message.objects.order_by("pk"), 2)
+        assert paginator.count == 5
+        assert paginator.num_pages == 3
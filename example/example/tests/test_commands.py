@@ -0,0 +1,124 @@
+import pytest
+
+from io import StringIO
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from astrosat.tests.utils import *
+
+from astrosat_users.models import User
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+def run_command(*args):
+    stdout = StringIO()
+    call_command(*args, stdout=stdout)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestForceCommands:
+    def test_force_approval(self, mock_storage, django_assert_max_num_queries):
+        users = [UserFactory(is_approved=False) for _ in range(5)]
+        users[0].is_approved = True
+        users[0].save()
+
+        with django_assert_max_num_queries(3):
+            output = run_command(
+                "force_approval", "--username", *[user.username for user in users]
+            )
+
+        assert "Approved 4 users (1 were already approved)" in output
+        assert User.objects.filter(is_approved=True).count() == 5
+
+    def test_force_term_acceptance_by_email_domain(self, mock_storage):
+        users = [
+            UserFactory(email=f"user{i}@{domain}", accepted_terms=False)
+            for i, domain in enumerate(["a.com", "a.com", "b.com"])
+        ]
+
+        output = run_command("force_term_acceptance", "--email-domain", "a.com")
+
+        assert "Accepted terms for 2 users" in output
+        assert [
+            User.objects.get(pk=user.pk).accepted_terms for user in users
+        ] == [True, True, False]
+
+    def test_force_verification_from_file(self, tmp_path, mock_storage):
+        users = [UserFactory() for _ in range(3)]
+        users[0].verify()
+        users[1].emailaddress_set.all().delete()
+        path = tmp_path / "usernames.txt"
+        path.write_text(
+            "# users to verify\n" + "\n".join(user.username for user in users) + "\n\n"
+        )
+
+        output = run_command("force_verification", "--from-file", str(path))
+
+        assert "Verified 2 email addresses (1 created; 1 were already verified)" in output
+        assert all(User.objects.get(pk=user.pk).is_verified for user in users)
+
+    def test_force_verification_of_other_primary_email(self, mock_storage):
+        """
+        tests that the primary email address is verified (as w/ `User.verify`)
+        even if it isn't the user's current email
+        """
+        user = UserFactory()
+        emailaddress = user.emailaddress_set.get(primary=True)
+        user.email = f"new-{user.email}"
+        user.save()
+
+        output = run_command("force_verification", "--username", user.username)
+
+        assert "Verified 1 email addresses (0 created; 0 were already verified)" in output
+        emailaddress.refresh_from_db()
+        assert emailaddress.verified is True
+        assert user.emailaddress_set.count() == 1
+        assert User.objects.get(pk=user.pk).is_verified is True
+
+    def test_force_group_membership_by_customer(self, mock_storage):
+        group_1 = Group.objects.create(name="group_1")
+        group_2 = Group.objects.create(name="group_2")
+        customer = CustomerFactory(logo=None)
+        members = [UserFactory() for _ in range(3)]
+        for member in members:
+            customer.add_user(member)
+        members[0].groups.add(group_1)
+        non_member = UserFactory()
+
+        output = run_command(
+            "force_group_membership",
+            "--customer",
+            customer.name,
+            "--groups",
+            "group_.*",
+            "--regex",
+        )
+
+        assert "successfully added 5 memberships for 3 users" in output
+        for member in members:
+            assert set(member.groups.all()) == {group_1, group_2}
+        assert non_member.groups.count() == 0
+
+    def test_filters(self, mock_storage):
+        users = [UserFactory(is_approved=False, is_active=i < 2) for i in range(4)]
+
+        run_command("force_approval", "--filter", "is_active=true")
+
+        assert [
+            User.objects.get(pk=user.pk).is_approved for user in users
+        ] == [True, True, False, False]
+
+        with pytest.raises(CommandError):
+            run_command("force_approval", "--filter", "not_a_field=1")
+
+    def test_no_selection(self, mock_storage):
+        with pytest.raises(CommandError):
+            run_command("force_approval")
+
+        with pytest.raises(CommandError):
+            run_command("force_approval", "--username", "not_a_user")
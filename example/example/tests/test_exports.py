@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+import pytest
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.test import Client
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from astrosat.tests.utils import *
+
+from astrosat_users.exports import (
+    USER_EXPORT_FIELDS,
+    iter_user_rows,
+    split_csv_list,
+    unescape_csv_value,
+)
+from astrosat_users.models import User
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+def read_csv(response):
+    content = b"".join(response.streaming_content).decode()
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def read_ndjson(response):
+    content = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExports:
+    def test_iter_user_rows(self, mock_storage, django_assert_max_num_queries):
+        role_1, role_2 = [UserRoleFactory() for _ in range(2)]
+        customer = CustomerFactory(logo=None)
+        users = [UserFactory() for _ in range(10)]
+        for user in users:
+            user.roles.add(role_1, role_2)
+            customer.add_user(user)
+        users[0].verify()
+
+        # 2 queries for the roles, 1 for the users & 3 per chunk for the related objects
+        # (regardless of how many users are in each chunk)
+        with django_assert_max_num_queries(2 + 1 + 3 * 4):
+            rows = list(iter_user_rows(User.objects.all(), chunk_size=3))
+
+        assert [row["username"] for row in rows] == [
+            user.username for user in sorted(users, key=lambda user: user.pk)
+        ]
+        for row in rows:
+            assert list(sorted(row.keys())) == sorted(USER_EXPORT_FIELDS)
+            assert row["roles"] == sorted([role_1.name, role_2.name])
+            assert row["permissions"] == sorted(
+                role_1.permissions.values_list("name", flat=True).union(
+                    role_2.permissions.values_list("name", flat=True)
+                )
+            )
+            assert row["customers"] == [customer.name]
+        assert [row["is_verified"] for row in rows].count(True) == 1
+
+    def test_export_users_csv_escaping(self, admin, mock_storage):
+        _, key = create_auth_token(admin)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        url = reverse("users-export")
+
+        role = UserRoleFactory(name="role;with;separators")
+        user = UserFactory(name='=HYPERLINK("http://evil.com")', is_approved=True)
+        user.roles.add(role, UserRoleFactory(name="-other-role"))
+
+        response = client.get(url)
+        rows = [row for row in read_csv(response) if row["email"] == user.email]
+        assert len(rows) == 1
+        row = rows[0]
+
+        # values that a spreadsheet would treat as formulas are prefixed w/ "'"...
+        assert row["name"] == """'=HYPERLINK("http://evil.com")"""
+        assert row["roles"] == "'-other-role;role\\;with\\;separators"
+
+        # and the escaping can be undone...
+        assert unescape_csv_value(row["name"]) == user.name
+        assert split_csv_list(unescape_csv_value(row["roles"])) == [
+            "-other-role", "role;with;separators"
+        ]
+
+    def test_export_users(self, admin, mock_storage):
+        _, key = create_auth_token(admin)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        url = reverse("users-export")
+
+        approved_users = [UserFactory(is_approved=True) for _ in range(3)]
+        UserFactory(is_approved=False)
+
+        response = client.get(url, {"is_approved": "true"})
+        assert status.is_success(response.status_code)
+        assert response["Content-Type"].startswith("text/csv")
+        assert "attachment" in response["Content-Disposition"]
+        rows = read_csv(response)
+        assert {row["email"] for row in rows} == {
+            user.email for user in approved_users
+        } | ({admin.email} if admin.is_approved else set())
+
+        response = client.get(url, {"format": "ndjson", "is_approved": "false"})
+        assert status.is_success(response.status_code)
+        assert response["Content-Type"].startswith("application/x-ndjson")
+        rows = read_ndjson(response)
+        assert all(row["is_approved"] is False for row in rows)
+
+    def test_export_users_permission(self, user, mock_storage):
+        _, key = create_auth_token(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+        response = client.get(reverse("users-export"))
+        assert status.is_client_error(response.status_code)
+
+    def test_export_customer_users(self, user, mock_storage):
+        customer = CustomerFactory(logo=None)
+        customer.add_user(user, type="MANAGER", status="ACTIVE")
+        members = [UserFactory() for _ in range(3)]
+        for member in members:
+            customer.add_user(member, type="MEMBER", status="PENDING")
+        CustomerFactory(logo=None).add_user(UserFactory())
+
+        _, key = create_auth_token(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        url = reverse("customer-users-export", kwargs={"customer_id": customer.id})
+
+        response = client.get(url, {"format": "ndjson", "type": "member"})
+        assert status.is_success(response.status_code)
+        rows = read_ndjson(response)
+        assert {row["user_email"] for row in rows} == {
+            member.email for member in members
+        }
+        assert all(row["customer_name"] == customer.name for row in rows)
+
+    def test_export_admin_action(self, admin, mock_storage):
+        client = Client()
+        client.force_login(admin)
+        users = [UserFactory() for _ in range(3)]
+
+        response = client.post(
+            reverse("admin:astrosat_users_user_changelist"),
+            {
+                "action": "export_the_selected_users_as_csv",
+                ACTION_CHECKBOX_NAME: [user.pk for user in users],
+            },
+        )
+        assert response.status_code == 200
+        assert [row["uuid"] for row in read_csv(response)] == [
+            str(user.uuid) for user in users
+        ]
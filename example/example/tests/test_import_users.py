@@ -0,0 +1,123 @@
+import json
+import pytest
+
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+
+from allauth.account.models import EmailAddress
+
+from astrosat.tests.utils import *
+
+from astrosat_users.models import CustomerUser, User
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+def write_ndjson(path, rows):
+    path.write_text("\n".join(json.dumps(row) for row in rows))
+    return str(path)
+
+
+@pytest.mark.django_db
+class TestImportUsers:
+    def test_import_users_csv(self, tmp_path, mock_storage):
+        role = UserRoleFactory()
+        customer = CustomerFactory(logo=None)
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "username,email,password,name,is_approved,is_verified,roles,customers\n"
+            f"user1,user1@example.com,Pa$$word1,User One,true,true,{role.name},{customer.name}\n"
+            f"user2,user2@example.com,,User Two,false,false,,\n"
+        )
+
+        stdout = StringIO()
+        call_command("import_users", str(path), "--workers=0", stdout=stdout)
+        assert "Imported 2 users from 2 rows (0 errors)" in stdout.getvalue()
+
+        user_1 = User.objects.get(username="user1")
+        assert user_1.check_password("Pa$$word1")
+        assert user_1.is_approved is True
+        assert user_1.is_verified is True
+        assert list(user_1.roles.all()) == [role]
+        assert CustomerUser.objects.get(user=user_1).customer == customer
+
+        user_2 = User.objects.get(username="user2")
+        assert not user_2.has_usable_password()
+        assert user_2.is_verified is False
+        assert user_2.roles.count() == 0
+
+    def test_import_users_ndjson(self, tmp_path, mock_storage):
+        password_hash = make_password("Pa$$word1")
+        path = write_ndjson(
+            tmp_path / "users.ndjson",
+            [
+                {"email": "user1@example.com", "password_hash": password_hash},
+                {"email": "user2@example.com", "password": "Pa$$word2"},
+            ],
+        )
+
+        call_command("import_users", path, "--workers=2", stdout=StringIO())
+
+        # (the username defaults to the email)
+        assert User.objects.get(username="user1@example.com").password == password_hash
+        assert User.objects.get(username="user2@example.com").check_password("Pa$$word2")
+        assert EmailAddress.objects.filter(
+            email__in=["user1@example.com", "user2@example.com"], primary=True
+        ).count() == 2
+
+    def test_import_users_errors(self, tmp_path, mock_storage):
+        existing_user = UserFactory()
+        mixed_case_user = UserFactory(email="Mixed.Case@Example.com")
+        path = write_ndjson(
+            tmp_path / "users.ndjson",
+            [
+                {"email": existing_user.email},
+                {"email": "user1@example.com", "roles": ["unknown-role"]},
+                {"email": "user2@example.com", "password_hash": "not-a-hash"},
+                {"email": "user3@example.com"},
+                {"email": "user3@example.com"},
+                {"email": "mixed.case@example.com"},
+                {"email": "user4@example.com", "is_verified": "maybe"},
+            ],
+        )
+
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command("import_users", path, "--workers=0", stdout=stdout, stderr=stderr)
+
+        assert "Imported 1 users from 7 rows (6 errors)" in stdout.getvalue()
+        errors = stderr.getvalue()
+        assert "row 1:" in errors and "already exists" in errors
+        assert "row 2: unknown role 'unknown-role'" in errors
+        assert "row 5:" in errors
+        assert "row 6:" in errors and "already exists" in errors
+        assert "row 7: invalid boolean 'maybe'" in errors
+        assert User.objects.filter(email="user3@example.com").count() == 1
+        assert User.objects.filter(email__iexact=mixed_case_user.email).count() == 1
+
+    def test_import_users_checkpoint(self, tmp_path, mock_storage):
+        path = write_ndjson(
+            tmp_path / "users.ndjson",
+            [{"email": f"user{i}@example.com"} for i in range(5)],
+        )
+        checkpoint = tmp_path / "checkpoint"
+        checkpoint.write_text("3")
+
+        stdout = StringIO()
+        call_command(
+            "import_users",
+            path,
+            "--workers=0",
+            "--batch-size=1",
+            f"--checkpoint={checkpoint}",
+            stdout=stdout,
+        )
+
+        assert "Resuming after row 3." in stdout.getvalue()
+        assert set(
+            User.objects.filter(email__endswith="@example.com").values_list("email", flat=True)
+        ) == {"user3@example.com", "user4@example.com"}
+        assert checkpoint.read_text() == "5"
@@ -1,9 +1,16 @@
 import pytest
 
+from io import StringIO
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
 from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import Client
 from django.urls import resolve, reverse
 
@@ -11,10 +18,18 @@ from rest_framework import status
 from rest_framework.settings import api_settings as drf_settings
 from rest_framework.test import APIClient
 
+from knox.models import AuthToken
+
 from astrosat.tests.utils import *
 
+from astrosat_users.backends import AuthenticationBackend
+from astrosat_users.checks import check_settings
 from astrosat_users.conf import app_settings
+from astrosat_users.models import User, UserSession
+from astrosat_users.signals import users_logged_out
+from astrosat_users.tests.factories import CustomerFactory
 from astrosat_users.tests.utils import create_auth_token
+from astrosat_users.utils import delete_user_sessions
 
 from .factories import *
 
@@ -279,6 +294,188 @@ class TestAPILoginLogout:
         assert status.is_client_error(response.status_code)
         assert response.json()["detail"] == self.INVALID_TOKEN_MSG
 
+    def test_login_token_only(self, user, user_settings, settings):
+
+        user_settings.require_verification = False
+        user_settings.require_approval = False
+        user_settings.require_terms_acceptance = False
+        user_settings.save()
+
+        settings.ASTROSAT_USERS_TOKEN_ONLY_API_LOGIN = True
+        user.last_login = None
+        user.save()
+
+        # API logins don't create sessions...
+        client = APIClient()
+        response = client.post(
+            self.login_url, {"email": user.email, "password": user.raw_password}
+        )
+        assert status.is_success(response.status_code)
+        assert Session.objects.count() == 0
+        assert settings.SESSION_COOKIE_NAME not in response.cookies
+
+        # but do update last_login...
+        user.refresh_from_db()
+        assert user.last_login is not None
+
+        # and the token still works...
+        client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+        response = client.get(reverse("users-list"))
+        assert status.is_success(response.status_code)
+
+        # backend logins still create sessions...
+        client = Client()
+        response = client.post(
+            reverse("account_login"),
+            {"login": user.email, "password": user.raw_password},
+        )
+        assert response.wsgi_request.user == user
+        assert Session.objects.count() == 1
+
+    def test_login_queries(self, user, user_settings, django_assert_max_num_queries):
+
+        user_settings.require_verification = True
+        user_settings.require_approval = False
+        user_settings.require_terms_acceptance = False
+        user_settings.save()
+
+        user.verify()
+        client = APIClient()
+        data = {"email": user.email, "password": user.raw_password}
+
+        with CaptureQueriesContext(connection) as context:
+            with django_assert_max_num_queries(20):
+                response = client.post(self.login_url, data)
+        assert status.is_success(response.status_code)
+        assert response.json()["user"]["is_verified"] is True
+
+        # the user (w/ their primary email address) is loaded once and reused for the whole login
+        user_selects = [
+            query["sql"] for query in context.captured_queries
+            if query["sql"].startswith("SELECT") and 'FROM "astrosat_users_user"' in query["sql"]
+        ]
+        emailaddress_selects = [
+            query["sql"] for query in context.captured_queries
+            if query["sql"].startswith("SELECT") and '"account_emailaddress"' in query["sql"]
+        ]
+        assert len(user_selects) == 1
+        # (besides that, EmailAddress is only queried to find the user, w/out a subquery)
+        emailaddress_lookups = [
+            sql for sql in emailaddress_selects if sql not in user_selects
+        ]
+        assert len(emailaddress_lookups) == 1
+        assert 'FROM "account_emailaddress"' in emailaddress_lookups[0]
+        assert "astrosat_users_user" not in emailaddress_lookups[0]
+
+    def test_login_prefers_verified_emailaddress(self, user_settings, mock_storage):
+
+        user_settings.require_verification = False
+        user_settings.require_approval = False
+        user_settings.require_terms_acceptance = False
+        user_settings.save()
+
+        # two users w/ the same email & password, only one of which has verified it...
+        unverified_user = UserFactory(email="shared@test.com")
+        verified_user = UserFactory(email="other@test.com")
+        verified_user.emailaddress_set.create(email="Shared@test.com", verified=True)
+        verified_user.set_password(unverified_user.raw_password)
+        verified_user.save()
+        assert unverified_user.pk < verified_user.pk
+
+        backend = AuthenticationBackend()
+        assert backend.authenticate(
+            None, email="shared@test.com", password=unverified_user.raw_password
+        ) == verified_user
+
+    def test_authentication_backends_check(self, settings):
+
+        settings.AUTHENTICATION_BACKENDS = list(settings.AUTHENTICATION_BACKENDS) + [
+            "not.a.real.Backend"
+        ]
+        errors = check_settings(None)
+        assert [error.id for error in errors] == ["astrosat_users:W005"]
+        assert "not.a.real.Backend" in errors[0].msg
+
+    def test_session_user_is_not_annotated(self, user, django_assert_num_queries):
+
+        backend = AuthenticationBackend()
+        with django_assert_num_queries(1) as context:
+            session_user = backend.get_user(user.pk)
+        assert session_user == user
+        assert '"account_emailaddress"' not in context.captured_queries[0]["sql"]
+
+    def test_with_primary_emailaddress(self, django_assert_num_queries):
+
+        verified_user = UserFactory()
+        verified_user.verify()
+        unverified_user = UserFactory()
+        user_without_emailaddress = UserFactory()
+        user_without_emailaddress.emailaddress_set.all().delete()
+
+        users = {
+            user.pk: user for user in User.objects.with_primary_emailaddress().filter(
+                pk__in=[verified_user.pk, unverified_user.pk, user_without_emailaddress.pk]
+            )
+        }
+        with django_assert_num_queries(0):
+            assert users[verified_user.pk].is_verified is True
+            assert users[verified_user.pk].primary_emailaddress_email == verified_user.email
+            assert users[unverified_user.pk].is_verified is False
+            assert users[user_without_emailaddress.pk].is_verified is False
+            assert users[user_without_emailaddress.pk].primary_emailaddress_email is None
+
+    def test_login_instrumentation(self, user, user_settings, settings):
+
+        user_settings.require_verification = False
+        user_settings.require_approval = False
+        user_settings.require_terms_acceptance = False
+        user_settings.save()
+
+        # no timings are recorded by default...
+        response = self.login(user=user)
+        assert status.is_success(response.status_code)
+        assert "Server-Timing" not in response
+
+        settings.ASTROSAT_USERS_INSTRUMENTATION = True
+        settings.ASTROSAT_USERS_INSTRUMENTATION_SINKS = [
+            f"{__name__}.record_recording"
+        ]
+        RECORDINGS.clear()
+
+        response = self.login(user=user)
+        assert status.is_success(response.status_code)
+
+        (recording, ) = RECORDINGS
+        assert recording.name == "login"
+        stages = {stage.name: stage for stage in recording.stages}
+        assert {"validate", "authenticate", "password_hash", "check_user", "login", "token", "response"} <= set(stages)
+        assert stages["token"].n_queries >= 1
+
+        # (which stages ran would tell clients whether an email belongs to a user, so the
+        # timings are only returned to them when ASTROSAT_USERS_INSTRUMENTATION_HEADER is set)...
+        assert "Server-Timing" not in response
+        settings.ASTROSAT_USERS_INSTRUMENTATION_HEADER = True
+        response = self.login(user=user)
+        for stage_name in stages:
+            assert f"{stage_name};dur=" in response["Server-Timing"]
+
+        # failed logins are recorded too...
+        user.change_password = True
+        user.save()
+        RECORDINGS.clear()
+        response = self.login(user=user)
+        assert status.is_client_error(response.status_code)
+        assert "check_user" in {stage.name for stage in RECORDINGS[0].stages}
+        assert "check_user;dur=" in response["Server-Timing"]
+
+
+RECORDINGS = []
+
+
+def record_recording(recording):
+    # (an instrumentation sink for test_login_instrumentation)
+    RECORDINGS.append(recording)
+
 
 @pytest.mark.django_db
 class TestBackendLoginLogout:
@@ -447,3 +644,79 @@ class TestBackendLoginLogout:
         assert status.is_redirect(response.status_code)
         assert request_user != user and not request_user.is_authenticated
         assert response.url == settings.LOGOUT_REDIRECT_URL
+
+
+@pytest.mark.django_db
+class TestBulkLogout:
+    def test_logout_all_queryset(self, mock_storage, django_assert_max_num_queries):
+
+        users = [UserFactory() for _ in range(5)]
+        tokens = [create_auth_token(user) for user in users for _ in range(2)]
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        logged_out_user_ids = []
+
+        def receiver(sender, user_ids, **kwargs):
+            logged_out_user_ids.extend(user_ids)
+
+        users_logged_out.connect(receiver)
+        try:
+            with django_assert_max_num_queries(8):
+                n_tokens, n_sessions = User.objects.filter(
+                    pk__in=[user.pk for user in users[:3]]
+                ).logout_all()
+        finally:
+            users_logged_out.disconnect(receiver)
+
+        assert n_tokens == 6
+        assert n_sessions == 3
+        assert sorted(logged_out_user_ids) == sorted(user.pk for user in users[:3])
+        assert AuthToken.objects.filter(user__in=users[3:]).count() == 4
+        for client, user in zip(clients, users):
+            assert (client.session.get("_auth_user_id") is not None) == (user in users[3:])
+
+    def test_logout_all_user_sessions(self, mock_storage, settings, django_assert_max_num_queries):
+
+        settings.SESSION_ENGINE = "astrosat_users.sessions.db"
+
+        users = [UserFactory() for _ in range(3)]
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        assert UserSession.objects.count() == 3
+        assert Session.objects.count() == 0
+
+        # w/ UserSession, the user's sessions are found w/out decoding every session...
+        with django_assert_max_num_queries(3) as context:
+            n_deleted = delete_user_sessions([users[0].pk])
+        assert n_deleted == 1
+        assert '"session_data"' not in context.captured_queries[0]["sql"]
+
+        for client, user in zip(clients, users):
+            assert (client.session.get("_auth_user_id") is not None) == (user != users[0])
+
+        # (and logging in again is recorded too)...
+        clients[0].force_login(users[0])
+        assert UserSession.objects.filter(auth_user_id=str(users[0].pk)).count() == 1
+
+    def test_logout_users_command(self, mock_storage):
+
+        customer = CustomerFactory()
+        users = [UserFactory() for _ in range(3)]
+        customer.add_user(users[0])
+        customer.add_user(users[1])
+        for user in users:
+            create_auth_token(user)
+
+        call_command("logout_users", "--customer", customer.name, stdout=StringIO())
+
+        assert list(AuthToken.objects.values_list("user", flat=True)) == [users[2].pk]
+
+        with pytest.raises(CommandError):
+            call_command("logout_users", stdout=StringIO())
@@ -4,16 +4,19 @@ import re
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, force_authenticate
 
 from astrosat_users.tests.factories import MessageAttachmentFactory, MessageFactory
 from astrosat.tests.utils import *
 
 from astrosat_users.models import Message
+from astrosat_users.pubsub import message_broker
 from astrosat_users.tests.utils import *
+from astrosat_users.views import views_messages
 
 from .factories import *
 
@@ -143,3 +146,130 @@ class TestMessagesAPI:
         assert message.title == old_message_data["title"]
         assert message.sender == old_message_data["sender"]
         assert message.content == old_message_data["content"]
+
+
+@pytest.mark.django_db
+class TestMessagesStream:
+    def test_add_message_publishes(
+        self, user, django_capture_on_commit_callbacks
+    ):
+
+        subscription = message_broker.subscribe(user.pk)
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                message = user.add_message(
+                    title="title", sender="sender", content="content"
+                )
+            assert subscription.get(timeout=0) == [message.id]
+        finally:
+            subscription.close()
+
+        assert not message_broker.has_subscribers(user.pk)
+
+    def test_bulk_create_publishes(
+        self, user, django_capture_on_commit_callbacks
+    ):
+
+        N_MESSAGES = 10
+
+        subscription = message_broker.subscribe(user.pk)
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                Message.objects.bulk_create([
+                    MessageFactory.build(user=user) for _ in range(N_MESSAGES)
+                ])
+            # a single notification is published for the whole batch
+            assert subscription.get(timeout=0) is not None
+            assert subscription.get(timeout=0) is None
+        finally:
+            subscription.close()
+
+    def test_stream_messages(self, user):
+
+        token, key = create_auth_token(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+        message = MessageFactory(user=user)
+
+        url = reverse("messages-stream", kwargs={"user_id": user.uuid})
+        response = client.get(
+            url,
+            HTTP_ACCEPT="text/event-stream",
+            HTTP_LAST_EVENT_ID="0",
+        )
+        assert status.is_success(response.status_code)
+        assert response["Content-Type"].startswith("text/event-stream")
+
+        try:
+            content = iter(response.streaming_content)
+            assert next(content).decode().startswith("retry:")
+            event = next(content).decode()
+            assert f"id: {message.id}\n" in event
+            assert message.title in event
+        finally:
+            response.close()
+
+        assert not message_broker.has_subscribers(user.pk)
+
+    def test_stream_new_messages(self, user, django_capture_on_commit_callbacks):
+
+        token, key = create_auth_token(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+        old_message = MessageFactory(user=user)
+
+        url = reverse("messages-stream", kwargs={"user_id": user.uuid})
+        response = client.get(url, HTTP_ACCEPT="text/event-stream")
+        assert status.is_success(response.status_code)
+
+        try:
+            content = iter(response.streaming_content)
+            # (the stream subscribes before sending the preamble)
+            assert next(content).decode().startswith("retry:")
+            assert message_broker.has_subscribers(user.pk)
+
+            # a message created while the stream is open is pushed to it...
+            with django_capture_on_commit_callbacks(execute=True):
+                new_message = user.add_message(
+                    title="new title", sender="sender", content="content"
+                )
+            event = next(content).decode()
+            assert f"id: {new_message.id}\n" in event
+            assert new_message.title in event
+
+            # (but messages from before it was opened are not)...
+            assert f"id: {old_message.id}\n" not in event
+        finally:
+            response.close()
+
+        assert not message_broker.has_subscribers(user.pk)
+
+    def test_stream_messages_asgi(self, user, monkeypatch):
+        """
+        tests that the (blocking) stream isn't served under ASGI unless
+        Django can serve the async stream asynchronously
+        """
+        monkeypatch.setattr(views_messages, "ASYNC_STREAMING_SUPPORTED", False)
+
+        url = reverse("messages-stream", kwargs={"user_id": user.uuid})
+        request = AsyncRequestFactory().get(url, HTTP_ACCEPT="text/event-stream")
+        force_authenticate(request, user=user)
+        view = views_messages.MessageViewSet.as_view({"get": "stream"})
+        response = view(request, user_id=str(user.uuid))
+
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+        assert not message_broker.has_subscribers(user.pk)
+
+    def test_stream_messages_other_user(self, user):
+
+        other_user = UserFactory()
+
+        token, key = create_auth_token(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+        url = reverse("messages-stream", kwargs={"user_id": other_user.uuid})
+        response = client.get(url, HTTP_ACCEPT="text/event-stream")
+        assert status.is_client_error(response.status_code)
@@ -0,0 +1,79 @@
+import pytest
+
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from astrosat_users.renditions import get_rendition_name
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+@pytest.mark.django_db
+class TestCollectOrphanedFiles:
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        # use a real (temporary) filesystem so that storage can be listed
+        settings.MEDIA_ROOT = str(tmp_path)
+
+    def test_collect_orphaned_files(self):
+
+        user = UserFactory()
+        avatar_name = user.avatar.name
+        rendition_name = default_storage.save(
+            get_rendition_name(avatar_name, 64, "webp"), ContentFile(b"rendition")
+        )
+        orphan_name = default_storage.save(
+            f"users/{user.username}/old_avatar.png", ContentFile(b"orphan")
+        )
+        orphan_rendition_name = default_storage.save(
+            get_rendition_name(orphan_name, 64, "webp"), ContentFile(b"orphan")
+        )
+
+        stdout = StringIO()
+        call_command("collect_orphaned_files", "--min-age=0", stdout=stdout)
+        assert "found 2 orphaned files" in stdout.getvalue()
+        assert default_storage.exists(orphan_name)  # (just reported)
+
+        # (w/ a batch size of 1, a rendition is checked in a different batch than its original)
+        call_command(
+            "collect_orphaned_files", "--min-age=0", "--delete", "--batch-size=1", stdout=StringIO()
+        )
+        assert default_storage.exists(avatar_name)
+        assert default_storage.exists(rendition_name)
+        assert not default_storage.exists(orphan_name)
+        assert not default_storage.exists(orphan_rendition_name)
+
+    def test_collect_orphaned_files_min_age(self):
+
+        orphan_name = default_storage.save(
+            "customers/nobody/logo.png", ContentFile(b"orphan")
+        )
+
+        call_command("collect_orphaned_files", "--delete", stdout=StringIO())
+        assert default_storage.exists(orphan_name)  # (too new to delete)
+
+    def test_collect_orphaned_files_batches(self, django_assert_max_num_queries):
+
+        users = [UserFactory() for _ in range(3)]
+        orphan_names = [
+            default_storage.save(f"users/{user.username}/old_avatar.png", ContentFile(b"orphan"))
+            for user in users
+        ]
+
+        # one query per file field per batch (of which there are 3: one per user)...
+        stdout = StringIO()
+        with django_assert_max_num_queries(3 * 3):
+            call_command(
+                "collect_orphaned_files", "--min-age=0", "--batch-size=2", "--prefix=users/", stdout=stdout
+            )
+        assert "Checked 6 files; found 3 orphaned files" in stdout.getvalue()
+
+        call_command(
+            "collect_orphaned_files", "--min-age=0", "--delete", "--batch-size=2", stdout=StringIO()
+        )
+        assert all(default_storage.exists(user.avatar.name) for user in users)
+        assert not any(default_storage.exists(name) for name in orphan_names)
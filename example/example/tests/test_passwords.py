@@ -1,8 +1,14 @@
+import os
 import pytest
 import factory
 import re
+import subprocess
+import sys
+
+from io import StringIO
 
 from django.core import mail
+from django.core.management import call_command
 from django.core.exceptions import ValidationError
 from django.urls import resolve, reverse
 
@@ -11,9 +17,11 @@ from rest_framework.test import APIClient
 
 from allauth.account.utils import user_pk_to_url_str, url_str_to_user_pk
 
+from astrosat_users.checks import check_password_filter
 from astrosat_users.conf import app_settings
+from astrosat_users.password_filter import PasswordFilter, build_password_filter
 from astrosat_users.utils import rest_encode_user_pk, rest_decode_user_pk
-from astrosat_users.validators import LengthPasswordValidator, StrengthPasswordValidator
+from astrosat_users.validators import BreachedPasswordValidator, LengthPasswordValidator, StrengthPasswordValidator
 
 from astrosat.tests.utils import *
 from astrosat_users.tests.utils import *
@@ -54,6 +62,141 @@ class TestPasswordValidation:
         # succeeds if just right...
         validator.validate(generate_password(), user=user)
 
+    def test_password_strength_bounded(self, user):
+
+        validator = StrengthPasswordValidator(strength=2, max_scored_length=16)
+
+        # only the prefix is scored...
+        with pytest.raises(ValidationError):
+            validator.validate("a" * 16 + generate_password(length=200), user=user)
+        validator.validate(generate_password(length=16) + "a" * 200, user=user)
+
+        # long passwords can be considered strong w/out scoring them...
+        validator = StrengthPasswordValidator(strength=2, strong_length=64)
+        validator.validate("a" * 64, user=user)
+        with pytest.raises(ValidationError):
+            validator.validate("a" * 63, user=user)
+
+    @pytest.mark.parametrize("prewarm", [False, True])
+    def test_password_strength_lazy_loading(self, prewarm):
+        # (this has to run in a fresh process; zxcvbn is already loaded in this one)
+        code = "import sys, django; django.setup(); import astrosat_users.validators; print('zxcvbn' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "example.settings",
+                "DJANGO_ASTROSAT_USERS_PREWARM_PASSWORD_VALIDATION": str(prewarm),
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip().splitlines()[-1] == str(prewarm)
+
+
+COMMON_PASSWORDS = ["password", "123456", "qwerty", "letmein", "Summer2020!"]
+
+
+@pytest.mark.django_db
+class TestPasswordFilter:
+    def test_password_filter(self, tmp_path):
+
+        path = str(tmp_path / "passwords.filter")
+        n_added, _, _ = build_password_filter(COMMON_PASSWORDS, path, len(COMMON_PASSWORDS))
+        assert n_added == len(COMMON_PASSWORDS)
+
+        password_filter = PasswordFilter(path)
+        # every password in the list is found (regardless of case)...
+        for password in COMMON_PASSWORDS:
+            assert password in password_filter
+            assert password.upper() in password_filter
+        # other passwords are (almost always) not found...
+        assert sum(generate_password() in password_filter for _ in range(1000)) < 10
+
+        # files that aren't filters are rejected...
+        not_a_filter = tmp_path / "not.filter"
+        not_a_filter.write_bytes(b"not a filter at all, just some bytes")
+        with pytest.raises(ValueError):
+            PasswordFilter(str(not_a_filter))
+
+    def test_breached_password_validator(self, user, tmp_path, settings, monkeypatch):
+
+        path = str(tmp_path / "passwords.filter")
+        build_password_filter(COMMON_PASSWORDS, path, len(COMMON_PASSWORDS))
+        settings.ASTROSAT_USERS_PASSWORD_FILTER_PATH = path
+
+        validator = BreachedPasswordValidator()
+        with pytest.raises(ValidationError) as e:
+            validator.validate("LetMeIn", user=user)
+        assert e.value.code == "password_too_common"
+        validator.validate(generate_password(), user=user)
+
+        # StrengthPasswordValidator rejects passwords in the filter w/out scoring them...
+        def zxcvbn(*args, **kwargs):
+            raise AssertionError("zxcvbn should not be called")
+        monkeypatch.setattr("astrosat_users.validators._zxcvbn", zxcvbn)
+        with pytest.raises(ValidationError) as e:
+            StrengthPasswordValidator(strength=2).validate("qwerty", user=user)
+        assert e.value.code == "password_too_weak"
+
+        # a missing filter rejects nothing...
+        BreachedPasswordValidator(path=str(tmp_path / "missing.filter")).validate("LetMeIn")
+
+    def test_validators_share_password_filter(self, user, tmp_path, settings, monkeypatch):
+
+        path = str(tmp_path / "passwords.filter")
+        build_password_filter(COMMON_PASSWORDS, path, len(COMMON_PASSWORDS))
+        settings.ASTROSAT_USERS_PASSWORD_FILTER_PATH = None
+        settings.AUTH_PASSWORD_VALIDATORS = [
+            {
+                "NAME": "astrosat_users.validators.BreachedPasswordValidator",
+                "OPTIONS": {"path": path},
+            },
+        ] + list(settings.AUTH_PASSWORD_VALIDATORS)
+
+        # StrengthPasswordValidator uses BreachedPasswordValidator's filter...
+        def zxcvbn(*args, **kwargs):
+            raise AssertionError("zxcvbn should not be called")
+        monkeypatch.setattr("astrosat_users.validators._zxcvbn", zxcvbn)
+        with pytest.raises(ValidationError) as e:
+            StrengthPasswordValidator(strength=2).validate("qwerty", user=user)
+        assert e.value.code == "password_too_weak"
+
+        # unless it is given its own (in which case "qwerty" is scored as usual)...
+        with pytest.raises(AssertionError):
+            StrengthPasswordValidator(strength=2, path=str(tmp_path / "missing.filter")).validate(
+                "qwerty", user=user
+            )
+
+    def test_build_password_filter(self, tmp_path):
+
+        password_list = tmp_path / "passwords.txt"
+        password_list.write_text("\n".join(COMMON_PASSWORDS) + "\n\n")
+        path = str(tmp_path / "passwords.filter")
+
+        stdout = StringIO()
+        call_command("build_password_filter", str(password_list), f"--output={path}", stdout=stdout)
+        assert f"Added {len(COMMON_PASSWORDS)} passwords to '{path}'" in stdout.getvalue()
+        assert all(password in PasswordFilter(path) for password in COMMON_PASSWORDS)
+
+    def test_password_filter_checks(self, tmp_path, settings):
+
+        breached_validator = {"NAME": "astrosat_users.validators.BreachedPasswordValidator"}
+        strength_validator = {"NAME": "astrosat_users.validators.StrengthPasswordValidator"}
+        path = str(tmp_path / "passwords.filter")
+        settings.ASTROSAT_USERS_PASSWORD_FILTER_PATH = path
+
+        settings.AUTH_PASSWORD_VALIDATORS = [strength_validator, breached_validator]
+        assert {error.id for error in check_password_filter(None)} == {
+            "astrosat_users:W001", "astrosat_users:W003"
+        }
+
+        build_password_filter(COMMON_PASSWORDS, path, len(COMMON_PASSWORDS))
+        settings.AUTH_PASSWORD_VALIDATORS = [breached_validator, strength_validator]
+        assert check_password_filter(None) == []
+
 
 @pytest.mark.django_db
 class TestApiPassword:
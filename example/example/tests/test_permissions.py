@@ -0,0 +1,82 @@
+import pytest
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from astrosat.tests.utils import *
+
+from astrosat_users.models import User
+from astrosat_users.permissions import HasAstrosatPermission
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+@pytest.mark.django_db
+class TestAstrosatPermissions:
+    def test_astrosat_permissions(self, user):
+        permission_1, permission_2 = [UserPermissionFactory() for _ in range(2)]
+        role_1 = UserRoleFactory(permissions=[permission_1])
+        role_2 = UserRoleFactory(permissions=[permission_2])
+        role_2.parents.add(role_1)
+
+        assert user.astrosat_permissions == frozenset()
+
+        user.roles.add(role_2)
+        assert user.astrosat_permissions == {permission_1.name, permission_2.name}
+        assert user.has_astrosat_permission(permission_1.name)
+        assert user.has_astrosat_permission(permission_1.name, permission_2.name)
+        assert not user.has_astrosat_permission(permission_1.name, "unknown")
+
+    def test_astrosat_permissions_are_cached(self, user, django_assert_num_queries):
+        role = UserRoleFactory()
+        user.roles.add(role)
+
+        user = User.objects.get(pk=user.pk)
+        with django_assert_num_queries(1):
+            user.astrosat_permissions
+
+        # a different instance (ie: a different request) doesn't need the db
+        user = User.objects.get(pk=user.pk)
+        with django_assert_num_queries(0):
+            assert user.has_astrosat_permission(*role.permissions.values_list("name", flat=True))
+
+    def test_astrosat_permissions_are_invalidated(self, user):
+        permission = UserPermissionFactory()
+        role = UserRoleFactory(permissions=[])
+        user.roles.add(role)
+
+        assert User.objects.get(pk=user.pk).astrosat_permissions == frozenset()
+
+        # changes to a role's permissions...
+        role.permissions.add(permission)
+        assert User.objects.get(pk=user.pk).astrosat_permissions == {permission.name}
+
+        # changes to a user's roles (from either side of the relationship)...
+        role.users.remove(user)
+        assert User.objects.get(pk=user.pk).astrosat_permissions == frozenset()
+
+    def test_has_astrosat_permission_class(self, user):
+        permission = UserPermissionFactory()
+        role = UserRoleFactory(permissions=[permission])
+
+        class TestView(APIView):
+            permission_classes = [IsAuthenticated, HasAstrosatPermission(permission.name)]
+
+            def get(self, request):
+                return Response()
+
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=user)
+        response = TestView.as_view()(request)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        user.roles.add(role)
+        user = User.objects.get(pk=user.pk)
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=user)
+        response = TestView.as_view()(request)
+        assert status.is_success(response.status_code)
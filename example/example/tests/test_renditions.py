@@ -0,0 +1,179 @@
+import io
+import pytest
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from astrosat.tests.utils import *
+
+from astrosat_users import renditions
+from astrosat_users.renditions import (
+    generate_renditions,
+    get_rendition_name,
+    get_rendition_names,
+)
+from astrosat_users.serializers import UserSerializer
+from astrosat_users.tests.factories import CustomerFactory
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+def make_image_file(size, format="PNG", name="image"):
+    image_file = io.BytesIO()
+    Image.new("RGB", size).save(image_file, format)
+    return SimpleUploadedFile(
+        name=f"{name}.{format.lower()}",
+        content=image_file.getvalue(),
+        content_type=f"image/{format.lower()}",
+    )
+
+
+@pytest.mark.django_db
+class TestRenditions:
+    def test_get_rendition_name(self):
+        assert get_rendition_name("users/bob/avatar.jpg", 64, "webp") == "users/bob/avatar_64.webp"
+
+    def test_generate_renditions(self, mock_storage, settings):
+        settings.ASTROSAT_USERS_RENDITION_SIZES = [16, 64]
+        settings.ASTROSAT_USERS_RENDITION_FORMATS = ["webp", "png"]
+
+        user = UserFactory(avatar=make_image_file((200, 100)))
+
+        rendition_names = generate_renditions(user.avatar)
+        assert sorted(rendition_names) == sorted(get_rendition_names(user.avatar.name))
+
+        storage = user.avatar.storage
+        for size in [16, 64]:
+            with storage.open(get_rendition_name(user.avatar.name, size, "png")) as f:
+                # the aspect ratio is preserved
+                assert Image.open(f).size == (size, size // 2)
+
+    def test_generate_renditions_not_an_image(self, mock_storage):
+        # (the default factory avatar is not a real image)
+        user = UserFactory()
+        assert generate_renditions(user.avatar) == []
+
+    def test_rendition_view(self, mock_storage, settings):
+        settings.ASTROSAT_USERS_RENDITION_SIZES = [16]
+        settings.ASTROSAT_USERS_RENDITION_FORMATS = ["webp"]
+
+        user = UserFactory(avatar=make_image_file((200, 200)))
+        client = APIClient()
+
+        url = reverse(
+            "user-avatar-rendition",
+            kwargs={"user_id": user.uuid, "size": 16, "format": "webp"},
+        )
+        response = client.get(url)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response.url == user.avatar.storage.url(
+            get_rendition_name(user.avatar.name, 16, "webp")
+        )
+
+        # unsupported sizes & formats are rejected
+        for size, format in [(17, "webp"), (16, "gif")]:
+            url = reverse(
+                "user-avatar-rendition",
+                kwargs={"user_id": user.uuid, "size": size, "format": format},
+            )
+            response = client.get(url)
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_rendition_view_not_an_image(self, mock_storage, settings):
+        settings.ASTROSAT_USERS_RENDITION_SIZES = [16]
+        settings.ASTROSAT_USERS_RENDITION_FORMATS = ["webp"]
+
+        customer = CustomerFactory()
+        client = APIClient()
+
+        url = reverse(
+            "customer-logo-rendition",
+            kwargs={"customer_id": customer.id, "size": 16, "format": "webp"},
+        )
+        response = client.get(url)
+        # falls back to the original logo
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response.url == customer.logo.url
+
+    def test_rendition_view_replaced_image(
+        self, mock_storage, settings, django_capture_on_commit_callbacks
+    ):
+        settings.ASTROSAT_USERS_RENDITION_SIZES = [16]
+        settings.ASTROSAT_USERS_RENDITION_FORMATS = ["png"]
+        settings.ASTROSAT_USERS_STORAGE_DELETION_WORKERS = 0
+
+        user = UserFactory(avatar=make_image_file((200, 100), name="avatar"))
+        storage = user.avatar.storage
+        avatar_name = user.avatar.name
+        rendition_name = get_rendition_name(avatar_name, 16, "png")
+        client = APIClient()
+
+        url = reverse(
+            "user-avatar-rendition",
+            kwargs={"user_id": user.uuid, "size": 16, "format": "png"},
+        )
+        client.get(url)
+        with storage.open(rendition_name) as f:
+            assert Image.open(f).size == (16, 8)
+
+        # replace the avatar w/ one of the same name (as storages that overwrite files would)...
+        storage.delete(avatar_name)
+        with django_capture_on_commit_callbacks(execute=True):
+            user.avatar = make_image_file((100, 200), name="avatar")
+            user.save()
+        assert user.avatar.name == avatar_name
+
+        # the out-of-date rendition isn't served...
+        client.get(url)
+        with storage.open(rendition_name) as f:
+            assert Image.open(f).size == (8, 16)
+
+    def test_rendition_view_image_too_large(self, mock_storage, settings, monkeypatch):
+        settings.ASTROSAT_USERS_RENDITION_SIZES = [16]
+        settings.ASTROSAT_USERS_RENDITION_FORMATS = ["webp"]
+
+        user = UserFactory(avatar=make_image_file((200, 200)))
+        client = APIClient()
+        url = reverse(
+            "user-avatar-rendition",
+            kwargs={"user_id": user.uuid, "size": 16, "format": "webp"},
+        )
+
+        # images w/ too many pixels aren't decoded (and fall back to the original)...
+        settings.ASTROSAT_USERS_RENDITION_MAX_PIXELS = 100
+        assert generate_renditions(user.avatar) == []
+
+        # nor are decompression bombs...
+        settings.ASTROSAT_USERS_RENDITION_MAX_PIXELS = 200 * 200
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        response = client.get(url)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response.url == user.avatar.url
+
+        # and the failure is remembered, so the image isn't opened again...
+        def generate_renditions_again(*args, **kwargs):
+            raise AssertionError("generate_renditions should not be called")
+
+        monkeypatch.setattr(renditions, "generate_renditions", generate_renditions_again)
+        response = client.get(url)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response.url == user.avatar.url
+
+    def test_serializer_rendition_urls(self, mock_storage, settings):
+        settings.ASTROSAT_USERS_RENDITION_SIZES = [16, 32]
+        settings.ASTROSAT_USERS_RENDITION_FORMATS = ["webp"]
+
+        user = UserFactory()
+        serializer = UserSerializer(user)
+        avatar_renditions = serializer.data["avatar_renditions"]
+
+        assert avatar_renditions == {
+            "32": {"webp": f"/api/users/{user.uuid}/avatar/32.webp"},
+            "16": {"webp": f"/api/users/{user.uuid}/avatar/16.webp"},
+        }
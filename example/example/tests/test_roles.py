@@ -0,0 +1,161 @@
+import json
+import pytest
+
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from astrosat.tests.utils import *
+
+from astrosat_users.models import UserPermission, UserRole, UserRoleEffectivePermission
+from astrosat_users.serializers import UserSerializer
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+def get_effective_permission_names(role):
+    return set(role.effective_permissions.values_list("name", flat=True))
+
+
+def get_permission_names(*roles):
+    return set(
+        name for role in roles
+        for name in role.permissions.values_list("name", flat=True)
+    )
+
+
+@pytest.mark.django_db
+class TestRoles:
+    def test_effective_permissions(self):
+        role_1, role_2, role_3 = [UserRoleFactory() for _ in range(3)]
+
+        assert get_effective_permission_names(role_3) == get_permission_names(role_3)
+
+        # R3 = R2 + R1
+        role_3.parents.add(role_2)
+        role_2.parents.add(role_1)
+        assert get_effective_permission_names(role_3) == get_permission_names(role_1, role_2, role_3)
+
+        # changes to an ancestor's permissions propagate to its descendants
+        permission = UserPermissionFactory()
+        role_1.permissions.add(permission)
+        assert permission.name in get_effective_permission_names(role_3)
+        permission.roles.remove(role_1)
+        assert permission.name not in get_effective_permission_names(role_3)
+
+        # as do changes to the hierarchy
+        role_2.parents.remove(role_1)
+        assert get_effective_permission_names(role_3) == get_permission_names(role_2, role_3)
+        role_1.children.add(role_3)
+        assert get_effective_permission_names(role_3) == get_permission_names(role_1, role_2, role_3)
+        role_1.delete()
+        assert get_effective_permission_names(role_3) == get_permission_names(role_2, role_3)
+
+    def test_shared_permissions(self):
+        permission = UserPermissionFactory()
+        role_1 = UserRoleFactory(permissions=[permission])
+        role_2 = UserRoleFactory(permissions=[permission])
+        role_2.parents.add(role_1)
+
+        # a permission that is inherited & direct is only removed when both are gone
+        role_1.permissions.remove(permission)
+        assert permission.name in get_effective_permission_names(role_2)
+        role_2.permissions.clear()
+        assert permission.name not in get_effective_permission_names(role_2)
+
+    def test_cycles_are_rejected(self):
+        role_1, role_2, role_3 = [UserRoleFactory() for _ in range(3)]
+        role_2.parents.add(role_1)
+        role_3.parents.add(role_2)
+
+        with pytest.raises(ValidationError):
+            role_1.parents.add(role_1)
+        with pytest.raises(ValidationError):
+            role_1.parents.add(role_3)
+        with pytest.raises(ValidationError):
+            role_3.children.add(role_1)
+
+    def test_rebuild_effective_permissions(self):
+        role_1, role_2 = [UserRoleFactory() for _ in range(2)]
+        role_2.parents.add(role_1)
+        expected_pairs = set(
+            UserRoleEffectivePermission.objects.values_list("role", "permission")
+        )
+
+        UserRoleEffectivePermission.objects.all().delete()
+        changed_role_ids = UserRole.objects.rebuild_effective_permissions()
+
+        assert changed_role_ids == {role_1.pk, role_2.pk}
+        assert set(
+            UserRoleEffectivePermission.objects.values_list("role", "permission")
+        ) == expected_pairs
+        assert UserRole.objects.rebuild_effective_permissions() == set()
+
+    def test_serializer_permissions(self, mock_storage):
+        role_1, role_2 = [UserRoleFactory() for _ in range(2)]
+        role_2.parents.add(role_1)
+
+        user = UserFactory()
+        user.roles.add(role_2)
+
+        serializer = UserSerializer(user)
+        assert set(serializer.data["permissions"]) == get_permission_names(role_1, role_2)
+
+
+@pytest.mark.django_db
+class TestSyncRoles:
+    @pytest.fixture
+    def write_spec(self, tmp_path):
+        def _write_spec(spec):
+            spec_path = tmp_path / "roles.json"
+            spec_path.write_text(json.dumps(spec))
+            return str(spec_path)
+        return _write_spec
+
+    def test_sync_roles(self, write_spec):
+        stale_role = UserRoleFactory(name="Viewer")
+        stale_permission = stale_role.permissions.first()
+
+        spec_path = write_spec({
+            "permissions": [{"name": "can-view", "description": "view things"}],
+            "roles": [
+                {"name": "Viewer", "permissions": ["can-view"]},
+                {"name": "Editor", "permissions": ["can-edit"], "parents": ["Viewer"]},
+            ]
+        })
+
+        stdout = StringIO()
+        call_command("sync_roles", spec_path, "--dry-run", stdout=stdout)
+        assert "would have roles created: 1" in stdout.getvalue()
+        assert not UserRole.objects.filter(name="Editor").exists()
+
+        call_command("sync_roles", spec_path, stdout=StringIO())
+        viewer = UserRole.objects.get(name="Viewer")
+        editor = UserRole.objects.get(name="Editor")
+        assert UserPermission.objects.get(name="can-view").description == "view things"
+        assert set(viewer.permissions.values_list("name", flat=True)) == {"can-view"}
+        assert get_effective_permission_names(editor) == {"can-view", "can-edit"}
+        # (stale permissions are unlinked but only deleted w/ --prune)
+        assert UserPermission.objects.filter(pk=stale_permission.pk).exists()
+
+        # syncing is idempotent
+        stdout = StringIO()
+        call_command("sync_roles", spec_path, stdout=stdout)
+        assert "Nothing to change." in stdout.getvalue()
+
+        call_command("sync_roles", spec_path, "--prune", stdout=StringIO())
+        assert not UserPermission.objects.filter(pk=stale_permission.pk).exists()
+
+    def test_sync_roles_rejects_cycles(self, write_spec):
+        spec_path = write_spec({
+            "roles": [
+                {"name": "A", "parents": ["B"]},
+                {"name": "B", "parents": ["A"]},
+            ]
+        })
+        with pytest.raises(CommandError):
+            call_command("sync_roles", spec_path, stdout=StringIO())
+        assert not UserRole.objects.filter(name__in=["A", "B"]).exists()
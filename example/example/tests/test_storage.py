@@ -0,0 +1,66 @@
+import pytest
+
+from django.contrib.admin.sites import site
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from astrosat_users.models import User
+from astrosat_users.renditions import get_rendition_name
+from astrosat_users.tests.utils import *
+
+from .factories import *
+
+
+@pytest.mark.django_db
+class TestDeferredFileDeletion:
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        # use a real (temporary) filesystem so that deletions can be checked
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.ASTROSAT_USERS_STORAGE_DELETION_WORKERS = 0
+
+    def test_delete_on_commit(self, django_capture_on_commit_callbacks):
+
+        user = UserFactory()
+        avatar_name = user.avatar.name
+        rendition_name = default_storage.save(
+            get_rendition_name(avatar_name, 64, "webp"), ContentFile(b"rendition")
+        )
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            user.delete()
+            # nothing is deleted until the transaction commits...
+            assert default_storage.exists(avatar_name)
+            assert default_storage.exists(rendition_name)
+
+        for callback in callbacks:
+            callback()
+
+        assert not default_storage.exists(avatar_name)
+        assert not default_storage.exists(rendition_name)
+
+    def test_delete_rolled_back(self, django_capture_on_commit_callbacks):
+
+        user = UserFactory()
+        avatar_name = user.avatar.name
+
+        with django_capture_on_commit_callbacks():
+            user.delete()
+
+        # (the callbacks are never run, as if the transaction had been rolled back)
+        assert default_storage.exists(avatar_name)
+
+    def test_admin_delete_queryset(self, django_capture_on_commit_callbacks):
+
+        users = [UserFactory() for _ in range(3)]
+        avatar_names = [user.avatar.name for user in users]
+
+        user_admin = site._registry[User]
+        with django_capture_on_commit_callbacks(execute=True):
+            user_admin.delete_queryset(
+                None, User.objects.filter(pk__in=[user.pk for user in users])
+            )
+
+        assert not User.objects.filter(pk__in=[user.pk for user in users]).exists()
+        for avatar_name in avatar_names:
+            assert not default_storage.exists(avatar_name)
@@ -0,0 +1,153 @@
+import pytest
+
+from django.core import mail
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
+
+from astrosat.tests.utils import *
+
+from astrosat_users.checks import check_throttle_rates
+from astrosat_users.conf import app_settings
+from astrosat_users.models import User
+from astrosat_users.tests.utils import *
+from astrosat_users.throttling import SlidingWindowThrottle
+from astrosat_users.views import LoginView
+
+from .factories import *
+
+
+@pytest.mark.django_db
+class TestThrottling:
+    def test_login_throttled_by_email(self, user, settings, monkeypatch):
+        settings.ASTROSAT_USERS_THROTTLE_RATES = {"login_email": "3/min"}
+
+        client = APIClient()
+        url = reverse("rest_login")
+        test_data = {"email": user.email, "password": "wrong password"}
+
+        for _ in range(3):
+            response = client.post(url, test_data)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # once over the limit, requests are rejected before any password is checked...
+        def check_password(*args, **kwargs):
+            raise AssertionError("check_password should not be called")
+
+        monkeypatch.setattr(User, "check_password", check_password)
+        response = client.post(url, test_data)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response["Retry-After"]) > 0
+
+        # (regardless of case)...
+        response = client.post(url, dict(test_data, email=user.email.upper()))
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        # but other emails are unaffected...
+        monkeypatch.undo()
+        other_user = UserFactory()
+        response = client.post(url, {"email": other_user.email, "password": "wrong password"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_login_throttled_by_ip(self, mock_storage, settings):
+        settings.ASTROSAT_USERS_THROTTLE_RATES = {"login_ip": "3/min"}
+
+        users = [UserFactory() for _ in range(4)]
+        url = reverse("rest_login")
+
+        for user in users[:3]:
+            response = APIClient().post(url, {"email": user.email, "password": "wrong password"})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = APIClient().post(url, {"email": users[3].email, "password": "wrong password"})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        # (other IPs are unaffected)...
+        response = APIClient(REMOTE_ADDR="10.0.0.1").post(
+            url, {"email": users[3].email, "password": "wrong password"}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # (w/out NUM_PROXIES, a client can't get around the limit by sending its own "X-Forwarded-For")...
+        response = APIClient(HTTP_X_FORWARDED_FOR="10.0.0.2").post(
+            url, {"email": users[3].email, "password": "wrong password"}
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_throttling_is_opt_in(self, user):
+        assert app_settings.ASTROSAT_USERS_THROTTLE_RATES == {}
+        assert check_throttle_rates(None) == []
+
+        client = APIClient()
+        url = reverse("rest_login")
+        for _ in range(20):
+            response = client.post(url, {"email": user.email, "password": "wrong password"})
+            assert response.status_code != status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_default_throttles_still_apply(self, user, monkeypatch):
+        assert app_settings.ASTROSAT_USERS_THROTTLE_RATES == {}
+        assert LoginView.throttle_classes[0] is ScopedRateThrottle
+        assert LoginView.throttle_scope == "dj_rest_auth"
+
+        cache.clear()
+        monkeypatch.setitem(ScopedRateThrottle.THROTTLE_RATES, "dj_rest_auth", "2/min")
+
+        client = APIClient()
+        url = reverse("rest_login")
+        test_data = {"email": user.email, "password": "wrong password"}
+        for _ in range(2):
+            response = client.post(url, test_data)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = client.post(url, test_data)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        cache.clear()
+
+    def test_email_throttle_ignores_non_dict_data(self, settings):
+        settings.ASTROSAT_USERS_THROTTLE_RATES = {"login_email": "3/min"}
+
+        client = APIClient()
+        url = reverse("rest_login")
+        for data in [["someone@test.com"], "someone@test.com", 1]:
+            response = client.post(url, data, format="json")
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_check_throttle_rates(self, settings):
+        settings.ASTROSAT_USERS_THROTTLE_RATES = {"login_ip": "60/min", "login_email": "10/min"}
+        settings.REST_FRAMEWORK = {
+            key: value for key, value in settings.REST_FRAMEWORK.items() if key != "NUM_PROXIES"
+        }
+        assert [error.id for error in check_throttle_rates(None)] == ["astrosat_users:W004"]
+
+        settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+        assert check_throttle_rates(None) == []
+
+    def test_throttled_emails_are_not_sent(self, user, settings):
+        settings.ASTROSAT_USERS_THROTTLE_RATES = {
+            "password_reset_email": "1/hour",
+            "email_verification_email": "1/hour",
+        }
+
+        client = APIClient()
+        for url_name in ["rest_password_reset", "rest_send_email_verification"]:
+            url = reverse(url_name)
+            response = client.post(url, {"email": user.email})
+            assert status.is_success(response.status_code)
+            n_sent = len(mail.outbox)
+
+            response = client.post(url, {"email": user.email})
+            assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            assert len(mail.outbox) == n_sent
+
+    def test_sliding_window_wait_time(self):
+        throttle = SlidingWindowThrottle()
+
+        # over the limit in the current window, so wait for (most of) the next...
+        assert throttle.get_wait_time(10, 60, 15, 10, 0) == 45
+        assert throttle.get_wait_time(10, 60, 15, 20, 0) == 75
+
+        # over the limit because of the previous window, so wait for it to slide out...
+        assert throttle.get_wait_time(10, 60, 15, 5, 10) == 15
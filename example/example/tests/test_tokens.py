@@ -1,4 +1,9 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
 from django.urls import resolve, reverse
+from django.utils import timezone
 
 import pytest
 import factory
@@ -6,6 +11,8 @@ import factory
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from knox.models import AuthToken
+
 # (these next 3 variables are imported internaly from "settings.py")
 from dj_rest_auth.models import TokenModel
 from dj_rest_auth.app_settings import TokenSerializer, create_token
@@ -89,5 +96,48 @@ class TestTokens:
         assert status.is_client_error(response.status_code)
         assert response.json()["detail"].lower() == "invalid token."
 
+    def test_max_tokens(self, user, settings, django_assert_num_queries):
+
+        settings.ASTROSAT_USERS_MAX_TOKENS_PER_USER = 3
+
+        tokens = []
+        for i in range(5):
+            token, key = create_auth_token(user)
+            # (make sure the tokens were created at distinct times)
+            AuthToken.objects.filter(pk=token.pk).update(
+                created=timezone.now() - timedelta(minutes=10 - i)
+            )
+            tokens.append(token)
+
+        # only the newest tokens are kept...
+        assert set(user.auth_token_set.values_list("pk", flat=True)) == {
+            token.pk for token in tokens[2:]
+        }
+
+        # expired tokens are deleted as well (and it all takes 1 insert & 1 delete)...
+        AuthToken.objects.filter(pk=tokens[2].pk).update(
+            expiry=timezone.now() - timedelta(minutes=1)
+        )
+        with django_assert_num_queries(2):
+            token, key = create_auth_token(user)
+        assert set(user.auth_token_set.values_list("pk", flat=True)) == {
+            tokens[3].pk, tokens[4].pk, token.pk
+        }
+
+    def test_purge_expired_tokens(self, user):
+
+        tokens = [create_auth_token(user)[0] for _ in range(5)]
+        AuthToken.objects.filter(pk__in=[token.pk for token in tokens[:3]]).update(
+            expiry=timezone.now() - timedelta(minutes=1)
+        )
+
+        stdout = StringIO()
+        call_command("purge_expired_tokens", "--batch-size=2", stdout=stdout)
+
+        assert "Deleted 3 expired tokens." in stdout.getvalue()
+        assert set(user.auth_token_set.values_list("pk", flat=True)) == {
+            token.pk for token in tokens[3:]
+        }
+
     # def test_expired_token(self, user):
     #     raise NotImplementedError()
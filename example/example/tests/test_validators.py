@@ -0,0 +1,78 @@
+import io
+import pytest
+
+from PIL import Image
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from astrosat_users.validators import (
+    ImageDimensionsValidator,
+    get_image_header_dimensions,
+)
+
+
+def make_image_file(size, format, name="image", **kwargs):
+    image_file = io.BytesIO()
+    Image.new("RGB", size).save(image_file, format, **kwargs)
+    return SimpleUploadedFile(
+        name=f"{name}.{format.lower()}",
+        content=image_file.getvalue(),
+        content_type=f"image/{format.lower()}",
+    )
+
+
+class TestImageDimensionsValidator:
+    @pytest.mark.parametrize("format", ["PNG", "GIF", "JPEG", "WEBP"])
+    def test_get_image_header_dimensions(self, format):
+        image_file = make_image_file((123, 45), format)
+        image_file.seek(10)
+        assert get_image_header_dimensions(image_file) == (123, 45)
+        assert image_file.tell() == 10  # the file position is restored
+
+    def test_get_image_header_dimensions_bounded(self):
+        # a JPEG w/ a large segment before the frame header...
+        image_file = make_image_file(
+            (123, 45), "JPEG", exif=b"Exif\x00\x00" + b"x" * 60000
+        )
+        assert get_image_header_dimensions(image_file) == (123, 45)
+        assert get_image_header_dimensions(
+            image_file, max_header_size=1024
+        ) == (None, None)
+
+    def test_get_image_header_dimensions_unknown(self):
+        image_file = SimpleUploadedFile(
+            name="image.png", content=b"I am a fake image"
+        )
+        assert get_image_header_dimensions(image_file) == (None, None)
+
+    def test_validate_dimensions(self):
+        validator = ImageDimensionsValidator(max_width=100, max_height=100)
+
+        validator(make_image_file((100, 100), "PNG"))
+
+        with pytest.raises(ValidationError):
+            validator(make_image_file((101, 100), "PNG"))
+
+        with pytest.raises(ValidationError):
+            validator(make_image_file((100, 101), "WEBP"))
+
+    def test_validate_size(self):
+        image_file = make_image_file((10, 10), "PNG")
+
+        validator = ImageDimensionsValidator(max_size=image_file.size)
+        validator(image_file)
+
+        validator = ImageDimensionsValidator(max_size=image_file.size - 1)
+        with pytest.raises(ValidationError) as e:
+            validator(image_file)
+        assert "larger than" in str(e.value)
+
+    def test_validate_unknown(self):
+        validator = ImageDimensionsValidator()
+        with pytest.raises(ValidationError):
+            validator(
+                SimpleUploadedFile(
+                    name="image.png", content=b"I am a fake image"
+                )
+            )
@@ -12,7 +12,7 @@ title = __import__("astrosat_users").__title__
 version = __import__("astrosat_users").__version__
 
 dependencies = [
-    "django~=3.0",  # django, duh
+    "django~=3.2",  # django, duh
     "djangorestframework~=3.0",  # api
     "django-allauth>=0.50",  # users
     "dj-rest-auth>=1.0",  # api-users